@@ -0,0 +1,11 @@
+"""
+Benchmarks of the storage and API hot paths against an in-process S3 emulator, run from `api/` with
+
+    PYTHONPATH=src uv run python -m benchmarks --baseline benchmarks/baselines/default.json
+
+See `python -m benchmarks --help` for catalog sizes, iterations and the simulated model latency. Catalogs of
+50,000 recipes (`--sizes 50000`) take minutes per run and are left out by default.
+
+S3 request counts do not depend on the machine and are compared exactly. Latencies are only comparable
+with a baseline saved on the same machine, refresh it with `--save-baseline` before comparing elsewhere.
+"""
@@ -0,0 +1,114 @@
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Dict, List
+import argparse
+import json
+import logging
+import platform
+import sys
+import time
+
+from benchmarks.suite import TARGETS, Measurement, run_suite
+
+log = logging.getLogger("benchmarks")
+
+DEFAULT_SIZES = "10,1000,10000"
+# Latency changes smaller than this are noise, whatever the ratio
+MIN_LATENCY_REGRESSION_MS = 1.0
+
+
+def compare(results: List[Measurement], baseline: Dict[str, Any], tolerance: float, latency: bool = False) -> List[str]:
+    """
+    Regressions against a baseline: any additional S3 request per iteration, and with `latency` a p50 latency
+    more than `tolerance` above the baseline's. Measurements missing from the baseline are skipped.
+    """
+    previous = {(item["target"], item["operation"], item["recipes"]): item for item in baseline["results"]}
+    regressions = []
+    for result in results:
+        before = previous.get((result.target, result.operation, result.recipes))
+        if before is None:
+            continue
+        label = f"{result.target} {result.operation} with {result.recipes} recipes"
+        if result.s3_calls_total > before["s3_calls_total"]:
+            regressions.append(f"{label}: {before['s3_calls_total']} -> {result.s3_calls_total} S3 requests")
+        if (
+            latency
+            and result.p50_ms > before["p50_ms"] * (1 + tolerance)
+            and result.p50_ms - before["p50_ms"] > MIN_LATENCY_REGRESSION_MS
+        ):
+            regressions.append(f"{label}: p50 {before['p50_ms']} -> {result.p50_ms} ms")
+    return regressions
+
+
+def report(results: List[Measurement]) -> str:
+    lines = [f"{'target':<11}{'recipes':>8}  {'operation':<11}{'p50 ms':>10}{'p99 ms':>10}{'S3 calls':>10}"]
+    for result in results:
+        lines.append(
+            f"{result.target:<11}{result.recipes:>8}  {result.operation:<11}"
+            f"{result.p50_ms:>10.2f}{result.p99_ms:>10.2f}{result.s3_calls_total:>10.2f}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="benchmarks", description="Benchmark the storage and API hot paths against an in-process S3 emulator")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help=f"Comma-separated catalog sizes (default: {DEFAULT_SIZES})")
+    parser.add_argument("--iterations", type=int, default=20, help="Iterations per operation and catalog size")
+    parser.add_argument("--target", action="append", choices=sorted(TARGETS), help="Benchmark only this target, may be repeated")
+    parser.add_argument("--backend", choices=("s3", "s3_threads"), default="s3_threads", help="Storage backend of the API target")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Seconds the fake recipe service takes per generation")
+    parser.add_argument("--output", type=Path, help="Write the results as JSON to this file")
+    parser.add_argument("--baseline", type=Path, help="Compare against this JSON baseline and fail on regressions")
+    parser.add_argument("--save-baseline", action="store_true", help="Write the results to --baseline instead of comparing")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Allowed relative p50 latency increase over a baseline recorded on the same host")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    # Per-request logs of the app would drown the report
+    logging.getLogger("wasfeines").setLevel(logging.WARNING)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    results = run_suite(
+        sizes=[int(size) for size in args.sizes.split(",")],
+        iterations=args.iterations,
+        targets=args.target or list(TARGETS),
+        llm_latency_seconds=args.llm_latency,
+        settings_overrides={"STORAGE_BACKEND": args.backend},
+        log=log.info,
+    )
+    print(report(results))
+    document = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "host": platform.node(),
+            "iterations": args.iterations,
+            "backend": args.backend,
+            "llm_latency_seconds": args.llm_latency,
+        },
+        "results": [asdict(result) for result in results],
+    }
+    if args.output is not None:
+        args.output.write_text(json.dumps(document, indent=2) + "\n")
+    if args.baseline is None:
+        return 0
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(document, indent=2) + "\n")
+        log.info(f"Saved baseline to {args.baseline}")
+        return 0
+    baseline = json.loads(args.baseline.read_text())
+    # Latencies only compare on the machine that recorded them, request counts compare everywhere
+    same_host = baseline["meta"].get("host") == platform.node()
+    if not same_host:
+        log.info(f"{args.baseline} was recorded on another host, comparing S3 requests only")
+    regressions = compare(results, baseline, args.tolerance, latency=same_host)
+    for regression in regressions:
+        log.error(f"Regression: {regression}")
+    if not regressions:
+        log.info(f"No regressions against {args.baseline}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+from typing import Any, Dict, List, Optional
+import io
+import json
+import logging
+import socket
+
+from moto.core import DEFAULT_ACCOUNT_ID
+from moto.s3.models import s3_backends
+from moto.server import ThreadedMotoServer
+from PIL import Image
+import httpx
+
+from wasfeines.settings import Settings
+from wasfeines.storage.catalog import build_entries, entries_to_manifest
+from wasfeines.storage.repository import CATALOG_MANIFEST_NAME
+
+BUCKET = "wasfeines-bench"
+BASE_PATH = "recipes"
+REGION = "us-east-1"
+
+RECIPE_HTML = """
+<summary>{{"name": "{title}"}}</summary>
+<section class="recipe--header"><h1>{title}</h1><h2>20min, Dinner</h2></section>
+<section class="recipe--summary"><p>Synthetic recipe number {index}.</p></section>
+<section class="recipe--ingredients"><h2>Ingredients</h2><ul><li>200g Lentils</li><li>1 Onion</li><li>2 Carrots</li></ul></section>
+<section class="recipe--instructions"><ol><li>Chop.</li><li>Simmer for 20 minutes.</li><li>Serve.</li></ol></section>
+"""
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def jpeg(size: tuple[int, int] = (640, 480)) -> bytes:
+    out = io.BytesIO()
+    Image.new("RGB", size, "orange").save(out, format="JPEG")
+    return out.getvalue()
+
+
+def recipe_name(index: int) -> str:
+    return f"recipe_Synthetic_{index:05d}"
+
+
+class S3Emulator:
+    """
+    moto's S3 server running on a thread of this process. The repositories talk to it over HTTP like to
+    a real bucket, while synthetic catalogs are written straight into its backend, which is much faster.
+    """
+    def __init__(self):
+        self.port = free_port()
+        self.endpoint_url = f"http://127.0.0.1:{self.port}"
+        self.server = ThreadedMotoServer(ip_address="127.0.0.1", port=self.port, verbose=False)
+        logging.getLogger("werkzeug").setLevel(logging.ERROR)
+
+    def __enter__(self) -> "S3Emulator":
+        self.server.start()
+        self.reset()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.server.stop()
+
+    @property
+    def backend(self):
+        return s3_backends[DEFAULT_ACCOUNT_ID]["global"]
+
+    def reset(self) -> None:
+        """Drop all buckets and create an empty benchmark bucket."""
+        httpx.post(f"{self.endpoint_url}/moto-api/reset").raise_for_status()
+        self.backend.create_bucket(BUCKET, REGION)
+
+    def settings(self, **overrides: Any) -> Settings:
+        return Settings.model_validate({
+            "S3_BUCKET": BUCKET,
+            "S3_ACCESS_KEY": "benchmark",
+            "S3_SECRET_ACCESS_KEY": "benchmark",
+            "S3_REGION": REGION,
+            "S3_ENDPOINT_URL": self.endpoint_url,
+            "S3_BUCKET_BASE_PATH": BASE_PATH,
+            "OIDC_CLIENT_ID": "benchmark",
+            "OIDC_CLIENT_SECRET": "benchmark",
+            "OIDC_DOMAIN": "example.com",
+            "OIDC_REDIRECT_URI": "https://example.com/api/v1/auth",
+            "APP_SECRET_KEY": "benchmark",
+            "ANTHROPIC_API_KEY": "benchmark",
+            "GENERATION_CACHE_DIR": "",
+            # moto supports conditional writes
+            "CATALOG_MANIFEST_ENABLED": True,
+            **overrides,
+        })
+
+    def put(self, key: str, body: bytes) -> Dict[str, Any]:
+        fake_key = self.backend.put_object(BUCKET, key, body)
+        return {"Key": key, "ETag": fake_key.etag, "Size": len(body)}
+
+    def seed_catalog(self, count: int, media: Optional[bytes] = None) -> None:
+        """Write `count` published recipes with a summary and one image each, and their catalog manifest."""
+        media = media if media is not None else jpeg((64, 48))
+        objects: List[Dict[str, Any]] = []
+        summaries: Dict[str, dict] = {}
+        for index in range(count):
+            name = f"{BASE_PATH}/{recipe_name(index)}"
+            title = recipe_name(index).removeprefix("recipe_").replace("_", " ")
+            summary = {
+                "name": recipe_name(index),
+                "key": None,
+                "created_by": "bench@example.com",
+                "user_content": f"Synthetic recipe {index}",
+                "user_tags": ["dinner", "vegan"] if index % 2 else ["snack"],
+                "ratings": None,
+            }
+            summaries[name] = summary
+            objects.append(self.put(f"{name}.html", RECIPE_HTML.format(title=title, index=index).encode()))
+            objects.append(self.put(f"{name}.json", json.dumps(summary).encode()))
+            objects.append(self.put(f"{name}/image.jpg", media))
+        entries = build_entries(objects)
+        for name, entry in entries.items():
+            entry.summary = summaries[name]
+        manifest = entries_to_manifest(entries.values(), version=1)
+        self.put(f"{BASE_PATH}/{CATALOG_MANIFEST_NAME}", json.dumps(manifest).encode())
+
+    def seed_draft_media(self, user_id: str, settings: Settings, count: int) -> None:
+        for index in range(count):
+            self.put(f"{BASE_PATH}/{settings.s3_draft_folder}/{user_id}/image-{index}", jpeg())
@@ -0,0 +1,59 @@
+from collections import Counter
+from typing import Any, Dict, List
+import asyncio
+import threading
+import time
+
+from wasfeines.llm.anthropic_recipe_service import LLMRecipeService
+from wasfeines.models.draft import DraftMedia, DraftRecipe
+from wasfeines.storage.async_s3 import AsyncS3StorageRepository
+from wasfeines.storage.repository import S3StorageRepository
+
+from benchmarks.emulator import RECIPE_HTML
+
+
+class FakeLLMRecipeService(LLMRecipeService):
+    """Answers with a fixed recipe after `latency_seconds`, the async path waits without holding a thread."""
+    def __init__(self, latency_seconds: float):
+        self.latency_seconds = latency_seconds
+
+    def _recipe(self, draft_recipe: DraftRecipe) -> tuple[dict, str]:
+        name = draft_recipe.name or "recipe_Generated"
+        return {"name": name}, RECIPE_HTML.format(title=name, index=0)
+
+    def generate_recipe_html_sync(self, draft_recipe: DraftRecipe, draft_media: List[DraftMedia]) -> tuple[dict, str]:
+        time.sleep(self.latency_seconds)
+        return self._recipe(draft_recipe)
+
+    async def generate_recipe_html(self, draft_recipe: DraftRecipe, draft_media: List[DraftMedia]) -> tuple[dict, str]:
+        await asyncio.sleep(self.latency_seconds)
+        return self._recipe(draft_recipe)
+
+
+class S3CallCounter:
+    """Counts the S3 requests of a repository by operation, from both its boto3 client and its async client."""
+    def __init__(self):
+        self._calls: Counter[str] = Counter()
+        self._lock = threading.Lock()
+
+    def _count(self, operation_name: str) -> None:
+        with self._lock:
+            self._calls[operation_name] += 1
+
+    def attach(self, repo: S3StorageRepository) -> None:
+        repo.s3.meta.events.register("before-call.s3", lambda model, **kwargs: self._count(model.name))
+        if isinstance(repo, AsyncS3StorageRepository):
+            call = repo.client.call
+
+            async def counted_call(operation_name: str, **params: Any) -> Dict[str, Any]:
+                self._count(operation_name)
+                return await call(operation_name, **params)
+
+            repo.client.call = counted_call
+
+    def take(self) -> Dict[str, int]:
+        """Return the counts since the last call and start over."""
+        with self._lock:
+            calls = dict(self._calls)
+            self._calls.clear()
+        return calls
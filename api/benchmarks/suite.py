@@ -0,0 +1,207 @@
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+import math
+import time
+
+from fastapi.testclient import TestClient
+
+from wasfeines.app import DEFAULT_PAGE_SIZE, create_app, valid_user_session
+from wasfeines.models import User
+from wasfeines.models.draft import DraftRecipeRequestModel
+from wasfeines.models.job import GenerationJobStatus
+from wasfeines.settings import Settings
+from wasfeines.storage.repository import S3StorageRepository
+
+from benchmarks.emulator import RECIPE_HTML, S3Emulator
+from benchmarks.fakes import FakeLLMRecipeService, S3CallCounter
+
+USER = User(
+    name="Bench User",
+    email="bench@example.com",
+    picture="https://example.com/picture.jpg",
+    given_name="Bench",
+    family_name="User",
+    sub="bench",
+)
+# Images in every draft that is generated or published
+DRAFT_MEDIA_COUNT = 2
+# Seconds between polls of a generation job
+JOB_POLL_SECONDS = 0.002
+
+
+@dataclass
+class Measurement:
+    target: str
+    operation: str
+    recipes: int
+    iterations: int
+    p50_ms: float
+    p99_ms: float
+    mean_ms: float
+    # Mean number of S3 requests per iteration, by operation and in total
+    s3_calls: Dict[str, float] = field(default_factory=dict)
+    s3_calls_total: float = 0.0
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile, `q` between 0 and 1."""
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, math.ceil(q * len(ordered)) - 1))]
+
+
+def measure(
+    target: str,
+    operation: str,
+    recipes: int,
+    iterations: int,
+    counter: S3CallCounter,
+    run: Callable[[int], Any],
+    setup: Optional[Callable[[int], Any]] = None,
+) -> Measurement:
+    """Time `run(i)` for every iteration `i`, `setup(i)` runs before it and is neither timed nor counted."""
+    durations: List[float] = []
+    calls: Counter[str] = Counter()
+    for i in range(iterations):
+        if setup is not None:
+            setup(i)
+        counter.take()
+        start = time.perf_counter()
+        run(i)
+        durations.append(time.perf_counter() - start)
+        calls.update(counter.take())
+    return Measurement(
+        target=target,
+        operation=operation,
+        recipes=recipes,
+        iterations=iterations,
+        p50_ms=round(percentile(durations, 0.5) * 1000, 3),
+        p99_ms=round(percentile(durations, 0.99) * 1000, 3),
+        mean_ms=round(sum(durations) / len(durations) * 1000, 3),
+        s3_calls={operation: round(count / iterations, 2) for operation, count in sorted(calls.items())},
+        s3_calls_total=round(sum(calls.values()) / iterations, 2),
+    )
+
+
+def _draft_request(i: int) -> DraftRecipeRequestModel:
+    return DraftRecipeRequestModel(name=f"recipe_Bench_{i:04d}", user_content="Lentil stew", user_tags=["dinner"], user_rating=None)
+
+
+def repository_benchmarks(
+    emulator: S3Emulator, settings: Settings, recipes: int, iterations: int, llm: FakeLLMRecipeService,
+) -> List[Measurement]:
+    """The blocking `S3StorageRepository` methods, as the thread pools run them."""
+    repo = S3StorageRepository(settings)
+    counter = S3CallCounter()
+    counter.attach(repo)
+    repo.warm_up_sync()
+    user_id = USER.email
+    emulator.seed_draft_media(user_id, settings, DRAFT_MEDIA_COUNT)
+    published: Dict[int, str] = {}
+    drafts: Dict[int, Any] = {}
+
+    def prepare_publish(i: int) -> None:
+        drafts[i] = (repo.put_draft_recipe_sync(user_id, _draft_request(i)), repo.get_draft_media_sync(user_id))
+
+    def publish(i: int) -> None:
+        draft, media = drafts.pop(i)
+        published[i] = repo.put_recipe_sync(draft, media, RECIPE_HTML.format(title=draft.name, index=i)).name
+
+    def measure_repo(operation: str, run: Callable[[int], Any], setup: Optional[Callable[[int], Any]] = None) -> Measurement:
+        return measure("repository", operation, recipes, iterations, counter, run, setup)
+
+    try:
+        return [
+            measure_repo("list", lambda i: repo.list_recipes_sync()),
+            measure_repo("list_page", lambda i: repo.list_recipes_page_sync(DEFAULT_PAGE_SIZE)),
+            measure_repo("draft_save", lambda i: repo.put_draft_recipe_sync(user_id, _draft_request(i))),
+            measure_repo("draft_load", lambda i: (repo.get_draft_recipe_sync(user_id), repo.get_draft_media_sync(user_id))),
+            measure_repo("generate", lambda i: llm.generate_recipe_html_sync(
+                repo.get_draft_recipe_sync(user_id), repo.get_draft_media_sync(user_id),
+            )),
+            measure_repo("publish", publish, setup=prepare_publish),
+            measure_repo("delete", lambda i: repo.delete_recipe_sync(published.pop(i))),
+        ]
+    finally:
+        repo.close()
+
+
+def api_benchmarks(
+    emulator: S3Emulator, settings: Settings, recipes: int, iterations: int, llm: FakeLLMRecipeService,
+) -> List[Measurement]:
+    """Requests to the FastAPI app, through the storage backend selected in `settings`."""
+    app = create_app(settings)
+    app.dependency_overrides[valid_user_session] = lambda: USER
+    counter = S3CallCounter()
+    generated: Dict[int, str] = {}
+
+    with TestClient(app) as client:
+        counter.attach(app.state.storage_repository)
+        app.state.llm_recipe_service = llm
+        app.state.generation_queue.recipe_service = llm
+        # The search index is built in the background on startup, let it finish before measuring
+        client.get("/api/v1/recipes/search").raise_for_status()
+
+        def request(method: str, url: str, **kwargs: Any) -> Any:
+            response = client.request(method, f"/api/v1{url}", **kwargs)
+            response.raise_for_status()
+            return response
+
+        def prepare_generate(i: int) -> None:
+            # Publishing removes the draft and its media
+            emulator.seed_draft_media(USER.email, settings, DRAFT_MEDIA_COUNT)
+            request("POST", "/draftrecipe", json={"name": f"recipe_Bench_{i:04d}", "user_content": "Lentil stew", "user_tags": ["dinner"], "user_rating": None})
+
+        def generate(i: int) -> None:
+            job = request("POST", "/generate").json()
+            while GenerationJobStatus(job["status"]).is_active:
+                time.sleep(JOB_POLL_SECONDS)
+                job = request("GET", f"/generate/{job['id']}").json()
+            if job["status"] != GenerationJobStatus.SUCCEEDED:
+                raise RuntimeError(f"Generation failed: {job['error']}")
+            generated[i] = job["recipe"]["name"]
+
+        def measure_api(operation: str, run: Callable[[int], Any], setup: Optional[Callable[[int], Any]] = None) -> Measurement:
+            return measure("api", operation, recipes, iterations, counter, run, setup)
+
+        return [
+            measure_api("list", lambda i: request("GET", "/recipes")),
+            measure_api("list_page", lambda i: request("GET", "/recipes", params={"limit": DEFAULT_PAGE_SIZE})),
+            measure_api("bundle", lambda i: request("GET", "/recipes/bundle", params={"limit": DEFAULT_PAGE_SIZE})),
+            measure_api("draft_save", lambda i: request("POST", "/draftrecipe", json={
+                "name": f"recipe_Bench_{i:04d}", "user_content": "Lentil stew", "user_tags": ["dinner"], "user_rating": None,
+            })),
+            measure_api("draft_load", lambda i: request("GET", "/draftrecipe")),
+            measure_api("generate", generate, setup=prepare_generate),
+            measure_api("delete", lambda i: request("DELETE", "/recipes", params={"recipe_name": generated.pop(i)})),
+        ]
+
+
+TARGETS = {
+    "repository": repository_benchmarks,
+    "api": api_benchmarks,
+}
+
+
+def run_suite(
+    sizes: List[int],
+    iterations: int,
+    targets: List[str],
+    llm_latency_seconds: float,
+    settings_overrides: Optional[Dict[str, Any]] = None,
+    log: Callable[[str], None] = lambda message: None,
+) -> List[Measurement]:
+    """Run `targets` against a fresh synthetic catalog of each size."""
+    llm = FakeLLMRecipeService(llm_latency_seconds)
+    results: List[Measurement] = []
+    with S3Emulator() as emulator:
+        # Saves are written through, so every iteration is charged for its own writes
+        settings = emulator.settings(DRAFT_WRITE_DELAY_SECONDS=0, **(settings_overrides or {}))
+        for size in sizes:
+            emulator.reset()
+            log(f"Seeding {size} recipes")
+            emulator.seed_catalog(size)
+            for target in targets:
+                log(f"Running {target} benchmarks with {size} recipes")
+                results.extend(TARGETS[target](emulator, settings, size, iterations, llm))
+    return results
@@ -1,27 +1,50 @@
-from typing import List, Annotated, Any
+from typing import AsyncIterator, Dict, List, Annotated, Any, Optional
+import asyncio
+import json
 from contextlib import asynccontextmanager
 import logging
+import os
+import secrets
+import stat
 import sys
+from dataclasses import asdict
+from pathlib import Path
 
-from fastapi import FastAPI, Request, APIRouter, Depends, HTTPException
+from fastapi import FastAPI, Request, Response, APIRouter, Depends, HTTPException, Query
 from fastapi.responses import RedirectResponse
 from authlib.integrations.starlette_client import OAuth
 from authlib.oauth1.client import OAuth1Client
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from starlette.middleware.sessions import SessionMiddleware
 from pydantic import TypeAdapter
 
 from wasfeines.models import Recipe, User
 from wasfeines.models.draft import DraftMedia, DraftRecipeResponseModel, DraftRecipeRequestModel
-from wasfeines.models.message import MessageResponse
+from wasfeines.models.job import GenerationJob
+from wasfeines.models.message import BulkDeleteResponse, MessageResponse
+from wasfeines.models.search import RecipeSearchResponse
+from wasfeines.models.stats import ServerStats
+from wasfeines.executors import PoolRegistry
+from wasfeines.metrics import CONTENT_TYPE, REGISTRY, MetricFamily, RouteMetricsMiddleware, family
 from wasfeines.settings import Settings
-from wasfeines.storage.repository import S3StorageRepository
-from wasfeines.llm.anthropic_recipe_service import AnthropicRecipeService
+from wasfeines.storage.repository import S3StorageRepository, StorageRepository
+from wasfeines.storage.async_s3 import AsyncS3StorageRepository
+from wasfeines.storage.filesystem import FileSystemStorageRepository
+from wasfeines.responses import MediaFileResponse, accepts_gzip, etag_matches, gzip_chunks
+from wasfeines.content import RecipeContentCache
+from wasfeines.search import RecipeSearch
+from wasfeines.llm.anthropic_recipe_service import AnthropicRecipeService, LLMRecipeService
+from wasfeines.llm.generation_cache import CachingRecipeService, DiskGenerationStore
+from wasfeines.llm.stream_parser import RecipeStreamParser
+from wasfeines.jobs.generation_queue import GenerationQueue, InMemoryJobQueueBackend, publish_recipe
 
 log = logging.getLogger(__name__)
 
+app_router = APIRouter()
 api_v1_router = APIRouter()
 
+DEFAULT_PAGE_SIZE = 50
+
 async def valid_user_session(request: Request) -> User:
     if (user := request.session.get('user')) is None:
         raise HTTPException(status_code=401, detail="Not authenticated")
@@ -29,31 +52,124 @@ async def valid_user_session(request: Request) -> User:
 
 ValidUser = Annotated[User, Depends(valid_user_session)]
 
-@api_v1_router.get("/recipes")
-async def get_recipes(request: Request, user: ValidUser) -> List[Recipe]:
-    log.info(f"User: {user}")
-    repo: S3StorageRepository = request.app.state.storage_repository
-    return await repo.list_recipes()
+def listing_headers(etag: Optional[str]) -> Dict[str, str]:
+    return {"ETag": etag, "Cache-Control": "private, no-cache"} if etag is not None else {}
+
+def not_modified(request: Request, etag: Optional[str]) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    return etag is not None and if_none_match is not None and etag_matches(if_none_match, etag)
 
-@api_v1_router.delete("/recipes", response_model=MessageResponse, responses={
+@api_v1_router.get("/recipes", response_model=List[Recipe], responses={
+    304: { "description": "The listing did not change since the request's If-None-Match ETag" },
+})
+async def get_recipes(
+    request: Request,
+    response: Response,
+    user: ValidUser,
+    limit: Annotated[Optional[int], Query(ge=1, le=1000, description="Page size, omit to list all recipes")] = None,
+    cursor: Annotated[Optional[str], Query(description="Value of the X-Next-Cursor header of the previous page")] = None,
+) -> List[Recipe] | Response:
+    log.debug(f"User: {user}")
+    repo: StorageRepository = request.app.state.storage_repository
+    # Taken before listing, so a listing never carries the ETag of a newer catalog
+    etag = await repo.recipes_etag()
+    headers = listing_headers(etag)
+    if not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    if limit is None and cursor is None:
+        return await repo.list_recipes()
+    try:
+        recipes, next_cursor = await repo.list_recipes_page(limit or DEFAULT_PAGE_SIZE, cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return recipes
+
+@api_v1_router.get("/recipes/bundle", response_class=StreamingResponse, response_model=None, responses={
+    200: {
+        "content": { "application/x-ndjson": {} },
+        "description": 'One JSON object per line, {"recipe": Recipe, "html": string | null}, in listing order',
+    },
+    304: { "description": "The listing did not change since the request's If-None-Match ETag" },
+})
+async def get_recipe_bundle(
+    request: Request,
+    user: ValidUser,
+    limit: Annotated[int, Query(ge=1, le=1000, description="Number of recipes in the bundle")] = DEFAULT_PAGE_SIZE,
+    cursor: Annotated[Optional[str], Query(description="Value of the X-Next-Cursor header of the previous bundle")] = None,
+) -> StreamingResponse | Response:
+    """A page of recipes with their HTML inlined, gzip-compressed for clients that accept it."""
+    repo: StorageRepository = request.app.state.storage_repository
+    etag = await repo.recipes_etag()
+    # Weak, the same bundle is sent with different content codings
+    etag = f"W/{etag}" if etag is not None else None
+    headers = listing_headers(etag)
+    if not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    try:
+        recipes, next_cursor = await repo.list_recipes_page(limit, cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if next_cursor is not None:
+        headers["X-Next-Cursor"] = next_cursor
+    recipe_contents: RecipeContentCache = request.app.state.recipe_contents
+    lines = recipe_contents.bundle(recipes)
+    headers["Vary"] = "Accept-Encoding"
+    if accepts_gzip(request.headers.get("accept-encoding", "")):
+        headers["Content-Encoding"] = "gzip"
+        lines = gzip_chunks(lines)
+    return StreamingResponse(lines, media_type="application/x-ndjson", headers=headers)
+
+@api_v1_router.get("/recipes/search")
+async def search_recipes(
+    request: Request,
+    user: ValidUser,
+    q: Annotated[str, Query(max_length=200, description="Words to search for in names, tags, descriptions, ingredients and instructions")] = "",
+    tag: Annotated[List[str], Query(description="Only return recipes with this tag, repeat to require several")] = [],
+    limit: Annotated[int, Query(ge=1, le=100)] = 20,
+    offset: Annotated[int, Query(ge=0)] = 0,
+) -> RecipeSearchResponse:
+    recipe_search: RecipeSearch = request.app.state.recipe_search
+    results, total = await recipe_search.search(q, tag, limit, offset)
+    return RecipeSearchResponse(total=total, results=results)
+
+@api_v1_router.delete("/recipes", response_model=MessageResponse | BulkDeleteResponse, responses={
     404: { "model": MessageResponse, "description": "Recipe not found" },
 })
-# Recipe name is a query parameter
-async def delete_recipe(request: Request, user: ValidUser, recipe_name: str) -> MessageResponse | JSONResponse:
-    repo: S3StorageRepository = request.app.state.storage_repository
-    delete_success = await repo.delete_recipe(recipe_name)
-    if not delete_success:
-        return JSONResponse(status_code=404, content={"detail": "Recipe not found"})
-    return MessageResponse(detail="Recipe deleted successfully")
+# Recipe names are query parameters, repeat `recipe_name` to delete several recipes at once
+async def delete_recipe(
+    request: Request, user: ValidUser, recipe_name: Annotated[List[str], Query()]
+) -> MessageResponse | BulkDeleteResponse | JSONResponse:
+    repo: StorageRepository = request.app.state.storage_repository
+    if len(recipe_name) == 1:
+        delete_success = await repo.delete_recipe(recipe_name[0])
+        if not delete_success:
+            return JSONResponse(status_code=404, content={"detail": "Recipe not found"})
+        return MessageResponse(detail="Recipe deleted successfully")
+    results = await repo.delete_recipes(recipe_name)
+    return BulkDeleteResponse(
+        deleted=[name for name, error in results.items() if error is None],
+        errors={name: error for name, error in results.items() if error is not None},
+    )
 
 @api_v1_router.get("/draftmedia")
 async def get_draft(request: Request, user: ValidUser) -> List[DraftMedia]:
-    repo: S3StorageRepository = request.app.state.storage_repository
+    repo: StorageRepository = request.app.state.storage_repository
     return await repo.get_draft_media(user.email)
 
+@api_v1_router.post("/draftmedia/slots")
+# Upload URLs are only signed for files about to be uploaded, fewer slots are returned when the draft is almost full
+async def create_upload_slots(
+    request: Request, user: ValidUser, count: Annotated[int, Query(ge=1, le=100)] = 1
+) -> List[DraftMedia]:
+    repo: StorageRepository = request.app.state.storage_repository
+    return await repo.create_upload_slots(user.email, count)
+
 @api_v1_router.get('/draftrecipe', response_model=DraftRecipeResponseModel)
 async def get_draft_recipe(request: Request, user: ValidUser) -> DraftRecipeResponseModel:
-    repo: S3StorageRepository = request.app.state.storage_repository
+    repo: StorageRepository = request.app.state.storage_repository
     draft_recipe = await repo.get_draft_recipe(user.email)
     if draft_recipe is None:
         draft_media = await repo.get_draft_media(user.email)
@@ -68,7 +184,7 @@ async def get_draft_recipe(request: Request, user: ValidUser) -> DraftRecipeResp
 
 @api_v1_router.post('/draftrecipe', response_model=DraftRecipeResponseModel)
 async def post_draft_recipe(request: Request, user: ValidUser, recipe: DraftRecipeRequestModel) -> DraftRecipeResponseModel:
-    repo: S3StorageRepository = request.app.state.storage_repository
+    repo: StorageRepository = request.app.state.storage_repository
     draft_recipe = await repo.put_draft_recipe(user_id=user.email, recipe=recipe)
     draft_media = await repo.get_draft_media(user.email)
     return draft_recipe.to_response_model(draft_media)
@@ -77,32 +193,127 @@ async def post_draft_recipe(request: Request, user: ValidUser, recipe: DraftReci
     404: { "model": MessageResponse, "description": "Draft recipe not found" },
 })
 async def delete_draft_recipe(request: Request, user: ValidUser) -> MessageResponse | JSONResponse:
-    repo: S3StorageRepository = request.app.state.storage_repository
+    repo: StorageRepository = request.app.state.storage_repository
     draft_recipe = await repo.delete_draft_recipe(user_id=user.email)
     if draft_recipe is None:
         return JSONResponse(status_code=404, content={"detail": "Draft recipe not found"})
     return MessageResponse(detail="Draft recipe deleted successfully")
 
-@api_v1_router.post('/generate', response_model=Recipe, responses={
+@api_v1_router.post('/generate', status_code=202, response_model=GenerationJob, responses={
     404: { "model": MessageResponse, "description": "Draft recipe not found" },
 })
-async def generate_recipe(request: Request, user: ValidUser) -> Recipe | JSONResponse:
-    repo: S3StorageRepository = request.app.state.storage_repository
+async def generate_recipe(request: Request, user: ValidUser) -> GenerationJob | JSONResponse:
+    repo: StorageRepository = request.app.state.storage_repository
     draft_media = await repo.get_draft_media(user.email)
     draft_recipe = await repo.get_draft_recipe(user.email)
     if draft_recipe is None:
         return JSONResponse(status_code=404, content={"detail": "Draft recipe not found"})
-    recipe_service: AnthropicRecipeService = request.app.state.llm_recipe_service
-    summary_dict, html = recipe_service.generate_recipe_html_sync(draft_recipe, draft_media)
-    if not draft_recipe.name:
-        draft_recipe.name = summary_dict["name"]
-    recipe = await repo.put_recipe(
-        recipe=draft_recipe,
-        media=draft_media,
-        recipe_html=html,
-    )
-    await repo.delete_draft_recipe(user_id=user.email)
-    return recipe
+    generation_queue: GenerationQueue = request.app.state.generation_queue
+    return await generation_queue.submit(user.email, draft_recipe, draft_media)
+
+def sse_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@api_v1_router.post('/generate/stream', response_class=StreamingResponse, response_model=None, responses={
+    200: { "content": { "text/event-stream": {} }, "description": "Server-Sent Events: summary, section, recipe or error" },
+    404: { "model": MessageResponse, "description": "Draft recipe not found" },
+})
+async def generate_recipe_stream(request: Request, user: ValidUser) -> StreamingResponse | JSONResponse:
+    """
+    Generate a recipe and stream it as Server-Sent Events: a `summary` event once the summary is complete,
+    a `section` event per completed section and finally the stored `recipe`.
+    """
+    repo: StorageRepository = request.app.state.storage_repository
+    draft_media = await repo.get_draft_media(user.email)
+    draft_recipe = await repo.get_draft_recipe(user.email)
+    if draft_recipe is None:
+        return JSONResponse(status_code=404, content={"detail": "Draft recipe not found"})
+    recipe_service: LLMRecipeService = request.app.state.llm_recipe_service
+
+    async def events() -> AsyncIterator[str]:
+        parser = RecipeStreamParser()
+        try:
+            async for chunk in recipe_service.stream_recipe_html(draft_recipe, draft_media):
+                for event in parser.feed(chunk):
+                    yield sse_event(event.event, event.summary if event.event == "summary" else {"html": event.html})
+            for event in parser.finish():
+                yield sse_event(event.event, {"html": event.html})
+            recipe = await publish_recipe(repo, user.email, draft_recipe, draft_media, parser.summary or {}, parser.text)
+        except TimeoutError:
+            yield sse_event("error", {"detail": "Recipe generation timed out"})
+            return
+        except Exception as e:
+            log.exception("Streaming recipe generation failed")
+            yield sse_event("error", {"detail": str(e) or type(e).__name__})
+            return
+        yield sse_event("recipe", asdict(recipe))
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@api_v1_router.get('/generate/{job_id}', response_model=GenerationJob, responses={
+    404: { "model": MessageResponse, "description": "Generation job not found" },
+})
+async def get_generation_job(request: Request, user: ValidUser, job_id: str) -> GenerationJob | JSONResponse:
+    generation_queue: GenerationQueue = request.app.state.generation_queue
+    job = await generation_queue.get(job_id)
+    if job is None or job.created_by != user.email:
+        return JSONResponse(status_code=404, content={"detail": "Generation job not found"})
+    return job
+
+def filesystem_repository(request: Request) -> FileSystemStorageRepository:
+    repo = request.app.state.storage_repository
+    if not isinstance(repo, FileSystemStorageRepository):
+        # Media of other backends is served by the backend itself
+        raise HTTPException(status_code=404, detail="Not found")
+    return repo
+
+@api_v1_router.api_route('/media/{key:path}', methods=['GET', 'HEAD'], response_class=MediaFileResponse, responses={
+    200: { "content": { "application/octet-stream": {} }, "description": "The media file, supports ETag and Range requests" },
+    403: { "model": MessageResponse, "description": "A file of another user's draft" },
+    404: { "model": MessageResponse, "description": "Media not found" },
+})
+async def get_media(request: Request, user: ValidUser, key: str) -> MediaFileResponse:
+    repo = filesystem_repository(request)
+    if not repo.is_readable_media_key(user.email, key):
+        raise HTTPException(status_code=403, detail="Only media of published recipes and your own draft can be read")
+    try:
+        path = repo.path(key)
+        stat_result = await repo.read_pool.run(os.stat, path)
+    except (ValueError, OSError):
+        raise HTTPException(status_code=404, detail="Media not found")
+    if not stat.S_ISREG(stat_result.st_mode):
+        raise HTTPException(status_code=404, detail="Media not found")
+    # Clients revalidate with the ETag, files are replaced in place
+    return MediaFileResponse(path, stat_result=stat_result, headers={"Cache-Control": "private, no-cache"})
+
+@api_v1_router.put('/media/{key:path}', response_model=MessageResponse, responses={
+    403: { "model": MessageResponse, "description": "Not a media file of the user's draft" },
+})
+async def put_media(request: Request, response: Response, user: ValidUser, key: str) -> MessageResponse | JSONResponse:
+    repo = filesystem_repository(request)
+    if not repo.is_draft_media_key(user.email, key):
+        return JSONResponse(status_code=403, content={"detail": "Media can only be uploaded to your own draft"})
+    response.headers["ETag"] = await repo.write_media_stream(key, request.stream())
+    return MessageResponse(detail="Media uploaded successfully")
+
+@api_v1_router.delete('/media/{key:path}', response_model=MessageResponse, responses={
+    403: { "model": MessageResponse, "description": "Not a media file of the user's draft" },
+    404: { "model": MessageResponse, "description": "Media not found" },
+})
+async def delete_media(request: Request, user: ValidUser, key: str) -> MessageResponse | JSONResponse:
+    repo = filesystem_repository(request)
+    if not repo.is_draft_media_key(user.email, key):
+        return JSONResponse(status_code=403, content={"detail": "Media can only be deleted from your own draft"})
+    if not await repo.write_pool.run(repo.delete_media_sync, key):
+        return JSONResponse(status_code=404, content={"detail": "Media not found"})
+    return MessageResponse(detail="Media deleted successfully")
+
+@api_v1_router.get('/stats')
+async def get_stats(request: Request, user: ValidUser) -> ServerStats:
+    """Load of the process's executors and concurrency limiters, and how many storage reads were coalesced."""
+    pools: PoolRegistry = request.app.state.pools
+    repo: StorageRepository = request.app.state.storage_repository
+    return ServerStats(pools=pools.stats(), coalescing=repo.flights.stats())
 
 @api_v1_router.get('/login')
 async def login(request: Request):
@@ -122,6 +333,51 @@ async def auth(request: Request):
     return RedirectResponse(url='/')
 
 
+def server_metrics(app: FastAPI) -> List[MetricFamily]:
+    """Pool loads, cache hit counts and coalesced storage reads, read from the app's state on every scrape."""
+    repo: StorageRepository = app.state.storage_repository
+    pools = app.state.pools.stats()
+    caches = {"drafts": repo.drafts.drafts, "recipe_contents": app.state.recipe_contents.cache}
+    if isinstance(repo, S3StorageRepository):
+        caches["presigned_urls"] = repo.presigned_urls
+    service = app.state.llm_recipe_service
+    generations = service if isinstance(service, CachingRecipeService) else None
+    if generations is not None:
+        service = generations.inner
+    if isinstance(service, AnthropicRecipeService):
+        caches["media"] = service.media_preprocessor.cache
+    lookups = {name: (cache.hits, cache.misses) for name, cache in caches.items()}
+    if generations is not None:
+        lookups["generations"] = (generations.hits, generations.misses)
+    coalescing = repo.flights.stats()
+    return [
+        family("pool_active", "gauge", "Calls holding a slot of a pool", (({"pool": pool.name}, pool.active) for pool in pools)),
+        family("pool_queued", "gauge", "Calls waiting for a slot of a pool", (({"pool": pool.name}, pool.queued) for pool in pools)),
+        family("pool_size", "gauge", "Slots of a pool", (({"pool": pool.name}, pool.size) for pool in pools)),
+        family("cache_hits", "counter", "Lookups served from a cache", (({"cache": name}, hits) for name, (hits, _) in lookups.items())),
+        family("cache_misses", "counter", "Lookups a cache could not serve", (({"cache": name}, misses) for name, (_, misses) in lookups.items())),
+        family("cache_hit_ratio", "gauge", "Share of all lookups so far served from a cache", (
+            ({"cache": name}, hits / (hits + misses) if hits + misses else 0.0) for name, (hits, misses) in lookups.items()
+        )),
+        family("cache_entries", "gauge", "Entries held by a cache", (({"cache": name}, len(cache)) for name, cache in caches.items())),
+        family("storage_reads", "counter", "Coalesced storage read calls", (({"operation": item.operation}, item.calls) for item in coalescing)),
+        family("storage_reads_coalesced", "counter", "Storage read calls that shared the result of an identical call in flight", (
+            ({"operation": item.operation}, item.coalesced) for item in coalescing
+        )),
+    ]
+
+@app_router.get('/metrics', include_in_schema=False)
+async def get_metrics(request: Request) -> PlainTextResponse:
+    """Metrics of the process in the Prometheus text format, for scrapers sending the `METRICS_TOKEN` as bearer token."""
+    token: str = request.app.state.settings.metrics_token
+    if not token:
+        raise HTTPException(status_code=404, detail="Not found")
+    authorization = request.headers.get("authorization", "")
+    if not secrets.compare_digest(authorization.encode(), f"Bearer {token}".encode()):
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
 def configure_logging(settings: Settings):
     log_level = logging.DEBUG if settings.debug else logging.INFO
     logging.basicConfig(
@@ -130,10 +386,20 @@ def configure_logging(settings: Settings):
         stream=sys.stdout,
     )
 
+def create_storage_repository(settings: Settings, pools: PoolRegistry) -> StorageRepository:
+    if settings.storage_backend == "filesystem":
+        return FileSystemStorageRepository(settings, pools)
+    if settings.storage_backend == "s3_threads":
+        return S3StorageRepository(settings, pools)
+    return AsyncS3StorageRepository(settings, pools)
+
 @asynccontextmanager
 async def lifespan(app: FastAPI, settings: Settings):
     app.state.settings = settings
-    app.state.storage_repository = S3StorageRepository(settings)
+    app.state.pools = PoolRegistry()
+    app.state.storage_repository = create_storage_repository(settings, app.state.pools)
+    app.state.recipe_search = RecipeSearch(app.state.storage_repository)
+    app.state.recipe_contents = RecipeContentCache(app.state.storage_repository, settings.recipe_content_cache_size)
     app.state.oauth = OAuth()
     app.state.oauth.register(
             "auth0",
@@ -146,14 +412,40 @@ async def lifespan(app: FastAPI, settings: Settings):
             server_metadata_url=f'https://{settings.oidc_domain}/.well-known/openid-configuration'
     )
     app.state.llm_recipe_service = AnthropicRecipeService(
-        settings, app.state.storage_repository
+        settings, app.state.storage_repository, app.state.pools
+    )
+    if settings.generation_cache_dir:
+        app.state.llm_recipe_service = CachingRecipeService(
+            app.state.llm_recipe_service,
+            DiskGenerationStore(Path(settings.generation_cache_dir), settings.generation_cache_max_bytes),
+            app.state.pools,
+        )
+    app.state.generation_queue = GenerationQueue(
+        backend=InMemoryJobQueueBackend(ttl_seconds=settings.generation_job_ttl_seconds),
+        storage_repository=app.state.storage_repository,
+        recipe_service=app.state.llm_recipe_service,
+        num_workers=settings.generation_workers,
     )
+    app.state.generation_queue.start()
     configure_logging(settings)
+    try:
+        await app.state.storage_repository.warm_up()
+    except Exception:
+        log.exception("Could not warm up storage repository, it will be loaded on first request")
+    search_warm_up = asyncio.create_task(app.state.recipe_search.warm_up())
+    collector = lambda: server_metrics(app)
+    REGISTRY.register_collector(collector)
     yield
-    print("Shutting down")
+    log.info("Shutting down")
+    search_warm_up.cancel()
+    REGISTRY.unregister_collector(collector)
+    await app.state.generation_queue.stop()
+    await app.state.storage_repository.aclose()
+    app.state.pools.shutdown()
 
-def create_app() -> FastAPI:
-    settings = Settings.model_validate({})
+def create_app(settings: Optional[Settings] = None) -> FastAPI:
+    if settings is None:
+        settings = Settings.model_validate({})
     app = FastAPI(
         title="Wasfeines API",
         description="API for Wasfeines",
@@ -163,5 +455,7 @@ def create_app() -> FastAPI:
         openapi_url="/api/openapi.json",
     )
     app.add_middleware(SessionMiddleware, secret_key=settings.app_secret_key)
+    app.add_middleware(RouteMetricsMiddleware)
     app.include_router(api_v1_router, prefix="/api/v1")
+    app.include_router(app_router)
     return app
\ No newline at end of file
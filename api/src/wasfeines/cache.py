@@ -0,0 +1,81 @@
+from collections import OrderedDict
+from typing import Callable, Dict, Generic, Hashable, Optional, Tuple, TypeVar
+import threading
+import time
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    """
+    Thread-safe, size-bounded LRU cache whose entries expire `ttl_seconds` after they were stored.
+
+    `on_evict` is called with the key and value of entries dropped for space or found expired, outside the lock.
+    """
+    def __init__(
+        self,
+        max_size: int,
+        ttl_seconds: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+        on_evict: Optional[Callable[[K, V], None]] = None,
+    ):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.on_evict = on_evict
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._items: "OrderedDict[K, Tuple[V, Optional[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._items)
+
+    def get(self, key: K) -> Optional[V]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                value, expires_at = item
+                if expires_at is None or self._clock() < expires_at:
+                    self._items.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._items[key]
+            self.misses += 1
+        if item is not None and self.on_evict is not None:
+            self.on_evict(key, item[0])
+        return None
+
+    def set(self, key: K, value: V, ttl_seconds: Optional[float] = None) -> None:
+        ttl = ttl_seconds if ttl_seconds is not None else self.ttl_seconds
+        expires_at = self._clock() + ttl if ttl is not None else None
+        evicted = []
+        with self._lock:
+            self._items[key] = (value, expires_at)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                evicted.append(self._items.popitem(last=False))
+        if self.on_evict is not None:
+            for evicted_key, (evicted_value, _) in evicted:
+                self.on_evict(evicted_key, evicted_value)
+
+    def get_or_set(self, key: K, factory: Callable[[], V]) -> V:
+        value = self.get(key)
+        if value is None:
+            value = factory()
+            self.set(key, value)
+        return value
+
+    def invalidate(self, key: K) -> None:
+        with self._lock:
+            self._items.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"size": len(self._items), "hits": self.hits, "misses": self.misses}
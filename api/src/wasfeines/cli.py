@@ -0,0 +1,141 @@
+"""
+Maintenance commands, run with `python -m wasfeines.cli <command>`.
+"""
+from pathlib import Path
+import argparse
+import logging
+
+from wasfeines.storage.media_variants import VARIANTS_FOLDER, build_variants
+
+log = logging.getLogger(__name__)
+
+def backfill_content_dir(content_dir: Path) -> int:
+    """Write the missing media variants of the recipes in a local content directory."""
+    processed = 0
+    for html_path in sorted(content_dir.glob("*.html")):
+        media_dir = html_path.with_suffix("")
+        if not media_dir.is_dir():
+            continue
+        for media_path in sorted(media_dir.iterdir()):
+            if not media_path.is_file():
+                continue
+            if (media_dir / VARIANTS_FOLDER / media_path.name).is_dir():
+                continue
+            media_key = media_path.relative_to(content_dir).as_posix()
+            try:
+                variants = build_variants(media_key, media_path.read_bytes())
+            except Exception as e:
+                log.warning(f"Could not create variants of {media_key}: {e}")
+                continue
+            for key, data in variants:
+                path = content_dir / key
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_bytes(data)
+            processed += 1
+    return processed
+
+
+def _s3_repository():
+    from wasfeines.settings import Settings
+    from wasfeines.storage.repository import S3StorageRepository
+
+    return S3StorageRepository(Settings())
+
+
+def backfill_variants(args: argparse.Namespace) -> None:
+    if args.content_dir is not None:
+        processed = backfill_content_dir(args.content_dir)
+    else:
+        repo = _s3_repository()
+        try:
+            processed = repo.backfill_media_variants_sync()
+        finally:
+            repo.close()
+    log.info(f"Processed {processed} media files")
+
+
+def reconcile_manifest(args: argparse.Namespace) -> None:
+    repo = _s3_repository()
+    try:
+        recipes = repo.reconcile_manifest_sync()
+    finally:
+        repo.close()
+    log.info(f"Wrote catalog manifest with {recipes} recipes")
+
+
+def _storage_repository(settings):
+    from wasfeines.storage.filesystem import FileSystemStorageRepository
+    from wasfeines.storage.repository import S3StorageRepository
+
+    if settings.storage_backend == "filesystem":
+        return FileSystemStorageRepository(settings)
+    return S3StorageRepository(settings)
+
+
+def regenerate(args: argparse.Namespace) -> None:
+    from wasfeines.llm.anthropic_recipe_service import AnthropicRecipeService
+    from wasfeines.llm.batch_regeneration import BatchRegenerator
+    from wasfeines.llm.fake_client import FakeAnthropic
+    from wasfeines.llm.media_preprocessing import MediaPreprocessor
+    from wasfeines.settings import Settings
+
+    settings = Settings()
+    repo = _storage_repository(settings)
+    try:
+        service = AnthropicRecipeService(settings, repo)
+        if args.fake:
+            service.client = FakeAnthropic()
+        regenerator = BatchRegenerator(
+            service,
+            repo,
+            media_preprocessor=service.media_preprocessor or MediaPreprocessor(
+                repo,
+                max_edge=settings.llm_image_max_edge,
+                quality=settings.llm_image_quality,
+                cache_size=settings.llm_image_cache_size,
+            ),
+            poll_seconds=args.poll_seconds,
+            # The fake client's placeholder HTML must never replace real recipes
+            dry_run=args.fake,
+        )
+        recipes = repo.list_recipes_sync()
+        if args.recipe:
+            recipes = [recipe for recipe in recipes if recipe.name in args.recipe]
+            missing = set(args.recipe) - {recipe.name for recipe in recipes}
+            if missing:
+                raise SystemExit(f"Unknown recipes: {', '.join(sorted(missing))}")
+        outcome = regenerator.run(recipes, upgrade=args.upgrade, batch_id=args.batch_id)
+    finally:
+        repo.close()
+    for name, error in sorted(outcome.failed.items()):
+        log.warning(f"Could not regenerate {name}: {error}")
+    verb = "Would have regenerated" if args.fake else "Regenerated"
+    log.info(f"{verb} {len(outcome.updated)} recipes in batch {outcome.batch_id}, {len(outcome.failed)} failed")
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="wasfeines")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    backfill = commands.add_parser("backfill-variants", help="Create thumbnail and medium variants of existing recipe media")
+    backfill.add_argument("--content-dir", type=Path, help="Process a local content directory instead of the S3 bucket")
+    backfill.set_defaults(func=backfill_variants)
+
+    reconcile = commands.add_parser("reconcile-manifest", help="Rebuild the catalog manifest from the objects in the bucket")
+    reconcile.set_defaults(func=reconcile_manifest)
+
+    regen = commands.add_parser("regenerate", help="Regenerate the HTML of published recipes with a message batch")
+    regen.add_argument("--recipe", action="append", help="Name of a recipe to regenerate, may be repeated (default: all)")
+    regen.add_argument("--upgrade", action="store_true", help="Send the current HTML along and keep its content, for format changes")
+    regen.add_argument("--batch-id", help="Apply the results of a batch submitted before instead of submitting a new one")
+    regen.add_argument("--poll-seconds", type=float, default=60, help="Seconds between checks whether the batch ended")
+    regen.add_argument("--fake", action="store_true", help="Dry run answered by a local fake client instead of the API, no recipe is changed")
+    regen.set_defaults(func=regenerate)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
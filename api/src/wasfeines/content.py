@@ -0,0 +1,57 @@
+from dataclasses import asdict
+from typing import AsyncIterator, List, Optional
+import asyncio
+import json
+import logging
+
+from wasfeines.cache import TTLCache
+from wasfeines.models.recipe import Recipe
+from wasfeines.singleflight import SingleFlight
+from wasfeines.storage.repository import StorageRepository
+
+log = logging.getLogger(__name__)
+
+
+class RecipeContentCache:
+    """
+    HTML of published recipes, cached by recipe name and object ETag so a changed recipe is never served
+    from the cache. Recipes whose ETag the backend cannot tell are read every time.
+    Concurrent reads of the same HTML share one storage read.
+    """
+    def __init__(self, storage_repository: StorageRepository, max_size: int):
+        self.storage_repository = storage_repository
+        self.cache: TTLCache[tuple[str, str], str] = TTLCache(max_size=max_size)
+        self.flights = SingleFlight()
+
+    async def _read(self, name: str) -> Optional[str]:
+        try:
+            return (await self.storage_repository.read_media(f"{name}.html")).decode()
+        except Exception as e:
+            log.warning(f"Could not read HTML of {name}: {e}")
+            return None
+
+    async def html(self, name: str, etag: Optional[str]) -> Optional[str]:
+        if etag is None:
+            return await self._read(name)
+        recipe_html = self.cache.get((name, etag))
+        if recipe_html is None:
+            recipe_html = await self.flights.do(("read_html", name, etag), lambda: self._read(name))
+            if recipe_html is not None:
+                self.cache.set((name, etag), recipe_html)
+        return recipe_html
+
+    async def bundle(self, recipes: List[Recipe]) -> AsyncIterator[bytes]:
+        """
+        Yield one NDJSON line per recipe, in the order of `recipes`, with the recipe and its HTML (null if
+        it could not be read). Missing HTML is read concurrently, lines are sent as soon as they are ready.
+        """
+        etags = await self.storage_repository.html_etags([recipe.name for recipe in recipes])
+        reads = [asyncio.ensure_future(self.html(recipe.name, etags.get(recipe.name))) for recipe in recipes]
+        try:
+            for recipe, read in zip(recipes, reads):
+                line = {"recipe": asdict(recipe), "html": await read}
+                yield json.dumps(line, default=str).encode() + b"\n"
+        finally:
+            # Stop waiting for the remaining reads if the client went away
+            for read in reads:
+                read.cancel()
@@ -0,0 +1,175 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, TypeVar
+import asyncio
+import contextvars
+import threading
+import time
+
+from wasfeines.metrics import REGISTRY
+from wasfeines.models.stats import PoolStats
+
+T = TypeVar("T")
+
+
+QUEUE_WAIT = REGISTRY.histogram(
+    "pool_queue_wait_seconds", "Time calls waited for a worker of a thread pool or a slot of a limiter", ("pool",),
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+
+
+class _PoolMetrics:
+    def __init__(self, name: str, size: int):
+        self.name = name
+        self.size = size
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+        self._completed = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def _enqueued(self) -> float:
+        with self._lock:
+            self._queued += 1
+        return time.monotonic()
+
+    def _dropped(self) -> None:
+        with self._lock:
+            self._queued -= 1
+
+    def _started(self, enqueued_at: float) -> None:
+        waited = time.monotonic() - enqueued_at
+        with self._lock:
+            self._queued -= 1
+            self._active += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        QUEUE_WAIT.observe(waited, pool=self.name)
+
+    def _finished(self) -> None:
+        with self._lock:
+            self._active -= 1
+            self._completed += 1
+
+    def stats(self) -> PoolStats:
+        with self._lock:
+            return PoolStats(
+                name=self.name,
+                size=self.size,
+                active=self._active,
+                queued=self._queued,
+                completed=self._completed,
+                wait_seconds_total=self._wait_total,
+                wait_seconds_max=self._wait_max,
+            )
+
+
+class InstrumentedExecutor(_PoolMetrics):
+    """Named thread pool recording its queue depth and how long calls waited for a worker."""
+
+    def __init__(self, name: str, max_workers: int):
+        super().__init__(name, max_workers)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+
+    def submit(self, fn: Callable[..., T], *args, **kwargs) -> "Future[T]":
+        """Run `fn(*args, **kwargs)` on the pool in a copy of the caller's context, like `asyncio.to_thread`."""
+        enqueued_at = self._enqueued()
+        context = contextvars.copy_context()
+
+        def call() -> T:
+            self._started(enqueued_at)
+            try:
+                return context.run(fn, *args, **kwargs)
+            finally:
+                self._finished()
+
+        future = self._pool.submit(call)
+        future.add_done_callback(lambda f: self._dropped() if f.cancelled() else None)
+        return future
+
+    def map(self, fn: Callable[..., T], *iterables: Iterable) -> Iterator[T]:
+        """Like `Executor.map`: submit `fn` for every item at once, yield the results in order."""
+        futures = [self.submit(fn, *args) for args in zip(*iterables)]
+
+        def results() -> Iterator[T]:
+            try:
+                for future in futures:
+                    yield future.result()
+            finally:
+                for future in futures:
+                    future.cancel()
+        return results()
+
+    async def run(self, fn: Callable[..., T], *args) -> T:
+        """Run `fn(*args)` on the pool and wait for it without blocking the event loop."""
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+class InstrumentedLimiter(_PoolMetrics):
+    """
+    asyncio counterpart of `InstrumentedExecutor` for work that runs on the event loop:
+    at most `limit` holders at a time, use as `async with limiter:`.
+    """
+    def __init__(self, name: str, limit: int):
+        super().__init__(name, limit)
+        self._semaphore = asyncio.Semaphore(limit)
+
+    async def acquire(self) -> None:
+        enqueued_at = self._enqueued()
+        try:
+            await self._semaphore.acquire()
+        except BaseException:
+            self._dropped()
+            raise
+        self._started(enqueued_at)
+
+    def release(self) -> None:
+        self._semaphore.release()
+        self._finished()
+
+    async def __aenter__(self) -> None:
+        await self.acquire()
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.release()
+
+
+class PoolRegistry:
+    """
+    The named executors and limiters of a process, so that slow operations like writes and recipe
+    generation cannot starve latency-critical reads, and their load can be reported in one place.
+    """
+    def __init__(self):
+        self._pools: Dict[str, _PoolMetrics] = {}
+        self._lock = threading.Lock()
+
+    def executor(self, name: str, max_workers: int) -> InstrumentedExecutor:
+        with self._lock:
+            pool = self._pools.get(name)
+            if pool is None:
+                pool = self._pools[name] = InstrumentedExecutor(name, max_workers)
+        assert isinstance(pool, InstrumentedExecutor)
+        return pool
+
+    def limiter(self, name: str, limit: int) -> InstrumentedLimiter:
+        with self._lock:
+            pool = self._pools.get(name)
+            if pool is None:
+                pool = self._pools[name] = InstrumentedLimiter(name, limit)
+        assert isinstance(pool, InstrumentedLimiter)
+        return pool
+
+    def stats(self) -> List[PoolStats]:
+        with self._lock:
+            pools = list(self._pools.values())
+        return [pool.stats() for pool in pools]
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pools = list(self._pools.values())
+        for pool in pools:
+            if isinstance(pool, InstrumentedExecutor):
+                pool.shutdown()
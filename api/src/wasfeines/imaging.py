@@ -0,0 +1,34 @@
+from io import BytesIO
+
+from PIL import Image, ImageOps
+
+def _open(data: bytes) -> Image.Image:
+    image = Image.open(BytesIO(data))
+    # Phone photos are often stored sideways with an EXIF rotation tag
+    return ImageOps.exif_transpose(image)
+
+
+def downscale_jpeg(data: bytes, max_edge: int, quality: int) -> bytes:
+    """
+    Re-encode an image as JPEG whose longer edge is at most `max_edge` pixels.
+
+    Raises PIL.UnidentifiedImageError for data that is not a supported image.
+    """
+    image = _open(data)
+    image.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    out = BytesIO()
+    image.save(out, format="JPEG", quality=quality, optimize=True)
+    return out.getvalue()
+
+
+def downscale_webp(data: bytes, max_edge: int, quality: int) -> tuple[bytes, int, int]:
+    """Re-encode an image as WebP whose longer edge is at most `max_edge` pixels, returning it with its size."""
+    image = _open(data)
+    image.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+    out = BytesIO()
+    image.save(out, format="WEBP", quality=quality, method=4)
+    return out.getvalue(), image.width, image.height
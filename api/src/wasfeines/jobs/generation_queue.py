@@ -0,0 +1,199 @@
+from abc import ABC, abstractmethod
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional
+from uuid import uuid4
+import asyncio
+import hashlib
+import json
+import logging
+import time
+
+from wasfeines.cache import TTLCache
+from wasfeines.llm.anthropic_recipe_service import LLMRecipeService
+from wasfeines.models.draft import DraftMedia, DraftRecipe
+from wasfeines.models.job import GenerationJob, GenerationJobStatus
+from wasfeines.models.recipe import Recipe
+from wasfeines.storage.repository import StorageRepository
+
+log = logging.getLogger(__name__)
+
+@dataclass
+class GenerationTask:
+    job_id: str
+    draft_recipe: DraftRecipe
+    draft_media: List[DraftMedia]
+
+
+def dedupe_key(user_id: str, draft_recipe: DraftRecipe, draft_media: List[DraftMedia]) -> str:
+    """Identical submissions of the same draft, with the same media, share a key."""
+    payload = json.dumps(
+        {
+            "user_id": user_id,
+            "draft_recipe": asdict(draft_recipe),
+            "media": sorted(media.key for media in draft_media if media.exists),
+        },
+        default=str,
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+async def publish_recipe(
+    storage_repository: StorageRepository,
+    user_id: str,
+    draft_recipe: DraftRecipe,
+    draft_media: List[DraftMedia],
+    summary_dict: dict,
+    recipe_html: str,
+) -> Recipe:
+    """Store a generated recipe and remove the user's draft it was generated from."""
+    if not draft_recipe.name:
+        draft_recipe.name = summary_dict["name"]
+    recipe = await storage_repository.put_recipe(
+        recipe=draft_recipe,
+        media=draft_media,
+        recipe_html=recipe_html,
+    )
+    await storage_repository.delete_draft_recipe(user_id=user_id)
+    errors = await storage_repository.delete_draft_media(user_id=user_id)
+    if errors:
+        log.warning(f"Could not delete draft media of {user_id}: {errors}")
+    return recipe
+
+
+class JobQueueBackend(ABC):
+    """Stores generation jobs and hands queued tasks to workers."""
+
+    @abstractmethod
+    async def enqueue(self, job: GenerationJob, task: GenerationTask, key: str) -> GenerationJob:
+        """Store and queue `job`, unless an active job with the same key exists, in which case that job is returned."""
+        raise NotImplementedError()
+
+    @abstractmethod
+    async def dequeue(self) -> GenerationTask:
+        """Wait for the next queued task."""
+        raise NotImplementedError()
+
+    @abstractmethod
+    async def get(self, job_id: str) -> Optional[GenerationJob]:
+        raise NotImplementedError()
+
+    @abstractmethod
+    async def update(self, job: GenerationJob) -> None:
+        raise NotImplementedError()
+
+
+class InMemoryJobQueueBackend(JobQueueBackend):
+    """Process-local backend, finished jobs are kept for `ttl_seconds`."""
+
+    def __init__(self, ttl_seconds: float, max_jobs: int = 10000):
+        self._queue: asyncio.Queue[GenerationTask] = asyncio.Queue()
+        self._jobs: TTLCache[str, GenerationJob] = TTLCache(
+            max_size=max_jobs, ttl_seconds=ttl_seconds, on_evict=lambda job_id, _: self._forget_key(job_id),
+        )
+        # Dedupe keys of active jobs only, entries go when their job finishes or is evicted
+        self._active_by_key: Dict[str, str] = {}
+        self._key_by_job: Dict[str, str] = {}
+
+    def _forget_key(self, job_id: str) -> None:
+        key = self._key_by_job.pop(job_id, None)
+        if key is not None and self._active_by_key.get(key) == job_id:
+            del self._active_by_key[key]
+
+    async def enqueue(self, job: GenerationJob, task: GenerationTask, key: str) -> GenerationJob:
+        active_id = self._active_by_key.get(key)
+        if active_id is not None:
+            active = self._jobs.get(active_id)
+            if active is not None and active.status.is_active:
+                return active
+            self._forget_key(active_id)
+        self._jobs.set(job.id, job)
+        self._active_by_key[key] = job.id
+        self._key_by_job[job.id] = key
+        self._queue.put_nowait(task)
+        return job
+
+    async def dequeue(self) -> GenerationTask:
+        return await self._queue.get()
+
+    async def get(self, job_id: str) -> Optional[GenerationJob]:
+        return self._jobs.get(job_id)
+
+    async def update(self, job: GenerationJob) -> None:
+        self._jobs.set(job.id, job)
+        if not job.status.is_active:
+            self._forget_key(job.id)
+
+
+class GenerationQueue:
+    """
+    Runs recipe generation in the background: workers generate the recipe, store it and clean up the draft,
+    updating the job status along the way.
+    """
+    def __init__(
+        self,
+        backend: JobQueueBackend,
+        storage_repository: StorageRepository,
+        recipe_service: LLMRecipeService,
+        num_workers: int,
+    ):
+        self.backend = backend
+        self.storage_repository = storage_repository
+        self.recipe_service = recipe_service
+        self.num_workers = num_workers
+        self._workers: List[asyncio.Task] = []
+
+    def start(self) -> None:
+        self._workers = [asyncio.create_task(self._work()) for _ in range(self.num_workers)]
+
+    async def stop(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def submit(self, user_id: str, draft_recipe: DraftRecipe, draft_media: List[DraftMedia]) -> GenerationJob:
+        now = time.time()
+        job = GenerationJob(
+            id=str(uuid4()),
+            created_by=user_id,
+            status=GenerationJobStatus.QUEUED,
+            create_timestamp=now,
+            update_timestamp=now,
+        )
+        task = GenerationTask(job_id=job.id, draft_recipe=draft_recipe, draft_media=draft_media)
+        return await self.backend.enqueue(job, task, dedupe_key(user_id, draft_recipe, draft_media))
+
+    async def get(self, job_id: str) -> Optional[GenerationJob]:
+        return await self.backend.get(job_id)
+
+    async def _set_status(self, job: GenerationJob, status: GenerationJobStatus) -> None:
+        job.status = status
+        job.update_timestamp = time.time()
+        await self.backend.update(job)
+
+    async def _work(self) -> None:
+        while True:
+            task = await self.backend.dequeue()
+            await self._run(task)
+
+    async def _run(self, task: GenerationTask) -> None:
+        job = await self.backend.get(task.job_id)
+        if job is None:
+            log.warning(f"Generation job {task.job_id} expired before it was started")
+            return
+        try:
+            await self._set_status(job, GenerationJobStatus.GENERATING)
+            summary_dict, html = await self.recipe_service.generate_recipe_html(task.draft_recipe, task.draft_media)
+            await self._set_status(job, GenerationJobStatus.STORING)
+            job.recipe = await publish_recipe(
+                self.storage_repository, job.created_by, task.draft_recipe, task.draft_media, summary_dict, html,
+            )
+            await self._set_status(job, GenerationJobStatus.SUCCEEDED)
+        except TimeoutError:
+            job.error = "Recipe generation timed out"
+            await self._set_status(job, GenerationJobStatus.FAILED)
+        except Exception as e:
+            log.exception(f"Generation job {job.id} failed")
+            job.error = str(e) or type(e).__name__
+            await self._set_status(job, GenerationJobStatus.FAILED)
@@ -1,15 +1,39 @@
 import asyncio
-from typing import Any, Dict, List
+from typing import Any, AsyncIterator, Dict, List, Optional
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
 from lxml import html
 import json
+import logging
+import time
 
 import anthropic
 
+from wasfeines.executors import PoolRegistry
+from wasfeines.metrics import REGISTRY
 from wasfeines.settings import Settings
 from wasfeines.models.draft import DraftRecipe, DraftMedia
 from wasfeines.models.recipe import Recipe
 from wasfeines.storage.repository import StorageRepository
+from wasfeines.llm.media_preprocessing import MediaPreprocessor, url_image_block
+
+log = logging.getLogger(__name__)
+
+LLM_DURATION = REGISTRY.histogram(
+    "llm_request_duration_seconds", "Time requests to the model took, including the wait for a free slot", ("mode", "outcome"),
+)
+LLM_TOKENS = REGISTRY.counter("llm_tokens", "Tokens used by requests to the model", ("type",))
+
+def parse_summary(recipe_html: str) -> dict:
+    """Return the JSON object of the <summary> tag of generated recipe HTML, or an empty dict."""
+    summary_data = {}
+    try:
+        tree = html.fromstring(recipe_html)
+        summary_text = tree.xpath('//summary/text()')[0]
+        summary_data = json.loads(summary_text)
+    except (IndexError, ValueError) as e:
+        log.warning(f"Error parsing summary: {e}")
+    return summary_data
 
 class LLMRecipeService(ABC):
     async def generate_recipe_html(self, draft_recipe: DraftRecipe, draft_media: List[DraftMedia]) -> tuple[dict, str]:
@@ -20,63 +44,131 @@ class LLMRecipeService(ABC):
     def generate_recipe_html_sync(self, draft_recipe: DraftRecipe, draft_media: List[DraftMedia]) -> tuple[dict, str]:
         pass
 
+    async def stream_recipe_html(self, draft_recipe: DraftRecipe, draft_media: List[DraftMedia]) -> AsyncIterator[str]:
+        """Yield the generated recipe HTML in chunks, services without streaming support yield it at once."""
+        _, recipe_html = await self.generate_recipe_html(draft_recipe, draft_media)
+        yield recipe_html
+
+@contextmanager
+def timed_request(mode: str):
+    """Observe the duration of a request to the model in `LLM_DURATION`, by whether it raised."""
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        LLM_DURATION.observe(time.perf_counter() - start, mode=mode, outcome=outcome)
+
+
+def record_usage(usage: Optional[anthropic.types.Usage]) -> None:
+    if usage is None:
+        return
+    cache_read = usage.cache_read_input_tokens or 0
+    cache_creation = usage.cache_creation_input_tokens or 0
+    LLM_TOKENS.inc(usage.input_tokens, type="input")
+    LLM_TOKENS.inc(usage.output_tokens, type="output")
+    LLM_TOKENS.inc(cache_read, type="cache_read")
+    LLM_TOKENS.inc(cache_creation, type="cache_creation")
+    log.debug(
+        f"Used {usage.input_tokens} input tokens, {cache_read} of them from the prompt cache, "
+        f"and {usage.output_tokens} output tokens"
+    )
+
+MODEL = "claude-3-5-haiku-20241022"
+MAX_TOKENS = 4096
+# Identical for every request, sent as the system prompt so it can be cached
+SYSTEM_PROMPT = """
+You are an expert recipe generator. Your task is to create a complete, detailed recipe based on a provided user draft.
+
+Keep recipes concise and simple. Prefer vegeterian or vegan options, unless the draft is clearly meat-based.
+Put a focus on healthy ingredients and high protein content. Pay also special attention to "User content" in the draft if supplied,
+which may also override these instructions (except formatting).
+
+The draft must include at least one image, everything else is optional. If only an image is provided,
+try to fill in the gaps with reasonable assumptions. The output is a complete recipe in a specific HTML format.
+The output should be a single string, starting with a <summary> tag containing a JSON object with the recipe name.
+The rest of the HTML should be a sequence of <section> tags, each for a specified purpose.
+
+Example Output File START:
+    <summary>
+        {
+            "name": "Vegan Peanut Protein Balls"
+        }
+    </summary>
+    <section class="recipe--header">
+        <h1>Vegan Peanut Protein Balls</h1>
+        <h2>10-15min, Snack</h2>
+    </section>
+
+    <section class="recipe--summary">
+        <p>Quick snack for the week.</p>
+    </section>
+
+    <section class="recipe--ingredients">
+        <h2>Ingredients</h2>
+        <ul>
+            <li>90g Oats</li>
+            <li>65g Mixd Nuts</li>
+            <li>20g Mixed Seeds</li>
+            <li>2 scoops Protein Powder</li>
+            <li>125g Peanutbutter</li>
+            <li>2-3 tbs Milk Alternative</li>
+        </ul>
+    </section>
+
+    <section class="recipe--instructions">
+        <ol>
+            <li>Blend Oats, Nuts ans Seeds.</li>
+            <li>Add Protein Powder, Peanutbutter and milk alternative.</li>
+            <li>Mix till it forms a sticky dough. (May need to add more Mikl) </li>
+            <li>Form balls and keep them in the fridge.</li>
+        </ol>
+    </section>
+Example Output File END.
+"""
+
+
 class AnthropicRecipeService(LLMRecipeService):
-    def __init__(self, settings: Settings, storage_repository: StorageRepository):
+    def __init__(self, settings: Settings, storage_repository: StorageRepository, pools: Optional[PoolRegistry] = None):
         self.client = anthropic.Anthropic(api_key=settings.anthropic_api_key)
+        self.async_client = anthropic.AsyncAnthropic(api_key=settings.anthropic_api_key)
         self.storage_respository = storage_repository
+        pools = pools or PoolRegistry()
+        self.media_preprocessor = MediaPreprocessor(
+            storage_repository,
+            max_edge=settings.llm_image_max_edge,
+            quality=settings.llm_image_quality,
+            cache_size=settings.llm_image_cache_size,
+            pools=pools,
+        ) if settings.llm_inline_images else None
+        self.timeout_seconds = settings.llm_timeout_seconds
+        self.prompt_caching = settings.llm_prompt_caching
+        # Bounds the number of generations in flight per process, excess requests wait for a free slot
+        self._limiter = pools.limiter("llm", settings.llm_max_concurrency)
 
-    def generate_recipe_html_sync(self, draft_recipe: DraftRecipe, draft_media: List[DraftMedia]) -> tuple[dict, str]:
-        main_prompt = {
+    def _image_blocks_sync(self, draft_media: List[DraftMedia]) -> List[Dict[str, Any]]:
+        if self.media_preprocessor is None:
+            return [url_image_block(media) for media in draft_media if media.exists]
+        return self.media_preprocessor.prepare_sync(draft_media)
+
+    async def _image_blocks(self, draft_media: List[DraftMedia]) -> List[Dict[str, Any]]:
+        if self.media_preprocessor is None:
+            return [url_image_block(media) for media in draft_media if media.exists]
+        return await self.media_preprocessor.prepare(draft_media)
+
+    def _system(self) -> List[Dict[str, Any]]:
+        block: Dict[str, Any] = {"type": "text", "text": SYSTEM_PROMPT}
+        if self.prompt_caching:
+            block["cache_control"] = {"type": "ephemeral"}
+        return [block]
+
+    def _build_messages(
+        self, draft_recipe: DraftRecipe, images: List[Dict[str, Any]], current_html: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        draft_prompt = {
             "type": "text",
             "text": f"""
-                You are an expert recipe generator. Your task is to create a complete, detailed recipe based on a provided user draft.
-
-                Keep recipes concise and simple. Prefer vegeterian or vegan options, unless the draft is clearly meat-based. 
-                Put a focus on healthy ingredients and high protein content. Pay also special attention to "User content" below if supplied,
-                which may also override these instructions (except formatting).
-
-                The draft must include at least one image, everything else is optional. If only an image is provided,
-                try to fill in the gaps with reasonable assumptions. The output is a complete recipe in a specific HTML format.
-                The output should be a single string, starting with a <summary> tag containing a JSON object with the recipe name.
-                The rest of the HTML should be a sequence of <section> tags, each for a specified purpose.
-                
-                Example Output File START:
-                    <summary>
-                        {{
-                            "name": "Vegan Peanut Protein Balls"
-                        }}
-                    </summary>
-                    <section class="recipe--header">
-                        <h1>Vegan Peanut Protein Balls</h1>
-                        <h2>10-15min, Snack</h2>
-                    </section>
-
-                    <section class="recipe--summary">
-                        <p>Quick snack for the week.</p>
-                    </section>
-
-                    <section class="recipe--ingredients">
-                        <h2>Ingredients</h2>
-                        <ul>
-                            <li>90g Oats</li>
-                            <li>65g Mixd Nuts</li>
-                            <li>20g Mixed Seeds</li>
-                            <li>2 scoops Protein Powder</li>
-                            <li>125g Peanutbutter</li>
-                            <li>2-3 tbs Milk Alternative</li>
-                        </ul>
-                    </section>
-
-                    <section class="recipe--instructions">
-                        <ol>
-                            <li>Blend Oats, Nuts ans Seeds.</li>
-                            <li>Add Protein Powder, Peanutbutter and milk alternative.</li>
-                            <li>Mix till it forms a sticky dough. (May need to add more Mikl) </li>
-                            <li>Form balls and keep them in the fridge.</li>
-                        </ol>
-                    </section>
-                Example Output File END.
-
                 The draft recipe is as follows (images are provided separately):
 
                 Name: {draft_recipe.name}
@@ -86,35 +178,75 @@ class AnthropicRecipeService(LLMRecipeService):
                 Ratings: {draft_recipe.ratings}
                 """
         }
-        images = [
+        prompt_content = [draft_prompt]
+        if current_html is not None:
+            prompt_content.append({
+                "type": "text",
+                "text": f"The current version of this recipe follows. Keep its content, bring it to the format above:\n\n{current_html}",
+            })
+        return [
             {
-                "type": "image",
-                "source": {
-                    "type": "url",
-                    "url": media.get_url
-                }
-            } for media in draft_media if media.exists
+                "role": "user", "content": prompt_content + images
+            },
         ]
-        prompt_content = [main_prompt] + images
-        message = self.client.messages.create(
-            model="claude-3-5-haiku-20241022",
-            max_tokens=4096,
-            messages=[
-                {
-                    "role": "user", "content": prompt_content
-                },
-            ]
-        )
+
+    def request_params(
+        self, draft_recipe: DraftRecipe, images: List[Dict[str, Any]], current_html: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Parameters of a Messages API request generating `draft_recipe`, or upgrading `current_html` if given.
+        The instructions come first as a system prompt, so that the provider can cache them across requests.
+        """
+        return {
+            "model": MODEL,
+            "max_tokens": MAX_TOKENS,
+            "system": self._system(),
+            "messages": self._build_messages(draft_recipe, images, current_html),
+        }
+
+    def parse_message(self, message: anthropic.types.Message) -> tuple[dict, str]:
+        record_usage(getattr(message, "usage", None))
         final_response = ""
         for block in message.content:
             if block.type == "text":
                 final_response += block.text
-        summary_data = {}
-        try:
-            tree = html.fromstring(final_response)
-            summary_text = tree.xpath('//summary/text()')[0]
-            summary_data = json.loads(summary_text)
-        except (IndexError, ValueError) as e:
-            print(f"Error parsing summary: {e}")
-            pass
-        return summary_data, final_response
\ No newline at end of file
+        return parse_summary(final_response), final_response
+
+    def generate_recipe_html_sync(self, draft_recipe: DraftRecipe, draft_media: List[DraftMedia]) -> tuple[dict, str]:
+        params = self.request_params(draft_recipe, self._image_blocks_sync(draft_media))
+        with timed_request("sync"):
+            message = self.client.messages.create(**params)
+        return self.parse_message(message)
+
+    async def generate_recipe_html(self, draft_recipe: DraftRecipe, draft_media: List[DraftMedia]) -> tuple[dict, str]:
+        """
+        Generate the recipe on the async client without blocking the event loop.
+
+        Raises TimeoutError if waiting for a free slot plus the generation take longer than `llm_timeout_seconds`.
+        """
+        images = await self._image_blocks(draft_media)
+        with timed_request("async"):
+            async with asyncio.timeout(self.timeout_seconds):
+                async with self._limiter:
+                    message = await self.async_client.messages.create(**self.request_params(draft_recipe, images))
+        return self.parse_message(message)
+
+    async def stream_recipe_html(self, draft_recipe: DraftRecipe, draft_media: List[DraftMedia]) -> AsyncIterator[str]:
+        """
+        Yield text deltas as the model produces them.
+
+        Raises TimeoutError if no generation slot frees up within `llm_timeout_seconds`,
+        the same limit applies to the client's network reads.
+        """
+        images = await self._image_blocks(draft_media)
+        with timed_request("stream"):
+            await asyncio.wait_for(self._limiter.acquire(), self.timeout_seconds)
+            try:
+                async with self.async_client.with_options(timeout=self.timeout_seconds).messages.stream(
+                    **self.request_params(draft_recipe, images),
+                ) as stream:
+                    async for text in stream.text_stream:
+                        yield text
+                    record_usage((await stream.get_final_message()).usage)
+            finally:
+                self._limiter.release()
\ No newline at end of file
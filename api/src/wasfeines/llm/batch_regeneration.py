@@ -0,0 +1,140 @@
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional
+import hashlib
+import logging
+import time
+
+from pydantic import TypeAdapter, ValidationError
+
+from wasfeines.llm.anthropic_recipe_service import AnthropicRecipeService
+from wasfeines.llm.media_preprocessing import MediaPreprocessor
+from wasfeines.models.draft import DraftMedia, DraftRecipe
+from wasfeines.models.recipe import Recipe
+from wasfeines.storage.repository import StorageRepository
+
+log = logging.getLogger(__name__)
+
+
+def custom_id(name: str) -> str:
+    """Batch request ID of a recipe, recipe names contain characters that IDs may not."""
+    return "recipe-" + hashlib.sha256(name.encode()).hexdigest()[:32]
+
+
+def draft_from_summary(recipe: Recipe) -> DraftRecipe:
+    """
+    Rebuild the draft a recipe was generated from. Recipes published through the API store their draft
+    as summary, older hand-written summaries have a title, a description, tags and an author instead.
+    """
+    summary = recipe.summary or {}
+    if "created_by" in summary:
+        try:
+            return TypeAdapter(DraftRecipe).validate_python(summary)
+        except ValidationError as e:
+            log.warning(f"Could not read the draft of {recipe.name}, using its summary as is: {e}")
+    title = summary.get("name") or summary.get("title")
+    tags = summary.get("tags") or summary.get("user_tags")
+    return DraftRecipe(
+        name=title if isinstance(title, str) else None,
+        key=None,
+        created_by=str(summary.get("added_by") or summary.get("created_by") or "unknown"),
+        user_content=str(summary["description"]) if summary.get("description") else None,
+        user_tags=[tag for tag in tags if isinstance(tag, str)] if isinstance(tags, list) else None,
+        ratings=None,
+    )
+
+
+def recipe_media(recipe: Recipe) -> List[DraftMedia]:
+    return [
+        DraftMedia(exists=True, name=media.name, key=f"{recipe.name}/{media.name}", get_url=media.content_url, put_url="")
+        for media in recipe.media
+    ]
+
+
+@dataclass
+class BatchOutcome:
+    batch_id: str
+    updated: List[str] = field(default_factory=list)
+    # Error message by recipe name
+    failed: Dict[str, str] = field(default_factory=dict)
+
+
+class BatchRegenerator:
+    """
+    Regenerates published recipes through the Message Batches API: one request per recipe is submitted
+    at once, the batch is polled until it ended, and the HTML of every succeeded recipe is replaced.
+    With `upgrade`, the model also gets the current HTML and keeps its content, for format changes.
+
+    Batches may run for up to a day, longer than presigned URLs live, so images are always sent inline.
+    With `dry_run`, results are checked but no recipe is changed.
+    """
+    def __init__(
+        self,
+        service: AnthropicRecipeService,
+        storage_repository: StorageRepository,
+        media_preprocessor: MediaPreprocessor,
+        poll_seconds: float = 60,
+        sleep: Callable[[float], None] = time.sleep,
+        dry_run: bool = False,
+    ):
+        self.service = service
+        self.storage_repository = storage_repository
+        self.media_preprocessor = media_preprocessor
+        self.poll_seconds = poll_seconds
+        self.sleep = sleep
+        self.dry_run = dry_run
+
+    def build_request(self, recipe: Recipe, upgrade: bool = False) -> Dict[str, Any]:
+        current_html = self.storage_repository.read_media_sync(f"{recipe.name}.html").decode() if upgrade else None
+        images = self.media_preprocessor.prepare_sync(recipe_media(recipe))
+        return {
+            "custom_id": custom_id(recipe.name),
+            "params": self.service.request_params(draft_from_summary(recipe), images, current_html),
+        }
+
+    def submit(self, recipes: Iterable[Recipe], upgrade: bool = False) -> str:
+        requests = [self.build_request(recipe, upgrade) for recipe in recipes]
+        if not requests:
+            raise ValueError("No recipes to regenerate")
+        batch = self.service.client.messages.batches.create(requests=requests)
+        log.info(f"Submitted batch {batch.id} with {len(requests)} recipes")
+        return batch.id
+
+    def wait(self, batch_id: str) -> None:
+        while True:
+            batch = self.service.client.messages.batches.retrieve(batch_id)
+            if batch.processing_status == "ended":
+                return
+            counts = batch.request_counts
+            log.info(f"Batch {batch_id} is {batch.processing_status}, {counts.processing} requests processing")
+            self.sleep(self.poll_seconds)
+
+    def apply(self, batch_id: str, recipes: Iterable[Recipe]) -> BatchOutcome:
+        """Replace the HTML of `recipes` with the succeeded results of an ended batch, unless this is a dry run."""
+        names = {custom_id(recipe.name): recipe.name for recipe in recipes}
+        outcome = BatchOutcome(batch_id=batch_id)
+        for response in self.service.client.messages.batches.results(batch_id):
+            name = names.get(response.custom_id)
+            if name is None:
+                log.warning(f"Batch {batch_id} has a result for an unknown recipe: {response.custom_id}")
+                continue
+            result = response.result
+            if result.type != "succeeded":
+                outcome.failed[name] = result.error.error.message if result.type == "errored" else result.type
+                continue
+            _, recipe_html = self.service.parse_message(result.message)
+            if not recipe_html.strip():
+                outcome.failed[name] = "Empty response"
+            elif self.dry_run:
+                log.info(f"Dry run, not replacing the HTML of {name} with {len(recipe_html)} characters")
+                outcome.updated.append(name)
+            elif self.storage_repository.replace_recipe_html_sync(name, recipe_html):
+                outcome.updated.append(name)
+            else:
+                outcome.failed[name] = "Recipe not found"
+        return outcome
+
+    def run(self, recipes: List[Recipe], upgrade: bool = False, batch_id: Optional[str] = None) -> BatchOutcome:
+        """Submit a batch for `recipes`, or resume the existing `batch_id`, and apply its results."""
+        batch_id = batch_id or self.submit(recipes, upgrade)
+        self.wait(batch_id)
+        return self.apply(batch_id, recipes)
@@ -0,0 +1,125 @@
+"""
+Stand-in for the Anthropic client that answers locally, for tests and for trying the batch flow offline.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from uuid import uuid4
+import json
+
+from anthropic.types import Message
+from anthropic.types.messages import MessageBatch, MessageBatchIndividualResponse
+
+# Roughly the number of characters per token, for plausible usage numbers
+CHARS_PER_TOKEN = 4
+
+
+def echo_recipe(params: Dict[str, Any]) -> str:
+    """Answer with a minimal recipe that repeats the first text block of the request."""
+    content = params["messages"][0]["content"]
+    text = next((block["text"] for block in content if block["type"] == "text"), "")
+    return (
+        f'<summary>{json.dumps({"name": "Fake Recipe"})}</summary>'
+        f'<section class="recipe--header"><h1>Fake Recipe</h1></section>'
+        f'<section class="recipe--summary"><p>{len(text)} characters of instructions.</p></section>'
+    )
+
+
+def _tokens(value: Any) -> int:
+    return len(json.dumps(value)) // CHARS_PER_TOKEN
+
+
+class FakeMessageBatches:
+    """Runs a batch when it is created, it reports as ended after `polls_until_ended` retrievals."""
+    def __init__(self, messages: "FakeMessages", polls_until_ended: int):
+        self._messages = messages
+        self.polls_until_ended = polls_until_ended
+        self._batches: Dict[str, MessageBatch] = {}
+        self._polls: Dict[str, int] = {}
+        self._results: Dict[str, List[MessageBatchIndividualResponse]] = {}
+
+    def create(self, requests: List[Dict[str, Any]], **kwargs: Any) -> MessageBatch:
+        batch_id = f"msgbatch_{uuid4().hex}"
+        results = []
+        for request in requests:
+            try:
+                result = {"type": "succeeded", "message": self._messages.create(**request["params"])}
+            except Exception as e:
+                result = {"type": "errored", "error": {"type": "error", "error": {"type": "api_error", "message": str(e)}}}
+            results.append(MessageBatchIndividualResponse.model_validate({"custom_id": request["custom_id"], "result": result}))
+        created_at = datetime.now(timezone.utc)
+        self._results[batch_id] = results
+        self._polls[batch_id] = 0
+        self._batches[batch_id] = MessageBatch.model_validate({
+            "id": batch_id,
+            "type": "message_batch",
+            "processing_status": "in_progress",
+            "created_at": created_at,
+            "expires_at": created_at + timedelta(days=1),
+            "request_counts": {"processing": len(requests), "succeeded": 0, "errored": 0, "canceled": 0, "expired": 0},
+        })
+        return self._batches[batch_id]
+
+    def retrieve(self, message_batch_id: str, **kwargs: Any) -> MessageBatch:
+        batch = self._batches[message_batch_id]
+        self._polls[message_batch_id] += 1
+        if batch.processing_status != "ended" and self._polls[message_batch_id] >= self.polls_until_ended:
+            results = self._results[message_batch_id]
+            succeeded = sum(1 for response in results if response.result.type == "succeeded")
+            batch = self._batches[message_batch_id] = batch.model_copy(update={
+                "processing_status": "ended",
+                "ended_at": datetime.now(timezone.utc),
+                "request_counts": batch.request_counts.model_copy(update={
+                    "processing": 0, "succeeded": succeeded, "errored": len(results) - succeeded,
+                }),
+            })
+        return batch
+
+    def results(self, message_batch_id: str, **kwargs: Any) -> Iterator[MessageBatchIndividualResponse]:
+        if self._batches[message_batch_id].processing_status != "ended":
+            raise ValueError(f"Batch {message_batch_id} has not ended yet")
+        return iter(self._results[message_batch_id])
+
+
+class FakeMessages:
+    """
+    Answers messages with `respond`, exceptions it raises fail the request. Usage counts system prompts
+    marked as cacheable as cache writes the first time and as cache reads afterwards.
+    """
+    def __init__(self, respond: Callable[[Dict[str, Any]], str], polls_until_ended: int):
+        self.respond = respond
+        self.requests: List[Dict[str, Any]] = []
+        self._cached_prefixes: set[str] = set()
+        self.batches = FakeMessageBatches(self, polls_until_ended)
+
+    def _usage(self, params: Dict[str, Any], text: str) -> Dict[str, int]:
+        system = params.get("system") or []
+        cacheable = isinstance(system, list) and any("cache_control" in block for block in system)
+        usage = {"input_tokens": _tokens(params["messages"]), "output_tokens": len(text) // CHARS_PER_TOKEN}
+        if not cacheable:
+            usage["input_tokens"] += _tokens(system)
+            return usage
+        prefix = json.dumps(system, sort_keys=True)
+        hit = prefix in self._cached_prefixes
+        self._cached_prefixes.add(prefix)
+        usage["cache_read_input_tokens" if hit else "cache_creation_input_tokens"] = _tokens(system)
+        return usage
+
+    def create(self, **params: Any) -> Message:
+        self.requests.append(params)
+        text = self.respond(params)
+        return Message.model_validate({
+            "id": f"msg_{uuid4().hex}",
+            "type": "message",
+            "role": "assistant",
+            "model": params["model"],
+            "content": [{"type": "text", "text": text}],
+            "stop_reason": "end_turn",
+            "stop_sequence": None,
+            "usage": self._usage(params, text),
+        })
+
+
+class FakeAnthropic:
+    """Implements the parts of `anthropic.Anthropic` the recipe service and the batch regeneration use."""
+    def __init__(self, respond: Optional[Callable[[Dict[str, Any]], str]] = None, polls_until_ended: int = 1):
+        self.messages = FakeMessages(respond or echo_recipe, polls_until_ended)
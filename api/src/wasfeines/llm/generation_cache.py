@@ -0,0 +1,157 @@
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import AsyncIterator, List, Optional
+import hashlib
+import json
+import logging
+import os
+import threading
+
+from wasfeines.executors import PoolRegistry
+from wasfeines.llm.anthropic_recipe_service import MODEL, SYSTEM_PROMPT, LLMRecipeService, parse_summary
+from wasfeines.models.draft import DraftMedia, DraftRecipe
+
+log = logging.getLogger(__name__)
+
+# Lookups and writes of the store are short file operations
+STORE_WORKERS = 4
+
+def generation_cache_key(draft_recipe: DraftRecipe, draft_media: List[DraftMedia]) -> str:
+    """
+    Hash of everything that goes into the prompt, and of the model and instructions, so that entries
+    generated by an earlier version of either are not served.
+
+    Media is identified by ETag instead of its presigned URL, which changes between calls,
+    and ratings without their creation date, which changes on every draft save.
+    """
+    payload = json.dumps(
+        {
+            "model": MODEL,
+            "system_prompt": SYSTEM_PROMPT,
+            "name": draft_recipe.name,
+            "created_by": draft_recipe.created_by,
+            "user_content": draft_recipe.user_content,
+            "user_tags": draft_recipe.user_tags,
+            "ratings": [
+                [rating.created_by, rating.rating, rating.comment]
+                for rating in draft_recipe.ratings or []
+            ],
+            "media": [media.etag or media.key for media in draft_media if media.exists],
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class GenerationStore(ABC):
+    @abstractmethod
+    def get(self, key: str) -> Optional[tuple[dict, str]]:
+        raise NotImplementedError()
+
+    @abstractmethod
+    def put(self, key: str, summary: dict, recipe_html: str) -> None:
+        raise NotImplementedError()
+
+
+class DiskGenerationStore(GenerationStore):
+    """
+    Stores one JSON file per generation in `directory`. Once the files exceed `max_bytes`
+    the least recently used ones are evicted, reads refresh a file's modification time.
+    """
+    def __init__(self, directory: Path, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def get(self, key: str) -> Optional[tuple[dict, str]]:
+        path = self._path(key)
+        try:
+            with self._lock:
+                contents = json.loads(path.read_text())
+                os.utime(path)
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            log.warning(f"Discarding corrupt generation cache entry {path}")
+            path.unlink(missing_ok=True)
+            return None
+        return contents["summary"], contents["html"]
+
+    def put(self, key: str, summary: dict, recipe_html: str) -> None:
+        path = self._path(key)
+        tmp_path = path.with_suffix(".tmp")
+        with self._lock:
+            tmp_path.write_text(json.dumps({"summary": summary, "html": recipe_html}))
+            os.replace(tmp_path, path)
+            self._evict()
+
+    def _evict(self) -> None:
+        files = [(entry.stat(), entry) for entry in self.directory.glob("*.json")]
+        total = sum(stat.st_size for stat, _ in files)
+        for stat, entry in sorted(files, key=lambda item: item[0].st_mtime):
+            if total <= self.max_bytes:
+                break
+            entry.unlink(missing_ok=True)
+            total -= stat.st_size
+
+
+class CachingRecipeService(LLMRecipeService):
+    """
+    Serves repeated generations of the same draft from `store` instead of calling `inner` again.
+    """
+    def __init__(self, inner: LLMRecipeService, store: GenerationStore, pools: Optional[PoolRegistry] = None):
+        self.inner = inner
+        self.store = store
+        self._pool = (pools or PoolRegistry()).executor("generation-cache", STORE_WORKERS)
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, key: str) -> Optional[tuple[dict, str]]:
+        cached = self.store.get(key)
+        if cached is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return cached
+
+    def _put(self, key: str, summary: dict, recipe_html: str) -> None:
+        # Publishing needs the name from the summary, retries of a failed generation must call the model again
+        if not summary.get("name"):
+            log.warning(f"Not caching generation {key}, its summary has no name")
+            return
+        self.store.put(key, summary, recipe_html)
+
+    def generate_recipe_html_sync(self, draft_recipe: DraftRecipe, draft_media: List[DraftMedia]) -> tuple[dict, str]:
+        key = generation_cache_key(draft_recipe, draft_media)
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+        summary, recipe_html = self.inner.generate_recipe_html_sync(draft_recipe, draft_media)
+        self._put(key, summary, recipe_html)
+        return summary, recipe_html
+
+    async def generate_recipe_html(self, draft_recipe: DraftRecipe, draft_media: List[DraftMedia]) -> tuple[dict, str]:
+        key = generation_cache_key(draft_recipe, draft_media)
+        cached = await self._pool.run(self._lookup, key)
+        if cached is not None:
+            return cached
+        summary, recipe_html = await self.inner.generate_recipe_html(draft_recipe, draft_media)
+        await self._pool.run(self._put, key, summary, recipe_html)
+        return summary, recipe_html
+
+    async def stream_recipe_html(self, draft_recipe: DraftRecipe, draft_media: List[DraftMedia]) -> AsyncIterator[str]:
+        key = generation_cache_key(draft_recipe, draft_media)
+        cached = await self._pool.run(self._lookup, key)
+        if cached is not None:
+            yield cached[1]
+            return
+        chunks = []
+        async for chunk in self.inner.stream_recipe_html(draft_recipe, draft_media):
+            chunks.append(chunk)
+            yield chunk
+        recipe_html = "".join(chunks)
+        await self._pool.run(self._put, key, parse_summary(recipe_html), recipe_html)
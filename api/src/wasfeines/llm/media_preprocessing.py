@@ -0,0 +1,96 @@
+from typing import Any, Dict, Iterable, List, Optional
+import asyncio
+import base64
+import hashlib
+import logging
+
+from wasfeines.cache import TTLCache
+from wasfeines.executors import PoolRegistry
+from wasfeines.imaging import downscale_jpeg
+from wasfeines.models.draft import DraftMedia
+from wasfeines.storage.repository import StorageRepository
+
+log = logging.getLogger(__name__)
+
+def url_image_block(media: DraftMedia) -> Dict[str, Any]:
+    return {
+        "type": "image",
+        "source": {
+            "type": "url",
+            "url": media.get_url
+        }
+    }
+
+
+class MediaPreprocessor:
+    """
+    Turns draft media into inline base64 image blocks for the model: images are fetched concurrently,
+    downscaled to `max_edge` pixels and re-encoded as JPEG. Processed images are cached by source ETag
+    and identical images are only sent once.
+
+    Media that cannot be processed falls back to a URL block.
+    """
+    def __init__(
+        self,
+        storage_repository: StorageRepository,
+        max_edge: int,
+        quality: int,
+        cache_size: int,
+        max_workers: int = 8,
+        pools: Optional[PoolRegistry] = None,
+    ):
+        self.storage_repository = storage_repository
+        self.max_edge = max_edge
+        self.quality = quality
+        self.cache: TTLCache[tuple[str, int, int], Dict[str, Any]] = TTLCache(max_size=cache_size)
+        self._pool = (pools or PoolRegistry()).executor("media-preprocessing", max_workers)
+
+    def _process(self, media: DraftMedia) -> Dict[str, Any]:
+        cache_key = (media.etag or "", self.max_edge, self.quality)
+        if media.etag:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+        try:
+            data = self.storage_repository.read_media_sync(media.key)
+            jpeg = downscale_jpeg(data, max_edge=self.max_edge, quality=self.quality)
+        except Exception as e:
+            log.warning(f"Could not preprocess {media.key}, sending its URL instead: {e}")
+            return url_image_block(media)
+        block = {
+            "type": "image",
+            "source": {
+                "type": "base64",
+                "media_type": "image/jpeg",
+                "data": base64.b64encode(jpeg).decode(),
+            }
+        }
+        if media.etag:
+            self.cache.set(cache_key, block)
+        return block
+
+    @staticmethod
+    def _unique(draft_media: List[DraftMedia]) -> List[DraftMedia]:
+        # Uploads of the same file share an ETag and are only fetched once
+        return list({media.etag or media.key: media for media in draft_media if media.exists}.values())
+
+    @staticmethod
+    def _dedupe(blocks: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        unique_blocks = []
+        seen = set()
+        for block in blocks:
+            source = block["source"]
+            digest = hashlib.sha256((source.get("data") or source.get("url") or "").encode()).digest()
+            if digest in seen:
+                continue
+            seen.add(digest)
+            unique_blocks.append(block)
+        return unique_blocks
+
+    def prepare_sync(self, draft_media: List[DraftMedia]) -> List[Dict[str, Any]]:
+        futures = [self._pool.submit(self._process, media) for media in self._unique(draft_media)]
+        return self._dedupe(future.result() for future in futures)
+
+    async def prepare(self, draft_media: List[DraftMedia]) -> List[Dict[str, Any]]:
+        blocks = await asyncio.gather(*(self._pool.run(self._process, media) for media in self._unique(draft_media)))
+        return self._dedupe(blocks)
@@ -0,0 +1,66 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+import json
+import logging
+
+log = logging.getLogger(__name__)
+
+@dataclass
+class RecipeStreamEvent:
+    """`event` is "summary" (with `summary` set) or "section" (with `html` set)."""
+    event: str
+    summary: Optional[Dict[str, Any]] = None
+    html: Optional[str] = None
+
+
+@dataclass
+class RecipeStreamParser:
+    """
+    Incrementally parses generated recipe HTML, as produced by the recipe prompt:
+    a <summary> tag with a JSON object, followed by a sequence of <section> tags.
+
+    Feed text chunks as they arrive; every completed summary or section is returned once.
+    """
+    text: str = ""
+    summary: Optional[Dict[str, Any]] = None
+    _position: int = field(default=0, repr=False)
+    _summary_done: bool = field(default=False, repr=False)
+
+    def feed(self, chunk: str) -> List[RecipeStreamEvent]:
+        self.text += chunk
+        events: List[RecipeStreamEvent] = []
+        if not self._summary_done:
+            start = self.text.find("<summary>")
+            end = self.text.find("</summary>", start)
+            if start == -1 or end == -1:
+                # Sections never precede the summary, so wait for it
+                return events
+            self._summary_done = True
+            self._position = end + len("</summary>")
+            try:
+                self.summary = json.loads(self.text[start + len("<summary>"):end])
+                events.append(RecipeStreamEvent(event="summary", summary=self.summary))
+            except ValueError as e:
+                log.warning(f"Error parsing streamed summary: {e}")
+        events.extend(self._sections())
+        return events
+
+    def finish(self) -> List[RecipeStreamEvent]:
+        """Call once the stream ended, returns the sections held back if the text contained no summary."""
+        if self._summary_done:
+            return []
+        self._summary_done = True
+        return self._sections()
+
+    def _sections(self) -> List[RecipeStreamEvent]:
+        events: List[RecipeStreamEvent] = []
+        while True:
+            start = self.text.find("<section", self._position)
+            if start == -1:
+                break
+            end = self.text.find("</section>", start)
+            if end == -1:
+                break
+            self._position = end + len("</section>")
+            events.append(RecipeStreamEvent(event="section", html=self.text[start:self._position]))
+        return events
@@ -1,8 +1,9 @@
-from .recipe import Recipe, Media
+from .recipe import Recipe, Media, MediaVariant
 from .user import User
 
 __all__ = [
     "Recipe",
     "Media",
+    "MediaVariant",
     "User",
 ]
\ No newline at end of file
@@ -12,6 +12,8 @@ class DraftMedia:
     put_url: str
     delete_url: Optional[str] = None
     create_timestamp: Optional[float] = None
+    size: Optional[int] = None
+    etag: Optional[str] = None
 
 @dataclass
 class DraftRecipeResponseModel:
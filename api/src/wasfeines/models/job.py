@@ -0,0 +1,26 @@
+from dataclasses import dataclass
+from enum import Enum
+from typing import Optional
+
+from wasfeines.models.recipe import Recipe
+
+class GenerationJobStatus(str, Enum):
+    QUEUED = "queued"
+    GENERATING = "generating"
+    STORING = "storing"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+    @property
+    def is_active(self) -> bool:
+        return self not in (GenerationJobStatus.SUCCEEDED, GenerationJobStatus.FAILED)
+
+@dataclass
+class GenerationJob:
+    id: str
+    created_by: str
+    status: GenerationJobStatus
+    create_timestamp: float
+    update_timestamp: float
+    recipe: Optional[Recipe] = None
+    error: Optional[str] = None
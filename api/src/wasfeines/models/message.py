@@ -1,5 +1,11 @@
 from dataclasses import dataclass
+from typing import Dict, List
 
 @dataclass
 class MessageResponse:
-    detail: str
\ No newline at end of file
+    detail: str
+
+@dataclass
+class BulkDeleteResponse:
+    deleted: List[str]
+    errors: Dict[str, str]
\ No newline at end of file
@@ -1,10 +1,18 @@
 from dataclasses import dataclass
 from typing import List, Optional, Dict
 
+@dataclass
+class MediaVariant:
+    content_url: str
+    width: int
+    height: int
+
 @dataclass
 class Media:
     name: str
     content_url: str
+    thumbnail: Optional[MediaVariant] = None
+    medium: Optional[MediaVariant] = None
 
 @dataclass
 class Recipe:
@@ -0,0 +1,10 @@
+from dataclasses import dataclass
+from typing import List
+
+from wasfeines.models.recipe import Recipe
+
+@dataclass
+class RecipeSearchResponse:
+    """One page of search results, best matches first, out of `total` matching recipes."""
+    total: int
+    results: List[Recipe]
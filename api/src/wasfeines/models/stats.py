@@ -0,0 +1,30 @@
+from dataclasses import dataclass
+from typing import List
+
+@dataclass
+class PoolStats:
+    """
+    Load of a named executor or concurrency limiter: `queued` calls wait for one of `size` slots,
+    `active` calls hold one. Wait times cover every call started so far.
+    """
+    name: str
+    size: int
+    active: int
+    queued: int
+    completed: int
+    wait_seconds_total: float
+    wait_seconds_max: float
+
+
+@dataclass
+class CoalescingStats:
+    """Calls of a storage operation, `coalesced` of them shared the result of an identical call in flight."""
+    operation: str
+    calls: int
+    coalesced: int
+
+
+@dataclass
+class ServerStats:
+    pools: List[PoolStats]
+    coalescing: List[CoalescingStats]
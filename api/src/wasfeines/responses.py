@@ -0,0 +1,80 @@
+from typing import AsyncIterable, AsyncIterator
+import zlib
+
+import anyio
+from fastapi.responses import FileResponse, Response
+from starlette.datastructures import Headers
+from starlette.types import Receive, Scope, Send
+
+ZERO_COPY_SEND = "http.response.zerocopysend"
+PATH_SEND = "http.response.pathsend"
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against `etag`, as required for GET and HEAD."""
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag.removeprefix("W/") for tag in if_none_match.split(","))
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """Whether an Accept-Encoding header allows gzip, codings with a quality of 0 are refused."""
+    for coding in accept_encoding.split(","):
+        name, _, params = coding.partition(";")
+        if name.strip().lower() in ("gzip", "*"):
+            quality = params.strip().removeprefix("q=")
+            try:
+                return not params.strip() or float(quality) > 0
+            except ValueError:
+                return False
+    return False
+
+
+async def gzip_chunks(chunks: AsyncIterable[bytes], level: int = 6) -> AsyncIterator[bytes]:
+    """Compress a stream into a single gzip member, flushing after every chunk so clients can decode it as it arrives."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    async for chunk in chunks:
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+class MediaFileResponse(FileResponse):
+    """
+    FileResponse that answers matching If-None-Match requests with 304, and lets the ASGI server send
+    the file itself when it supports it: with sendfile through the zero-copy send extension,
+    which also covers single ranges, or by path through the path send extension.
+    Other servers get the file read in chunks, as with FileResponse.
+
+    Requires `stat_result`, so the ETag is known before the response starts.
+    """
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self._extensions = scope.get("extensions") or {}
+        if_none_match = Headers(scope=scope).get("if-none-match")
+        etag = self.headers.get("etag")
+        if if_none_match is not None and etag is not None and etag_matches(if_none_match, etag):
+            headers = {name: self.headers[name] for name in ("etag", "last-modified", "cache-control") if name in self.headers}
+            return await Response(status_code=304, headers=headers)(scope, receive, send)
+        await super().__call__(scope, receive, send)
+
+    async def _send_file(self, send: Send, offset: int, count: int) -> None:
+        file = await anyio.to_thread.run_sync(open, self.path, "rb")
+        try:
+            await send({"type": ZERO_COPY_SEND, "file": file, "offset": offset, "count": count, "more_body": False})
+        finally:
+            file.close()
+
+    async def _handle_simple(self, send: Send, send_header_only: bool) -> None:
+        if send_header_only or not (ZERO_COPY_SEND in self._extensions or PATH_SEND in self._extensions):
+            return await super()._handle_simple(send, send_header_only)
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if ZERO_COPY_SEND in self._extensions:
+            await self._send_file(send, 0, int(self.headers["content-length"]))
+        else:
+            await send({"type": PATH_SEND, "path": str(self.path)})
+
+    async def _handle_single_range(self, send: Send, start: int, end: int, file_size: int, send_header_only: bool) -> None:
+        if send_header_only or ZERO_COPY_SEND not in self._extensions:
+            return await super()._handle_single_range(send, start, end, file_size, send_header_only)
+        self.headers["content-range"] = f"bytes {start}-{end - 1}/{file_size}"
+        self.headers["content-length"] = str(end - start)
+        await send({"type": "http.response.start", "status": 206, "headers": self.raw_headers})
+        await self._send_file(send, start, end - start)
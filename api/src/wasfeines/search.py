@@ -0,0 +1,255 @@
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Set
+import asyncio
+import bisect
+import logging
+import math
+import re
+import threading
+import unicodedata
+
+from lxml import etree, html
+
+from wasfeines.models.recipe import Recipe
+from wasfeines.storage.repository import StorageRepository
+
+log = logging.getLogger(__name__)
+
+# Weight of a term occurrence by the field it occurs in, sections are named after their CSS class
+FIELD_WEIGHTS = {
+    "name": 5.0,
+    "tags": 4.0,
+    "header": 3.0,
+    "ingredients": 2.0,
+}
+DEFAULT_FIELD_WEIGHT = 1.0
+# Sections that do not describe the recipe itself
+SKIPPED_SECTIONS = ("source",)
+# The last query term also matches this many terms it is a prefix of, for search as you type
+MAX_PREFIX_EXPANSIONS = 50
+
+_WORD = re.compile(r"\w+")
+
+
+def normalize(text: str) -> str:
+    """Case and accent insensitive form of `text`, "Käse" and "kase" are the same."""
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in _WORD.findall(normalize(text)) if len(token) > 1]
+
+
+def _strings(value: Any) -> List[str]:
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, list):
+        return [item for item in value if isinstance(item, str)]
+    return []
+
+
+@dataclass
+class RecipeDocument:
+    """Searchable text of a recipe by field, and its tags."""
+    name: str
+    fields: Dict[str, str] = field(default_factory=dict)
+    tags: List[str] = field(default_factory=list)
+
+
+def recipe_document(name: str, summary: Optional[Dict[str, Any]], recipe_html: Optional[str]) -> RecipeDocument:
+    """
+    Collect the searchable text of a recipe: its summary, which is either the draft the recipe was generated
+    from or a hand-written summary with a title, and the text of the sections of its HTML.
+    """
+    summary = summary or {}
+    title = summary.get("name") or summary.get("title") or name.rsplit("/", 1)[-1].removeprefix("recipe_").replace("_", " ")
+    tags = _strings(summary.get("tags")) + _strings(summary.get("user_tags"))
+    fields = {
+        "name": " ".join(_strings(title)),
+        "tags": " ".join(tags),
+        "description": " ".join(_strings(summary.get("description")) + _strings(summary.get("user_content"))),
+    }
+    if recipe_html and recipe_html.strip():
+        try:
+            tree = html.fromstring(recipe_html)
+        except (etree.ParserError, ValueError) as e:
+            log.warning(f"Could not parse HTML of {name}: {e}")
+        else:
+            for section in tree.xpath("//section[@class]"):
+                section_name = section.get("class").split()[0].removeprefix("recipe--")
+                if section_name not in SKIPPED_SECTIONS:
+                    fields[section_name] = " ".join(filter(None, (fields.get(section_name), section.text_content())))
+    return RecipeDocument(
+        name=name,
+        fields={key: value for key, value in fields.items() if value},
+        tags=sorted({normalize(tag.strip()) for tag in tags if tag.strip()}),
+    )
+
+
+class SearchIndex:
+    """
+    Thread-safe in-memory inverted index of recipe documents. Terms map to the recipes they occur in,
+    with occurrences weighted by field. Queries match recipes containing every term, ranked by TF-IDF.
+    """
+    def __init__(self):
+        self._postings: Dict[str, Dict[str, float]] = {}
+        self._doc_terms: Dict[str, List[str]] = {}
+        self._tags: Dict[str, Set[str]] = {}
+        self._doc_tags: Dict[str, List[str]] = {}
+        # Sorted terms for prefix matches, rebuilt on the first prefix search after a change
+        self._vocabulary: Optional[List[str]] = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._doc_terms)
+
+    def __contains__(self, name: str) -> bool:
+        with self._lock:
+            return name in self._doc_terms
+
+    def names(self) -> List[str]:
+        with self._lock:
+            return list(self._doc_terms)
+
+    def upsert(self, document: RecipeDocument) -> None:
+        weights: Counter[str] = Counter()
+        for field_name, text in document.fields.items():
+            weight = FIELD_WEIGHTS.get(field_name, DEFAULT_FIELD_WEIGHT)
+            for term in tokenize(text):
+                weights[term] += weight
+        with self._lock:
+            self._remove(document.name)
+            for term, weight in weights.items():
+                self._postings.setdefault(term, {})[document.name] = weight
+            for tag in document.tags:
+                self._tags.setdefault(tag, set()).add(document.name)
+            self._doc_terms[document.name] = list(weights)
+            self._doc_tags[document.name] = document.tags
+            self._vocabulary = None
+
+    def remove(self, name: str) -> None:
+        with self._lock:
+            self._remove(name)
+
+    def _remove(self, name: str) -> None:
+        for term in self._doc_terms.pop(name, []):
+            postings = self._postings[term]
+            del postings[name]
+            if not postings:
+                del self._postings[term]
+                self._vocabulary = None
+        for tag in self._doc_tags.pop(name, []):
+            names = self._tags[tag]
+            names.discard(name)
+            if not names:
+                del self._tags[tag]
+
+    def _expand(self, prefix: str) -> List[str]:
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self._postings)
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        terms = []
+        for term in self._vocabulary[start:start + MAX_PREFIX_EXPANSIONS]:
+            if not term.startswith(prefix):
+                break
+            terms.append(term)
+        return terms
+
+    def _scores(self, terms: Iterable[str]) -> Dict[str, float]:
+        """Scores of the recipes containing any of `terms`, alternatives for the same query term."""
+        scores: Dict[str, float] = {}
+        num_docs = len(self._doc_terms)
+        for term in terms:
+            postings = self._postings.get(term, {})
+            idf = math.log(1 + num_docs / len(postings)) if postings else 0.0
+            for name, weight in postings.items():
+                scores[name] = max(scores.get(name, 0.0), weight * idf)
+        return scores
+
+    def search(self, query: str, tags: Iterable[str] = (), prefix: bool = True) -> List[str]:
+        """
+        Names of the recipes matching all terms of `query` and all `tags`, best matches first.
+        With `prefix`, the last term also matches longer terms. An empty query matches every recipe.
+        """
+        terms = tokenize(query)
+        with self._lock:
+            groups = [[term] for term in terms]
+            if groups and prefix:
+                groups[-1] = [terms[-1], *self._expand(terms[-1])]
+            candidates: Optional[Dict[str, float]] = None
+            # Start with the rarest term, so the candidates only shrink from there
+            for scores in sorted((self._scores(group) for group in groups), key=len):
+                if candidates is None:
+                    candidates = scores
+                else:
+                    candidates = {name: score + scores[name] for name, score in candidates.items() if name in scores}
+                if not candidates:
+                    return []
+            if candidates is None:
+                candidates = dict.fromkeys(self._doc_terms, 0.0)
+            for tag in tags:
+                tagged = self._tags.get(normalize(tag.strip()), set())
+                candidates = {name: score for name, score in candidates.items() if name in tagged}
+        return sorted(candidates, key=lambda name: (-candidates[name], name))
+
+
+class RecipeSearch:
+    """
+    Keeps a `SearchIndex` in step with a repository's recipes. Before a search, the index is brought up to
+    date if the repository's catalog version changed: recipes whose fingerprint changed, because they are new
+    or their summary or HTML changed, are indexed with the text of their HTML, removed recipes are dropped.
+    Only the recipes of the returned page are built, so results carry the same URLs as `GET /recipes`.
+    """
+    def __init__(self, storage_repository: StorageRepository, index: Optional[SearchIndex] = None):
+        self.storage_repository = storage_repository
+        self.index = index or SearchIndex()
+        self._fingerprints: Dict[str, str] = {}
+        self._version: Optional[str] = None
+        self._sync_lock = asyncio.Lock()
+
+    async def _document(self, name: str, summary: Optional[Dict[str, Any]]) -> RecipeDocument:
+        try:
+            recipe_html = (await self.storage_repository.read_media(f"{name}.html")).decode()
+        except Exception as e:
+            log.warning(f"Could not read HTML of {name}, indexing its summary only: {e}")
+            recipe_html = None
+        return recipe_document(name, summary, recipe_html)
+
+    async def sync(self) -> None:
+        async with self._sync_lock:
+            version = await self.storage_repository.catalog_version()
+            if version is not None and version == self._version:
+                return
+            fingerprints = await self.storage_repository.recipe_fingerprints()
+            changed = [name for name, fingerprint in fingerprints.items() if self._fingerprints.get(name) != fingerprint]
+            summaries = await self.storage_repository.recipe_summaries(changed)
+            documents = await asyncio.gather(*(self._document(name, summary) for name, summary in summaries.items()))
+            for document in documents:
+                self.index.upsert(document)
+            for name in self._fingerprints.keys() - fingerprints.keys():
+                self.index.remove(name)
+            for name in changed:
+                if name not in summaries:
+                    # Deleted while syncing
+                    self.index.remove(name)
+                    del fingerprints[name]
+            self._fingerprints = fingerprints
+            self._version = version
+            if changed:
+                log.info(f"Indexed {len(changed)} recipes, {len(fingerprints)} in total")
+
+    async def warm_up(self) -> None:
+        """Build the index ahead of the first search, which would otherwise read every recipe's HTML."""
+        try:
+            await self.sync()
+        except Exception:
+            log.exception("Could not build the search index, it will be built on first search")
+
+    async def search(self, query: str, tags: Iterable[str], limit: int, offset: int) -> tuple[List[Recipe], int]:
+        """Return one page of matching recipes and the total number of matches."""
+        await self.sync()
+        names = self.index.search(query, tags)
+        return await self.storage_repository.get_recipes(names[offset:offset + limit]), len(names)
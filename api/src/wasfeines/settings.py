@@ -1,16 +1,22 @@
+from typing import Literal, Optional
+
 from pydantic import (
     Field,
+    model_validator,
 )
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
-    s3_bucket: str = Field(alias='S3_BUCKET')
-    s3_access_key: str = Field(alias='S3_ACCESS_KEY')
-    s3_secret_key: str = Field(alias='S3_SECRET_ACCESS_KEY')
-    s3_region: str = Field(alias='S3_REGION')
-    s3_endpoint_url: str = Field(alias='S3_ENDPOINT_URL')
-    s3_bucket_base_path: str = Field(alias='S3_BUCKET_BASE_PATH')
+    storage_backend: Literal['s3', 's3_threads', 'filesystem'] = Field(alias='STORAGE_BACKEND', default='s3_threads', description="Where recipes and media are stored: 's3_threads' with boto3 on a thread pool, 's3' on asyncio without botocore's retries on throttling and server errors, or 'filesystem'")
+    content_dir: str = Field(alias='CONTENT_DIR', default='../content', description="Root directory of the filesystem storage backend")
+    media_url_prefix: str = Field(alias='MEDIA_URL_PREFIX', default='/api/v1/media', description="URL path the filesystem storage backend serves media from")
+    s3_bucket: Optional[str] = Field(alias='S3_BUCKET', default=None)
+    s3_access_key: Optional[str] = Field(alias='S3_ACCESS_KEY', default=None)
+    s3_secret_key: Optional[str] = Field(alias='S3_SECRET_ACCESS_KEY', default=None)
+    s3_region: Optional[str] = Field(alias='S3_REGION', default=None)
+    s3_endpoint_url: Optional[str] = Field(alias='S3_ENDPOINT_URL', default=None)
+    s3_bucket_base_path: Optional[str] = Field(alias='S3_BUCKET_BASE_PATH', default=None)
     s3_draft_folder: str = Field(alias='S3_DRAFT_FOLDER', default='drafts')
     debug: bool = Field(alias='DEBUG', default=False)
     oidc_client_id: str = Field(alias='OIDC_CLIENT_ID')
@@ -18,7 +24,47 @@ class Settings(BaseSettings):
     oidc_domain: str = Field(alias='OIDC_DOMAIN')
     oidc_redirect_uri: str = Field(alias='OIDC_REDIRECT_URI')
     app_secret_key: str = Field(alias='APP_SECRET_KEY')
-    max_num_draft_media: int = Field(alias='MAX_NUM_DRAFT_MEDIA', default=10, description="Number of draft media items to send to client on request")
+    max_num_draft_media: int = Field(alias='MAX_NUM_DRAFT_MEDIA', default=10, description="Maximum number of media items in a draft")
     anthropic_api_key: str = Field(alias='ANTHROPIC_API_KEY')
+    draft_cache_size: int = Field(alias='DRAFT_CACHE_SIZE', default=1000, description="Number of draft recipes kept in memory")
+    draft_write_delay_seconds: float = Field(alias='DRAFT_WRITE_DELAY_SECONDS', default=2, description="Seconds to collect draft recipe saves before writing the latest one, 0 writes every save")
+    llm_max_concurrency: int = Field(alias='LLM_MAX_CONCURRENCY', default=8, description="Maximum number of concurrent recipe generations per process")
+    llm_prompt_caching: bool = Field(alias='LLM_PROMPT_CACHING', default=True, description="Mark the recipe instructions as cacheable, so repeated requests reuse them")
+    llm_timeout_seconds: float = Field(alias='LLM_TIMEOUT_SECONDS', default=120, description="Maximum seconds a recipe generation may wait and run")
+    s3_max_pool_connections: int = Field(alias='S3_MAX_POOL_CONNECTIONS', default=32, description="Size of the S3 connection pool, also used as the number of parallel S3 reads")
+    storage_read_workers: int = Field(alias='STORAGE_READ_WORKERS', default=16, description="Number of concurrent storage reads such as listings and draft lookups")
+    storage_write_workers: int = Field(alias='STORAGE_WRITE_WORKERS', default=8, description="Number of concurrent storage writes such as publishing and deleting recipes")
+    s3_connect_timeout: float = Field(alias='S3_CONNECT_TIMEOUT', default=5, description="Seconds to wait for an S3 connection to be established")
+    s3_read_timeout: float = Field(alias='S3_READ_TIMEOUT', default=30, description="Seconds to wait for an S3 response")
+    s3_multipart_copy_threshold: int = Field(alias='S3_MULTIPART_COPY_THRESHOLD', default=16 * 1024 * 1024, description="Objects of at least this many bytes are copied in parts")
+    s3_multipart_copy_part_size: int = Field(alias='S3_MULTIPART_COPY_PART_SIZE', default=16 * 1024 * 1024, description="Part size of multipart copies, at least 5 MiB")
+    media_variants_enabled: bool = Field(alias='MEDIA_VARIANTS_ENABLED', default=True, description="Store thumbnail and medium WebP variants of recipe media on publish")
+    presigned_url_expiry_seconds: int = Field(alias='PRESIGNED_URL_EXPIRY_SECONDS', default=3600, description="Validity of presigned S3 URLs")
+    presigned_url_refresh_margin_seconds: int = Field(alias='PRESIGNED_URL_REFRESH_MARGIN_SECONDS', default=600, description="Presigned URLs are re-signed once they are this close to expiry")
+    presigned_url_cache_size: int = Field(alias='PRESIGNED_URL_CACHE_SIZE', default=10000, description="Maximum number of presigned URLs kept in memory")
+    llm_inline_images: bool = Field(alias='LLM_INLINE_IMAGES', default=True, description="Downscale draft images and send them inline instead of as URLs")
+    llm_image_max_edge: int = Field(alias='LLM_IMAGE_MAX_EDGE', default=1568, description="Longer edge in pixels of images sent to the model")
+    llm_image_quality: int = Field(alias='LLM_IMAGE_QUALITY', default=85, description="JPEG quality of images sent to the model")
+    llm_image_cache_size: int = Field(alias='LLM_IMAGE_CACHE_SIZE', default=128, description="Number of preprocessed images kept in memory")
+    recipe_content_cache_size: int = Field(alias='RECIPE_CONTENT_CACHE_SIZE', default=1000, description="Number of recipe HTML bodies kept in memory for recipe bundles")
+    generation_cache_dir: str = Field(alias='GENERATION_CACHE_DIR', default='', description="Directory of the generated recipe cache, preferably absolute, empty to disable it")
+    generation_cache_max_bytes: int = Field(alias='GENERATION_CACHE_MAX_BYTES', default=256 * 1024 * 1024, description="Size limit of the generated recipe cache")
+    generation_workers: int = Field(alias='GENERATION_WORKERS', default=4, description="Number of background workers running recipe generation jobs")
+    generation_job_ttl_seconds: float = Field(alias='GENERATION_JOB_TTL_SECONDS', default=3600, description="How long generation jobs can be polled")
+    catalog_refresh_seconds: float = Field(alias='CATALOG_REFRESH_SECONDS', default=300, description="Maximum age of the in-memory recipe catalog before it is rebuilt from S3")
+    metrics_token: str = Field(alias='METRICS_TOKEN', default='', description="Bearer token scrapers send to read /metrics, empty to disable the route")
+    catalog_manifest_enabled: bool = Field(alias='CATALOG_MANIFEST_ENABLED', default=False, description="Keep the catalog in a single manifest object instead of listing the bucket, only enable it if the store supports conditional writes")
+
+    model_config = SettingsConfigDict(env_file='.env', env_file_encoding='utf-8')
 
-    model_config = SettingsConfigDict(env_file='.env', env_file_encoding='utf-8')
\ No newline at end of file
+    @model_validator(mode='after')
+    def check_storage_settings(self) -> 'Settings':
+        if self.storage_backend != 'filesystem':
+            missing = [
+                field.alias for name, field in type(self).model_fields.items()
+                if name in ('s3_bucket', 's3_access_key', 's3_secret_key', 's3_region', 's3_endpoint_url', 's3_bucket_base_path')
+                and getattr(self, name) is None
+            ]
+            if missing:
+                raise ValueError(f"Missing S3 settings: {', '.join(missing)}")
+        return self
\ No newline at end of file
@@ -0,0 +1,75 @@
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, TypeVar
+import asyncio
+import functools
+
+from wasfeines.models.stats import CoalescingStats
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent async calls: while a call for a key is in flight, further calls for
+    the same key wait for it and share its result or exception. Keys start with the operation name,
+    which the counters are grouped by.
+
+    Callers receive the same result object, so results must not be modified.
+    """
+    def __init__(self):
+        self._flights: Dict[tuple, asyncio.Future] = {}
+        self._calls: Dict[str, int] = {}
+        self._coalesced: Dict[str, int] = {}
+
+    async def do(self, key: tuple, fn: Callable[[], Awaitable[T]]) -> T:
+        operation = key[0]
+        self._calls[operation] = self._calls.get(operation, 0) + 1
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = self._flights[key] = asyncio.ensure_future(fn())
+            flight.add_done_callback(lambda done: self._land(key, done))
+        else:
+            self._coalesced[operation] = self._coalesced.get(operation, 0) + 1
+        # A cancelled caller must not cancel the call for the others
+        return await asyncio.shield(flight)
+
+    def _land(self, key: tuple, flight: asyncio.Future) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        # Callers get the exception through their shields, if all of them were cancelled nobody does
+        if not flight.cancelled():
+            flight.exception()
+
+    def forget(self, operations: Iterable[str]) -> None:
+        """Let later calls of `operations` start new calls instead of joining those in flight."""
+        for key in [key for key in self._flights if key[0] in operations]:
+            del self._flights[key]
+
+    def stats(self) -> List[CoalescingStats]:
+        return [
+            CoalescingStats(operation=operation, calls=calls, coalesced=self._coalesced.get(operation, 0))
+            for operation, calls in sorted(self._calls.items())
+        ]
+
+
+def coalesced(method: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+    """Decorator for async methods of objects with a `flights` SingleFlight, arguments must be hashable."""
+    @functools.wraps(method)
+    async def wrapper(self: Any, *args: Hashable) -> T:
+        return await self.flights.do((method.__name__, *args), lambda: method(self, *args))
+    return wrapper
+
+
+def invalidates(*operations: str) -> Callable[[Callable[..., Awaitable[T]]], Callable[..., Awaitable[T]]]:
+    """
+    Decorator for async methods of objects with a `flights` SingleFlight that change what `operations`
+    return: calls made after the method returned never share a result read before.
+    """
+    def decorator(method: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+        @functools.wraps(method)
+        async def wrapper(self: Any, *args: Any, **kwargs: Any) -> T:
+            try:
+                return await method(self, *args, **kwargs)
+            finally:
+                self.flights.forget(operations)
+        return wrapper
+    return decorator
@@ -0,0 +1,502 @@
+from dataclasses import asdict
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, TYPE_CHECKING
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import os
+from urllib.parse import quote
+
+from botocore.auth import S3SigV4Auth
+from botocore.awsrequest import HeadersDict, create_request_object, prepare_request_dict
+from botocore.credentials import Credentials
+from botocore.exceptions import ClientError
+from botocore.parsers import create_parser
+from botocore.serialize import create_serializer
+import botocore.session
+from pydantic import TypeAdapter
+from PIL import UnidentifiedImageError
+import httpx
+if TYPE_CHECKING:
+    from mypy_boto3_s3.client import S3Client
+    from mypy_boto3_s3.type_defs import ObjectTypeDef
+
+from wasfeines.executors import PoolRegistry
+from wasfeines.models.draft import DraftMedia, DraftRecipe
+from wasfeines.models.recipe import Recipe
+from wasfeines.settings import Settings
+from wasfeines.singleflight import coalesced, invalidates
+from wasfeines.storage.catalog import (
+    CatalogEntry,
+    build_entries,
+    decode_cursor,
+    encode_cursor,
+    entries_from_manifest,
+    entries_to_manifest,
+)
+from wasfeines.storage.media_variants import build_variants
+from wasfeines.storage.repository import (
+    DELETE_BATCH_SIZE,
+    MANIFEST_WRITE_ATTEMPTS,
+    NOT_MODIFIED_CODES,
+    RECIPE_LISTINGS,
+    S3_ERRORS,
+    S3_REQUESTS,
+    WRITE_CONFLICT_CODES,
+    S3StorageRepository,
+    apply_changes,
+    current_method,
+    error_code,
+    part_ranges,
+)
+
+log = logging.getLogger(__name__)
+
+# Operations limited by `STORAGE_READ_WORKERS`, all others by `STORAGE_WRITE_WORKERS`
+READ_OPERATIONS = frozenset({"GetObject", "HeadObject", "ListObjectsV2"})
+
+class AsyncS3Client:
+    """
+    Minimal asyncio S3 client. Requests are serialized, signed and parsed by botocore with the operation
+    models of a regular boto3 client, and sent with httpx over a single connection pool.
+
+    Calls take the same parameters and return the same dictionaries as the boto3 client, except that
+    streaming bodies are returned as bytes. Errors are raised as the boto3 client's exception classes.
+    Buckets are addressed path-style.
+    """
+    def __init__(self, s3: "S3Client", credentials: Credentials, http: httpx.AsyncClient, max_concurrency: int):
+        self.s3 = s3
+        self.credentials = credentials
+        self.http = http
+        # A model of its own: boto3 strips the bucket from the request URIs of its model once it resolves endpoints
+        service_model = botocore.session.get_session().get_service_model("s3")
+        self._service_model = service_model
+        self._serializer = create_serializer(service_model.metadata["protocol"], include_validation=True)
+        self._parser = create_parser(service_model.metadata["protocol"])
+        # Fan-out waits here rather than in the connection pool, whose wait is bounded by a timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    def _prepare(self, operation_model, params: Dict[str, Any]):
+        request_dict = self._serializer.serialize_to_request(params, operation_model)
+        prepare_request_dict(request_dict, self.s3.meta.endpoint_url)
+        if operation_model.http_checksum.get("requestChecksumRequired"):
+            body = request_dict["body"]
+            body = body.encode() if isinstance(body, str) else body
+            request_dict["headers"]["Content-MD5"] = base64.b64encode(hashlib.md5(body).digest()).decode()
+        request = create_request_object(request_dict)
+        S3SigV4Auth(self.credentials, "s3", self.s3.meta.region_name).add_auth(request)
+        return request.prepare()
+
+    async def call(self, operation_name: str, **params: Any) -> Dict[str, Any]:
+        operation_model = self._service_model.operation_model(operation_name)
+        request = self._prepare(operation_model, params)
+        async with self._semaphore:
+            response = await self.http.request(
+                request.method, request.url, headers=dict(request.headers.items()), content=request.body,
+            )
+        streaming = operation_model.has_streaming_output and response.status_code < 300
+        parsed = self._parser.parse(
+            {
+                "status_code": response.status_code,
+                "headers": HeadersDict(response.headers.items()),
+                "body": b"" if streaming else response.content,
+            },
+            operation_model.output_shape,
+        )
+        if "Error" in parsed:
+            raise self.s3.exceptions.from_code(parsed["Error"].get("Code", str(response.status_code)))(parsed, operation_name)
+        if streaming:
+            parsed[operation_model.output_shape.serialization["payload"]] = response.content
+        return parsed
+
+
+class AsyncS3StorageRepository(S3StorageRepository):
+    """
+    S3 backend whose async methods run on the event loop instead of pushing boto3 calls onto threads.
+    Fan-out work, like fetching summaries, copying media and deleting batches, runs as concurrent tasks
+    sharing one connection pool of `S3_MAX_POOL_CONNECTIONS` connections.
+
+    The blocking `*_sync` methods are inherited unchanged, for the CLI and for code already running in threads.
+    """
+    def __init__(
+        self,
+        settings: Settings,
+        pools: Optional[PoolRegistry] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        super().__init__(settings, pools)
+        self.http = httpx.AsyncClient(
+            transport=transport or httpx.AsyncHTTPTransport(
+                retries=2,
+                limits=httpx.Limits(
+                    max_connections=settings.s3_max_pool_connections,
+                    max_keepalive_connections=settings.s3_max_pool_connections,
+                ),
+            ),
+            timeout=httpx.Timeout(settings.s3_read_timeout, connect=settings.s3_connect_timeout),
+        )
+        self.client = AsyncS3Client(
+            self.s3,
+            Credentials(settings.s3_access_key, settings.s3_secret_key),
+            self.http,
+            max_concurrency=settings.s3_max_pool_connections,
+        )
+        # No threads here: reads and writes are limited separately on the loop, as the thread pools do for the sync backend
+        self.read_limiter = self.pools.limiter("s3-read", settings.storage_read_workers)
+        self.write_limiter = self.pools.limiter("s3-write", settings.storage_write_workers)
+        # Rendering media variants is CPU-bound
+        self.variant_pool = self.pools.executor("media-variants", os.cpu_count() or 4)
+        self._catalog_refresh_alock = asyncio.Lock()
+
+    async def aclose(self) -> None:
+        await self.drafts.flush()
+        await self.http.aclose()
+        self.variant_pool.shutdown()
+        self.close()
+
+    async def _call(self, operation_name: str, **params: Any) -> Dict[str, Any]:
+        limiter = self.read_limiter if operation_name in READ_OPERATIONS else self.write_limiter
+        async with limiter:
+            method = current_method.get()
+            S3_REQUESTS.inc(method=method, operation=operation_name)
+            try:
+                return await self.client.call(operation_name, Bucket=self.settings.s3_bucket, **params)
+            except ClientError as e:
+                S3_ERRORS.inc(method=method, operation=operation_name, code=error_code(e) or "Unknown")
+                raise
+            except Exception as e:
+                S3_ERRORS.inc(method=method, operation=operation_name, code=type(e).__name__)
+                raise
+
+    async def _iter_objects(self, prefix: str) -> AsyncIterator["ObjectTypeDef"]:
+        params: Dict[str, Any] = {"Prefix": prefix}
+        while True:
+            page = await self._call("ListObjectsV2", **params)
+            for obj in page.get("Contents", []):
+                if "Key" in obj:
+                    yield obj
+            if not page.get("IsTruncated"):
+                return
+            params["ContinuationToken"] = page["NextContinuationToken"]
+
+    async def _list(self, prefix: str) -> List["ObjectTypeDef"]:
+        return [obj async for obj in self._iter_objects(prefix)]
+
+    async def _load_summary_async(self, key: str) -> Optional[dict]:
+        return json.loads((await self._call("GetObject", Key=key))["Body"])
+
+    async def _scan_entries_async(self) -> Dict[str, CatalogEntry]:
+        entries = build_entries(await self._list(self.settings.s3_bucket_base_path))
+        to_fetch = self._reuse_summaries(entries)
+        summaries = await asyncio.gather(*(self._load_summary_async(entry.json_key) for entry in to_fetch))
+        for entry, summary in zip(to_fetch, summaries):
+            entry.summary = summary
+        return entries
+
+    async def _read_manifest_async(self) -> Optional[tuple[dict, str]]:
+        try:
+            resp = await self._call("GetObject", Key=self._manifest_key())
+        except self.s3.exceptions.NoSuchKey:
+            return None
+        return json.loads(resp["Body"]), resp["ETag"]
+
+    async def _write_manifest_async(self, entries: Iterable[CatalogEntry], version: int, etag: Optional[str]) -> bool:
+        condition = {"IfMatch": etag} if etag is not None else {"IfNoneMatch": "*"}
+        try:
+            resp = await self._call(
+                "PutObject",
+                Key=self._manifest_key(),
+                Body=json.dumps(entries_to_manifest(entries, version)),
+                ContentType="application/json",
+                **condition,
+            )
+        except ClientError as e:
+            if error_code(e) in WRITE_CONFLICT_CODES:
+                return False
+            raise
+        self._manifest_etag = resp.get("ETag")
+        return True
+
+    async def _reconcile_once_async(self) -> Optional[int]:
+        current = await self._read_manifest_async()
+        version, etag = (current[0]["version"], current[1]) if current is not None else (0, None)
+        entries = await self._scan_entries_async()
+        self.catalog.replace(entries)
+        if not await self._write_manifest_async(entries.values(), version + 1, etag):
+            return None
+        self._manifest_dirty = False
+        return len(entries)
+
+    async def reconcile_manifest(self) -> int:
+        for _ in range(MANIFEST_WRITE_ATTEMPTS):
+            recipes = await self._reconcile_once_async()
+            if recipes is not None:
+                return recipes
+        raise RuntimeError(f"Catalog manifest changed concurrently {MANIFEST_WRITE_ATTEMPTS} times while reconciling")
+
+    async def _reconcile_on_refresh_async(self) -> None:
+        try:
+            await self._reconcile_once_async()
+        except Exception:
+            log.exception("Could not write the catalog manifest, serving the catalog from a listing until it is")
+            self._manifest_dirty = True
+            if self.catalog.is_stale():
+                self.catalog.replace(await self._scan_entries_async())
+
+    async def _update_manifest_async(self, upserts: List[CatalogEntry], removals: List[str]) -> None:
+        try:
+            for _ in range(MANIFEST_WRITE_ATTEMPTS):
+                current = await self._read_manifest_async()
+                if current is None:
+                    await self.reconcile_manifest()
+                    return
+                manifest, etag = current
+                entries = apply_changes(entries_from_manifest(manifest), upserts, removals)
+                if await self._write_manifest_async(entries.values(), manifest["version"] + 1, etag):
+                    self.catalog.replace(entries)
+                    return
+            log.error(f"Catalog manifest changed concurrently {MANIFEST_WRITE_ATTEMPTS} times, it is rebuilt on the next refresh")
+        except Exception:
+            log.exception("Could not update the catalog manifest, it is rebuilt on the next refresh")
+        self._manifest_dirty = True
+
+    async def refresh_catalog(self) -> None:
+        if not self.settings.catalog_manifest_enabled:
+            self.catalog.replace(await self._scan_entries_async())
+            return
+        if self._manifest_dirty:
+            await self._reconcile_on_refresh_async()
+            return
+        try:
+            resp = await self._call(
+                "GetObject",
+                Key=self._manifest_key(),
+                **({"IfNoneMatch": self._manifest_etag} if self._manifest_etag else {}),
+            )
+        except self.s3.exceptions.NoSuchKey:
+            await self._reconcile_on_refresh_async()
+            return
+        except ClientError as e:
+            if error_code(e) not in NOT_MODIFIED_CODES:
+                raise
+            self.catalog.touch()
+            return
+        self.catalog.replace(entries_from_manifest(json.loads(resp["Body"])))
+        self._manifest_etag = resp["ETag"]
+
+    async def _ensure_catalog_async(self) -> None:
+        if not self.catalog.is_stale():
+            return
+        async with self._catalog_refresh_alock:
+            if self.catalog.is_stale():
+                await self.refresh_catalog()
+
+    async def warm_up(self) -> None:
+        await self._ensure_catalog_async()
+
+    @coalesced
+    async def recipes_etag(self) -> Optional[str]:
+        await self._ensure_catalog_async()
+        return self._recipes_etag()
+
+    async def html_etags(self, names: List[str]) -> Dict[str, Optional[str]]:
+        await self._ensure_catalog_async()
+        return self._html_etags(names)
+
+    @coalesced
+    async def catalog_version(self) -> Optional[str]:
+        await self._ensure_catalog_async()
+        return self.catalog.version()
+
+    @coalesced
+    async def recipe_fingerprints(self) -> Dict[str, str]:
+        await self._ensure_catalog_async()
+        return self._recipe_fingerprints()
+
+    async def recipe_summaries(self, names: List[str]) -> Dict[str, Optional[dict]]:
+        await self._ensure_catalog_async()
+        return {entry.name: entry.summary for entry in self._catalog_entries(names)}
+
+    async def get_recipes(self, names: List[str]) -> List[Recipe]:
+        await self._ensure_catalog_async()
+        return [self._to_recipe(entry) for entry in self._catalog_entries(names)]
+
+    @coalesced
+    async def list_recipes(self) -> List[Recipe]:
+        await self._ensure_catalog_async()
+        return [self._to_recipe(entry) for entry in self.catalog.entries()]
+
+    @coalesced
+    async def list_recipes_page(self, limit: int, cursor: Optional[str] = None) -> tuple[List[Recipe], Optional[str]]:
+        after = decode_cursor(cursor) if cursor else None
+        await self._ensure_catalog_async()
+        entries, has_more = self.catalog.page(limit, after)
+        next_cursor = encode_cursor(entries[-1].name) if has_more and entries else None
+        return [self._to_recipe(entry) for entry in entries], next_cursor
+
+    async def _put_async(self, key: str, body: str | bytes, content_type: str) -> Optional[str]:
+        resp = await self._call("PutObject", Key=key, Body=body, ContentType=content_type)
+        return resp.get("ETag")
+
+    async def _copy_objects_async(self, copies: List[tuple[str, str, Optional[int]]]) -> None:
+        """Async counterpart of `_copy_objects`, every request is a task of its own."""
+        threshold = self.settings.s3_multipart_copy_threshold
+
+        needs_head = [source for source, _, size in copies if size is None or size >= threshold]
+        heads = dict(zip(needs_head, await asyncio.gather(*(self._call("HeadObject", Key=source) for source in needs_head))))
+        small = [(source, dest) for source, dest, _ in copies if source not in heads or heads[source]["ContentLength"] < threshold]
+        large = [(source, dest) for source, dest, _ in copies if source in heads and heads[source]["ContentLength"] >= threshold]
+
+        upload_ids = [
+            resp["UploadId"] for resp in await asyncio.gather(*(
+                self._call("CreateMultipartUpload", Key=dest, ContentType=heads[source].get("ContentType", "binary/octet-stream"))
+                for source, dest in large
+            ))
+        ]
+
+        async def copy_large(source: str, dest: str, upload_id: str) -> None:
+            ranges = part_ranges(heads[source]["ContentLength"], self.settings.s3_multipart_copy_part_size)
+            parts = await asyncio.gather(*(
+                self._call(
+                    "UploadPartCopy",
+                    Key=dest,
+                    UploadId=upload_id,
+                    PartNumber=part_number,
+                    CopySource=self._copy_source(source),
+                    CopySourceRange=byte_range,
+                )
+                for part_number, byte_range in ranges
+            ))
+            await self._call(
+                "CompleteMultipartUpload",
+                Key=dest,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": [
+                    {"ETag": part["CopyPartResult"]["ETag"], "PartNumber": part_number}
+                    for (part_number, _), part in zip(ranges, parts)
+                ]},
+            )
+
+        try:
+            await asyncio.gather(
+                *(self._call("CopyObject", Key=dest, CopySource=self._copy_source(source)) for source, dest in small),
+                *(copy_large(source, dest, upload_id) for (source, dest), upload_id in zip(large, upload_ids)),
+            )
+        except Exception:
+            for (_, dest), upload_id in zip(large, upload_ids):
+                try:
+                    await self._call("AbortMultipartUpload", Key=dest, UploadId=upload_id)
+                except Exception:
+                    log.exception(f"Could not abort multipart upload of {dest}")
+            raise
+
+    def _copy_source(self, key: str) -> str:
+        # boto3 turns a {"Bucket", "Key"} dict into this header value, the serializer expects it ready-made
+        return quote(f"{self.settings.s3_bucket}/{key}")
+
+    async def _put_variants_async(self, source_key: str, media_key: str) -> List[str]:
+        try:
+            data = await self.read_media(source_key)
+            variants = await self.variant_pool.run(build_variants, media_key, data)
+            await asyncio.gather(*(self._put_async(key, webp, "image/webp") for key, webp in variants))
+        except UnidentifiedImageError:
+            log.info(f"{source_key} is not an image, skipping variants")
+            return []
+        except Exception:
+            log.exception(f"Could not create variants of {source_key}")
+            return []
+        return [key for key, _ in variants]
+
+    @invalidates(*RECIPE_LISTINGS)
+    async def put_recipe(self, recipe: DraftRecipe, media: List[DraftMedia], recipe_html: str) -> Recipe:
+        name, html_key, json_key = self._recipe_keys_for(recipe)
+        recipe_json = json.dumps(asdict(recipe), default=str)
+        copies = [
+            (media_item.key, f"{name}/{media_item.name}", media_item.size)
+            for media_item in media if media_item.exists
+        ]
+        variants_enabled = self.settings.media_variants_enabled
+        html_etag, json_etag, variant_keys, _ = await asyncio.gather(
+            self._put_async(html_key, recipe_html, "text/html"),
+            self._put_async(json_key, recipe_json, "application/json"),
+            asyncio.gather(*(self._put_variants_async(source, dest) for source, dest, _ in copies if variants_enabled)),
+            self._copy_objects_async(copies),
+        )
+        entry = CatalogEntry(
+            name=name,
+            html_key=html_key,
+            html_etag=html_etag,
+            json_key=json_key,
+            json_etag=json_etag,
+            summary=json.loads(recipe_json),
+            media_keys=sorted(dest for _, dest, _ in copies),
+            variant_keys=sorted(key for keys in variant_keys for key in keys),
+        )
+        self.catalog.upsert(entry)
+        if self.settings.catalog_manifest_enabled:
+            await self._update_manifest_async(upserts=[entry], removals=[])
+        return self._to_recipe(entry)
+
+    async def _delete_keys_async(self, keys: List[str]) -> Dict[str, str]:
+        async def delete_batch(batch: List[str]) -> Dict[str, str]:
+            resp = await self._call("DeleteObjects", Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True})
+            return {
+                error.get("Key", ""): error.get("Message", error.get("Code", "Unknown error"))
+                for error in resp.get("Errors", [])
+            }
+
+        errors: Dict[str, str] = {}
+        batches = [keys[i:i + DELETE_BATCH_SIZE] for i in range(0, len(keys), DELETE_BATCH_SIZE)]
+        for batch_errors in await asyncio.gather(*(delete_batch(batch) for batch in batches)):
+            errors.update(batch_errors)
+        return errors
+
+    @invalidates(*RECIPE_LISTINGS)
+    async def delete_recipes(self, ids: List[str]) -> Dict[str, Optional[str]]:
+        listings = await asyncio.gather(*(self._list(id) for id in ids))
+        keys_by_id = {id: self._recipe_keys_from(id, objects) for id, objects in zip(ids, listings)}
+        results = {id: "Recipe not found" for id, keys in keys_by_id.items() if f"{id}.html" not in keys}
+        to_delete = [key for id, keys in keys_by_id.items() if id not in results for key in keys]
+        removed = self._collect_delete_results(keys_by_id, await self._delete_keys_async(to_delete), results)
+        if removed and self.settings.catalog_manifest_enabled:
+            await self._update_manifest_async(upserts=[], removals=removed)
+        return results
+
+    @invalidates(*RECIPE_LISTINGS)
+    async def delete_recipe(self, id: str) -> bool:
+        return (await self.delete_recipes([id]))[id] is None
+
+    @coalesced
+    async def get_draft_media(self, user_id: str) -> List[DraftMedia]:
+        return self._draft_media(user_id, await self._list(self._draft_prefix(user_id)))
+
+    async def create_upload_slots(self, user_id: str, count: int) -> List[DraftMedia]:
+        existing = len(await self._list(self._draft_prefix(user_id)))
+        return self._upload_slots(user_id, min(count, self.settings.max_num_draft_media - existing))
+
+    @invalidates("get_draft_media")
+    async def delete_draft_media(self, user_id: str) -> Dict[str, str]:
+        keys = [obj["Key"] for obj in await self._list(self._draft_prefix(user_id))]
+        return await self._delete_keys_async(keys)
+
+    async def read_media(self, key: str) -> bytes:
+        return (await self._call("GetObject", Key=key))["Body"]
+
+    @coalesced
+    async def _load_draft_recipe(self, user_id: str) -> Optional[DraftRecipe]:
+        try:
+            resp = await self._call("GetObject", Key=self._draft_recipe_key(user_id))
+        except self.s3.exceptions.NoSuchKey:
+            return None
+        return TypeAdapter(DraftRecipe).validate_json(resp["Body"])
+
+    async def _store_draft_recipe(self, user_id: str, draft_recipe: DraftRecipe) -> None:
+        await self._put_async(self._draft_recipe_key(user_id), json.dumps(asdict(draft_recipe), default=str), "application/json")
+
+    async def _remove_draft_recipe(self, user_id: str) -> bool:
+        try:
+            await self._call("DeleteObject", Key=self._draft_recipe_key(user_id))
+            return True
+        except self.s3.exceptions.NoSuchKey:
+            return False
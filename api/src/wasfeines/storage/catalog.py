@@ -0,0 +1,220 @@
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, TYPE_CHECKING
+import base64
+import bisect
+import hashlib
+import threading
+import time
+
+from wasfeines.models.recipe import Media, MediaVariant, Recipe
+from wasfeines.storage.media_variants import MEDIA_VARIANTS, parse_variant_key
+
+if TYPE_CHECKING:
+    from mypy_boto3_s3.type_defs import ObjectTypeDef
+
+
+@dataclass
+class CatalogEntry:
+    """
+    In-memory view of a single recipe in the bucket.
+
+    `name` is the recipe key without extension, for example "recipes/recipe_Peanut_Protein_Balls",
+    which is also what `Recipe.name` and `delete_recipe_sync` use.
+    """
+    name: str
+    html_key: str
+    html_etag: Optional[str] = None
+    json_key: Optional[str] = None
+    json_etag: Optional[str] = None
+    summary: Optional[Dict[str, Any]] = None
+    media_keys: List[str] = field(default_factory=list)
+    variant_keys: List[str] = field(default_factory=list)
+
+
+def build_entries(objects: Iterable["ObjectTypeDef"]) -> Dict[str, CatalogEntry]:
+    """
+    Group a flat object listing into catalog entries.
+
+    * `X.html` defines a recipe named `X`
+    * `X.json` is the summary of recipe `X`
+    * every key below `X/` is a media file of recipe `X`, or a variant of one if it is below `X/_variants/`
+
+    Summaries are not loaded here, only their keys and ETags are recorded.
+    """
+    html: Dict[str, "ObjectTypeDef"] = {}
+    json_objects: Dict[str, "ObjectTypeDef"] = {}
+    others: List[str] = []
+    for obj in objects:
+        if "Key" not in obj:
+            continue
+        key = obj["Key"]
+        if key.endswith("/"):
+            continue
+        if key.endswith(".html"):
+            html[key[:-5]] = obj
+        elif key.endswith(".json"):
+            json_objects[key[:-5]] = obj
+        if "/" in key:
+            others.append(key)
+
+    entries: Dict[str, CatalogEntry] = {}
+    for name in sorted(html):
+        json_obj = json_objects.get(name)
+        entries[name] = CatalogEntry(
+            name=name,
+            html_key=html[name]["Key"],
+            html_etag=html[name].get("ETag"),
+            json_key=json_obj["Key"] if json_obj else None,
+            json_etag=json_obj.get("ETag") if json_obj else None,
+        )
+    for key in others:
+        parent = key
+        while "/" in parent:
+            parent = parent.rsplit("/", 1)[0]
+            if parent in entries:
+                if parse_variant_key(key) is not None:
+                    entries[parent].variant_keys.append(key)
+                else:
+                    entries[parent].media_keys.append(key)
+                break
+    for entry in entries.values():
+        entry.media_keys.sort()
+        entry.variant_keys.sort()
+    return entries
+
+
+def entry_to_recipe(entry: CatalogEntry, url_for: Callable[[str], str]) -> Recipe:
+    """Turn a catalog entry into a recipe, with `url_for` returning the URL a client can fetch a key from."""
+    media = {key: Media(name=key, content_url=url_for(key)) for key in entry.media_keys}
+    for key in entry.variant_keys:
+        parsed = parse_variant_key(key)
+        if parsed is None or parsed[0] not in media:
+            continue
+        media_key, variant, width, height = parsed
+        if variant in MEDIA_VARIANTS:
+            setattr(media[media_key], variant, MediaVariant(content_url=url_for(key), width=width, height=height))
+    return Recipe(
+        name=entry.name,
+        content_url=url_for(entry.html_key),
+        media=list(media.values()),
+        summary=entry.summary,
+    )
+
+
+def entries_to_manifest(entries: Iterable[CatalogEntry], version: int) -> Dict[str, Any]:
+    """
+    Serialize catalog entries into the manifest object kept next to the recipes.
+
+    `version` is incremented on every write, the object's ETag guards against concurrent writers.
+    """
+    return {
+        "version": version,
+        "recipes": [asdict(entry) for entry in entries],
+    }
+
+
+def entries_from_manifest(manifest: Dict[str, Any]) -> Dict[str, CatalogEntry]:
+    return {item["name"]: CatalogEntry(**item) for item in manifest["recipes"]}
+
+
+def catalog_version(entries: Iterable[CatalogEntry]) -> str:
+    """Digest of everything a listing of `entries` is built from, it changes whenever a recipe, its summary or media change."""
+    digest = hashlib.sha256()
+    for entry in entries:
+        for part in (entry.name, entry.html_etag, entry.json_etag, *entry.media_keys, *entry.variant_keys):
+            digest.update(f"{part}\0".encode())
+        digest.update(b"\1")
+    return digest.hexdigest()[:32]
+
+
+def entry_fingerprint(entry: CatalogEntry) -> str:
+    """Changes whenever the HTML or the summary of the recipe changes."""
+    return f"{entry.html_etag}\0{entry.json_etag}"
+
+
+def encode_cursor(name: str) -> str:
+    return base64.urlsafe_b64encode(name.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> str:
+    """Inverse of `encode_cursor`, raises ValueError on malformed cursors."""
+    try:
+        return base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def page_after(names: List[str], limit: int, after: Optional[str]) -> tuple[List[str], bool]:
+    """
+    Given sorted `names`, return up to `limit` names strictly after `after` and whether more names follow.
+    """
+    start = bisect.bisect_right(names, after) if after is not None else 0
+    page = names[start:start + limit]
+    return page, start + limit < len(names)
+
+
+class RecipeCatalog:
+    """
+    Thread-safe index of all recipes, kept up to date by the repository's own writes
+    and rebuilt once it is older than `refresh_seconds`.
+    """
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        self._entries: Dict[str, CatalogEntry] = {}
+        self._names: List[str] = []
+        self._loaded_at: Optional[float] = None
+        self._version: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def is_stale(self) -> bool:
+        with self._lock:
+            if self._loaded_at is None:
+                return True
+            return time.monotonic() - self._loaded_at > self.refresh_seconds
+
+    def replace(self, entries: Dict[str, CatalogEntry]) -> None:
+        with self._lock:
+            self._entries = dict(entries)
+            self._names = sorted(entries)
+            self._loaded_at = time.monotonic()
+            self._version = None
+
+    def touch(self) -> None:
+        """Mark the current entries as up to date."""
+        with self._lock:
+            self._loaded_at = time.monotonic()
+
+    def upsert(self, entry: CatalogEntry) -> None:
+        with self._lock:
+            if entry.name not in self._entries:
+                bisect.insort(self._names, entry.name)
+            self._entries[entry.name] = entry
+            self._version = None
+
+    def remove(self, name: str) -> Optional[CatalogEntry]:
+        with self._lock:
+            entry = self._entries.pop(name, None)
+            if entry is not None:
+                self._names.remove(name)
+                self._version = None
+            return entry
+
+    def version(self) -> str:
+        """`catalog_version` of the current entries, computed once per change."""
+        with self._lock:
+            if self._version is None:
+                self._version = catalog_version(self._entries[name] for name in self._names)
+            return self._version
+
+    def get(self, name: str) -> Optional[CatalogEntry]:
+        with self._lock:
+            return self._entries.get(name)
+
+    def entries(self) -> List[CatalogEntry]:
+        with self._lock:
+            return [self._entries[name] for name in self._names]
+
+    def page(self, limit: int, after: Optional[str] = None) -> tuple[List[CatalogEntry], bool]:
+        with self._lock:
+            names, has_more = page_after(self._names, limit, after)
+            return [self._entries[name] for name in names], has_more
@@ -0,0 +1,124 @@
+from copy import deepcopy
+from typing import Awaitable, Callable, Dict, Optional
+import asyncio
+import logging
+
+from wasfeines.cache import TTLCache
+from wasfeines.models.draft import DraftRecipe
+
+log = logging.getLogger(__name__)
+
+# Failed writes are retried after the write delay, doubled on every further failure up to this
+MAX_RETRY_DELAY_SECONDS = 60.0
+# On shutdown failed writes are retried right away, a draft still not written after this many attempts is lost
+FLUSH_WRITE_ATTEMPTS = 3
+
+
+class DraftRecipeCache:
+    """
+    Per-user cache of draft recipes with debounced write-behind. Saves update the cache at once and are
+    written `write_delay_seconds` later, so a burst of saves costs a single write; with a delay of 0 they
+    are written through. Deletes are always written through, drop pending saves and wait for writes in flight. Failed writes stay pending
+    and are retried with exponential backoff, reads keep returning the unwritten draft meanwhile.
+
+    Only valid while this process is the only writer of the drafts, reads never revalidate cached drafts.
+    """
+    def __init__(
+        self,
+        load: Callable[[str], Awaitable[Optional[DraftRecipe]]],
+        store: Callable[[str, DraftRecipe], Awaitable[None]],
+        remove: Callable[[str], Awaitable[bool]],
+        max_size: int,
+        write_delay_seconds: float,
+    ):
+        self._load = load
+        self._store = store
+        self._remove = remove
+        self.write_delay_seconds = write_delay_seconds
+        self.drafts: TTLCache[str, DraftRecipe] = TTLCache(max_size=max_size)
+        # Saves not written yet, kept apart from the cache so evictions cannot lose them
+        self._pending: Dict[str, DraftRecipe] = {}
+        self._writers: Dict[str, asyncio.Task] = {}
+        # Writes already handed to the store, they run to completion even if their writer is cancelled
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._flushing = asyncio.Event()
+        # Counts saves and deletes, loads that overlap one are not cached as they may be stale
+        self._writes = 0
+
+    async def get(self, user_id: str) -> Optional[DraftRecipe]:
+        draft_recipe = self._pending.get(user_id) or self.drafts.get(user_id)
+        if draft_recipe is None:
+            writes = self._writes
+            draft_recipe = await self._load(user_id)
+            if draft_recipe is not None and writes == self._writes:
+                self.drafts.set(user_id, draft_recipe)
+        # Callers may modify the draft, the cached one must not change with it
+        return deepcopy(draft_recipe)
+
+    async def put(self, user_id: str, draft_recipe: DraftRecipe) -> None:
+        self._writes += 1
+        self.drafts.set(user_id, deepcopy(draft_recipe))
+        if self.write_delay_seconds <= 0:
+            await self._write(user_id, draft_recipe)
+            return
+        self._pending[user_id] = deepcopy(draft_recipe)
+        if user_id not in self._writers:
+            self._writers[user_id] = asyncio.create_task(self._write_behind(user_id))
+
+    async def _write(self, user_id: str, draft_recipe: DraftRecipe) -> None:
+        write = asyncio.ensure_future(self._store(user_id, draft_recipe))
+        self._in_flight[user_id] = write
+
+        def done(_: asyncio.Future) -> None:
+            if self._in_flight.get(user_id) is write:
+                del self._in_flight[user_id]
+        write.add_done_callback(done)
+        await asyncio.shield(write)
+
+    async def _write_behind(self, user_id: str) -> None:
+        failures = 0
+        try:
+            # Saves arriving while a write is in flight are written by the next round
+            while user_id in self._pending:
+                delay = min(self.write_delay_seconds * 2 ** failures, MAX_RETRY_DELAY_SECONDS)
+                try:
+                    await asyncio.wait_for(self._flushing.wait(), delay)
+                except TimeoutError:
+                    pass
+                draft_recipe = self._pending.pop(user_id, None)
+                if draft_recipe is None:
+                    break
+                try:
+                    await self._write(user_id, draft_recipe)
+                    failures = 0
+                except Exception:
+                    failures += 1
+                    if self._flushing.is_set() and failures >= FLUSH_WRITE_ATTEMPTS:
+                        self._pending.pop(user_id, None)
+                        log.exception(f"Could not write draft recipe of {user_id} before shutdown, it is lost")
+                        break
+                    log.exception(f"Could not write draft recipe of {user_id}, retrying")
+                    # Unless a newer save replaced it meanwhile
+                    self._pending.setdefault(user_id, draft_recipe)
+        finally:
+            del self._writers[user_id]
+
+    async def delete(self, user_id: str) -> bool:
+        self._writes += 1
+        had_pending = self._pending.pop(user_id, None) is not None
+        writer = self._writers.get(user_id)
+        if writer is not None:
+            writer.cancel()
+            await asyncio.gather(writer, return_exceptions=True)
+        in_flight = self._in_flight.get(user_id)
+        if in_flight is not None:
+            # Cancelling the writer does not stop a write already sent, it must land before the delete
+            await asyncio.gather(in_flight, return_exceptions=True)
+        self.drafts.invalidate(user_id)
+        removed = await self._remove(user_id)
+        return removed or had_pending
+
+    async def flush(self) -> None:
+        """Write all pending saves now, called on shutdown."""
+        self._flushing.set()
+        await asyncio.gather(*self._writers.values(), return_exceptions=True)
@@ -0,0 +1,307 @@
+from dataclasses import asdict
+from pathlib import Path
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Optional
+from urllib.parse import quote
+from uuid import uuid4
+import functools
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+
+from pydantic import TypeAdapter
+from PIL import UnidentifiedImageError
+
+from wasfeines.models.draft import DraftMedia, DraftRecipe
+from wasfeines.executors import PoolRegistry
+from wasfeines.models.recipe import Recipe
+from wasfeines.settings import Settings
+from wasfeines.storage.catalog import CatalogEntry, build_entries, catalog_version, entry_fingerprint, entry_to_recipe
+from wasfeines.storage.media_variants import build_variants
+from wasfeines.storage.repository import StorageRepository
+
+log = logging.getLogger(__name__)
+
+def file_etag(stat_result: os.stat_result) -> str:
+    """ETag of a file, computed the same way as Starlette's FileResponse so both agree."""
+    etag_base = str(stat_result.st_mtime) + "-" + str(stat_result.st_size)
+    return f'"{hashlib.md5(etag_base.encode(), usedforsecurity=False).hexdigest()}"'
+
+
+class FileSystemStorageRepository(StorageRepository):
+    """
+    Stores recipes in a local directory laid out like the bucket, for example the `content/` directory:
+    `recipe_X.html`, `recipe_X.json` and the media below `recipe_X/`, with drafts in `S3_DRAFT_FOLDER`.
+
+    Keys are paths relative to `CONTENT_DIR`. Clients fetch and upload files through the media routes
+    below `MEDIA_URL_PREFIX` instead of presigned URLs. These URLs are relative to the API, so the model
+    only sees draft images that are sent inline (`LLM_INLINE_IMAGES`).
+    """
+    def __init__(self, settings: Settings, pools: Optional[PoolRegistry] = None):
+        super().__init__(settings, pools)
+        self.root = Path(settings.content_dir).resolve()
+        self.root.mkdir(parents=True, exist_ok=True)
+        # Summaries by key, reused as long as the file's ETag does not change
+        self._summaries: Dict[str, tuple[str, Optional[dict]]] = {}
+        self._summaries_lock = threading.Lock()
+
+    def path(self, key: str) -> Path:
+        """Absolute path of `key`, raises ValueError for keys outside of the content directory."""
+        path = (self.root / key).resolve()
+        if not path.is_relative_to(self.root) or path == self.root:
+            raise ValueError(f"Invalid key: {key}")
+        return path
+
+    def media_url(self, key: str) -> str:
+        return f"{self.settings.media_url_prefix}/{quote(key)}"
+
+    def draft_folder(self, user_id: str) -> str:
+        return f"{self.settings.s3_draft_folder}/{user_id}"
+
+    def is_draft_media_key(self, user_id: str, key: str) -> bool:
+        """Whether `key` is a media file of `user_id`'s draft, the only files clients may write."""
+        try:
+            return self.path(key).parent == self.path(self.draft_folder(user_id))
+        except ValueError:
+            return False
+
+    def is_readable_media_key(self, user_id: str, key: str) -> bool:
+        """Whether `user_id` may read `key`: anything but the drafts of other users and the draft recipes."""
+        try:
+            path = self.path(key)
+        except ValueError:
+            return False
+        return not path.is_relative_to(self.path(self.settings.s3_draft_folder)) or self.is_draft_media_key(user_id, key)
+
+    @staticmethod
+    def _tmp_path(path: Path) -> Path:
+        # Readers never see partially written files, temporary files are hidden from listings
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return path.with_name(f".{path.name}.{uuid4().hex}.tmp")
+
+    def _write(self, path: Path, chunks: Iterable[bytes]) -> None:
+        tmp_path = self._tmp_path(path)
+        try:
+            with tmp_path.open("wb") as file:
+                for chunk in chunks:
+                    file.write(chunk)
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+    def write_media_sync(self, key: str, chunks: Iterable[bytes]) -> str:
+        """Write a media file from `chunks` and return its ETag."""
+        path = self.path(key)
+        self._write(path, chunks)
+        return file_etag(path.stat())
+
+    async def write_media_stream(self, key: str, chunks: AsyncIterator[bytes]) -> str:
+        """Write a media file from an async stream of `chunks` without holding it in memory, and return its ETag."""
+        path = self.path(key)
+        tmp_path = await self.write_pool.run(self._tmp_path, path)
+        try:
+            file = await self.write_pool.run(tmp_path.open, "wb")
+            try:
+                async for chunk in chunks:
+                    await self.write_pool.run(file.write, chunk)
+            finally:
+                await self.write_pool.run(file.close)
+            await self.write_pool.run(os.replace, tmp_path, path)
+        finally:
+            await self.write_pool.run(functools.partial(tmp_path.unlink, missing_ok=True))
+        return file_etag(await self.write_pool.run(path.stat))
+
+    def delete_media_sync(self, key: str) -> bool:
+        try:
+            self.path(key).unlink()
+        except FileNotFoundError:
+            return False
+        return True
+
+    def _object(self, path: Path) -> dict:
+        """S3 listing entry of a file."""
+        stat_result = path.stat()
+        return {
+            "Key": path.relative_to(self.root).as_posix(),
+            "ETag": file_etag(stat_result),
+            "Size": stat_result.st_size,
+            "LastModified": stat_result.st_mtime,
+        }
+
+    def _iter_objects(self, folder: Path, exclude: Optional[Path] = None) -> Iterator[dict]:
+        """Yield listing entries of the files below `folder`, skipping the `exclude` folder and hidden files."""
+        for dirpath, dirnames, filenames in os.walk(folder):
+            if exclude is not None:
+                dirnames[:] = [name for name in dirnames if Path(dirpath) / name != exclude]
+            for filename in filenames:
+                if not filename.startswith("."):
+                    yield self._object(Path(dirpath) / filename)
+
+    def _load_summary(self, entry: CatalogEntry) -> Optional[dict]:
+        if entry.json_key is None or entry.json_etag is None:
+            return None
+        with self._summaries_lock:
+            cached = self._summaries.get(entry.json_key)
+        if cached is not None and cached[0] == entry.json_etag:
+            return cached[1]
+        try:
+            summary = json.loads(self.path(entry.json_key).read_text())
+        except (FileNotFoundError, ValueError) as e:
+            log.warning(f"Could not read summary {entry.json_key}: {e}")
+            summary = None
+        with self._summaries_lock:
+            self._summaries[entry.json_key] = (entry.json_etag, summary)
+        return summary
+
+    def _to_recipe(self, entry: CatalogEntry) -> Recipe:
+        entry.summary = self._load_summary(entry)
+        return entry_to_recipe(entry, self.media_url)
+
+    def _entries(self) -> Dict[str, CatalogEntry]:
+        return build_entries(self._iter_objects(self.root, exclude=self.path(self.settings.s3_draft_folder)))
+
+    def catalog_version_sync(self) -> Optional[str]:
+        return catalog_version(self._entries().values())
+
+    def recipes_etag_sync(self) -> Optional[str]:
+        # Media URLs do not expire, the listing only changes with the files
+        return f'"{self.catalog_version_sync()}"'
+
+    def recipe_fingerprints_sync(self) -> Dict[str, str]:
+        return {name: entry_fingerprint(entry) for name, entry in self._entries().items()}
+
+    def recipe_summaries_sync(self, names: List[str]) -> Dict[str, Optional[dict]]:
+        entries = self._entries()
+        return {name: self._load_summary(entries[name]) for name in names if name in entries}
+
+    def get_recipes_sync(self, names: List[str]) -> List[Recipe]:
+        entries = self._entries()
+        return [self._to_recipe(entries[name]) for name in names if name in entries]
+
+    def html_etags_sync(self, names: List[str]) -> Dict[str, Optional[str]]:
+        etags: Dict[str, Optional[str]] = {}
+        for name in names:
+            try:
+                etags[name] = file_etag(self.path(f"{name}.html").stat())
+            except (FileNotFoundError, ValueError):
+                etags[name] = None
+        return etags
+
+    def list_recipes_sync(self) -> List[Recipe]:
+        return [self._to_recipe(entry) for entry in self._entries().values()]
+
+    def _put_variants(self, media_key: str) -> None:
+        try:
+            for key, webp in build_variants(media_key, self.path(media_key).read_bytes()):
+                self._write(self.path(key), [webp])
+        except UnidentifiedImageError:
+            log.info(f"{media_key} is not an image, skipping variants")
+        except Exception:
+            log.exception(f"Could not create variants of {media_key}")
+
+    def put_recipe_sync(self, recipe: DraftRecipe, media: List[DraftMedia], recipe_html: str) -> Recipe:
+        name = str(recipe.name)
+        html_path = self.path(f"{name}.html")
+        json_path = self.path(f"{name}.json")
+        self._write(html_path, [recipe_html.encode()])
+        self._write(json_path, [json.dumps(asdict(recipe), default=str).encode()])
+        for media_item in media:
+            if not media_item.exists:
+                continue
+            media_key = f"{name}/{media_item.name}"
+            destination = self.path(media_key)
+            destination.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(self.path(media_item.key), destination)
+            if self.settings.media_variants_enabled:
+                self._put_variants(media_key)
+        objects = [self._object(html_path), self._object(json_path), *self._iter_objects(self.path(name))]
+        return self._to_recipe(build_entries(objects)[name])
+
+    def delete_recipe_sync(self, id: str) -> bool:
+        html_path = self.path(f"{id}.html")
+        if not html_path.is_file():
+            return False
+        html_path.unlink()
+        self.path(f"{id}.json").unlink(missing_ok=True)
+        shutil.rmtree(self.path(id), ignore_errors=True)
+        return True
+
+    def replace_recipe_html_sync(self, name: str, recipe_html: str) -> bool:
+        html_path = self.path(f"{name}.html")
+        if not html_path.is_file():
+            return False
+        self._write(html_path, [recipe_html.encode()])
+        return True
+
+    def get_draft_media_sync(self, user_id: str) -> List[DraftMedia]:
+        folder = self.draft_folder(user_id)
+        draft_media = []
+        for obj in self._iter_objects(self.path(folder)):
+            key = obj["Key"]
+            url = self.media_url(key)
+            draft_media.append(
+                DraftMedia(
+                    exists=True,
+                    name=key.split("/")[-1],
+                    key=key,
+                    get_url=url,
+                    put_url=url,
+                    delete_url=url,
+                    create_timestamp=obj["LastModified"],
+                    size=obj["Size"],
+                    etag=obj["ETag"],
+                )
+            )
+        return draft_media
+
+    def create_upload_slots_sync(self, user_id: str, count: int) -> List[DraftMedia]:
+        folder = self.draft_folder(user_id)
+        existing = sum(1 for _ in self._iter_objects(self.path(folder)))
+        slots = []
+        for _ in range(min(count, self.settings.max_num_draft_media - existing)):
+            uuid = str(uuid4())
+            key = f"{folder}/{uuid}"
+            slots.append(
+                DraftMedia(
+                    exists=False,
+                    key=key,
+                    name=uuid,
+                    get_url=self.media_url(key),
+                    put_url=self.media_url(key),
+                )
+            )
+        return slots
+
+    def delete_draft_media_sync(self, user_id: str) -> Dict[str, str]:
+        errors: Dict[str, str] = {}
+        for obj in list(self._iter_objects(self.path(self.draft_folder(user_id)))):
+            try:
+                self.path(obj["Key"]).unlink()
+            except OSError as e:
+                errors[obj["Key"]] = str(e)
+        return errors
+
+    def read_media_sync(self, key: str) -> bytes:
+        return self.path(key).read_bytes()
+
+    def _draft_recipe_path(self, user_id: str) -> Path:
+        return self.path(f"{self.settings.s3_draft_folder}/{user_id}-draft.json")
+
+    def get_draft_recipe_sync(self, user_id: str) -> Optional[DraftRecipe]:
+        try:
+            contents = self._draft_recipe_path(user_id).read_bytes()
+        except FileNotFoundError:
+            return None
+        return TypeAdapter(DraftRecipe).validate_json(contents)
+
+    def store_draft_recipe_sync(self, user_id: str, draft_recipe: DraftRecipe) -> None:
+        self._write(self._draft_recipe_path(user_id), [json.dumps(asdict(draft_recipe), default=str).encode()])
+
+    def delete_draft_recipe_sync(self, user_id: str) -> bool:
+        try:
+            self._draft_recipe_path(user_id).unlink()
+        except FileNotFoundError:
+            return False
+        return True
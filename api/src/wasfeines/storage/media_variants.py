@@ -0,0 +1,46 @@
+from typing import List, Optional
+import re
+
+from wasfeines.imaging import downscale_webp
+
+# Variants of `recipe_X/photo.png` are stored as `recipe_X/_variants/photo.png/<variant>_<width>x<height>.webp`,
+# so a listing alone is enough to find them and their dimensions
+VARIANTS_FOLDER = "_variants"
+MEDIA_VARIANTS = {
+    "thumbnail": 320,
+    "medium": 1024,
+}
+VARIANT_QUALITY = 80
+
+_VARIANT_KEY = re.compile(rf"^(?P<parent>.+)/{VARIANTS_FOLDER}/(?P<filename>[^/]+)/(?P<variant>[a-z]+)_(?P<width>\d+)x(?P<height>\d+)\.webp$")
+
+
+def variant_key(media_key: str, variant: str, width: int, height: int) -> str:
+    parent, filename = media_key.rsplit("/", 1)
+    return f"{parent}/{VARIANTS_FOLDER}/{filename}/{variant}_{width}x{height}.webp"
+
+
+def parse_variant_key(key: str) -> Optional[tuple[str, str, int, int]]:
+    """Return (media key, variant, width, height) for variant keys and None for any other key."""
+    match = _VARIANT_KEY.match(key)
+    if match is None:
+        return None
+    return (
+        f"{match['parent']}/{match['filename']}",
+        match["variant"],
+        int(match["width"]),
+        int(match["height"]),
+    )
+
+
+def build_variants(media_key: str, data: bytes) -> List[tuple[str, bytes]]:
+    """
+    Render every variant of an image, returning (variant key, WebP bytes) pairs.
+
+    Raises PIL.UnidentifiedImageError for data that is not a supported image.
+    """
+    variants = []
+    for variant, max_edge in MEDIA_VARIANTS.items():
+        webp, width, height = downscale_webp(data, max_edge=max_edge, quality=VARIANT_QUALITY)
+        variants.append((variant_key(media_key, variant, width, height), webp))
+    return variants
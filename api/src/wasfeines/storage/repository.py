@@ -1,28 +1,140 @@
 from abc import ABC, abstractmethod
-from typing import List, TYPE_CHECKING, Optional
-import asyncio
+from typing import Dict, Iterable, Iterator, List, TYPE_CHECKING, Optional
 from pathlib import Path
 import json
+import threading
+import time
 from uuid import uuid4
-from dataclasses import asdict
+from contextvars import ContextVar
+from dataclasses import asdict, replace
+import functools
+import inspect
 import logging
 
 from pydantic import TypeAdapter
 import boto3
 from botocore.config import Config
+from botocore.exceptions import ClientError
 if TYPE_CHECKING:
     from mypy_boto3_s3.client import S3Client
-    from mypy_boto3_s3.type_defs import ListObjectsV2OutputTypeDef
+    from mypy_boto3_s3.type_defs import ObjectTypeDef
 
+from PIL import UnidentifiedImageError
 
-from wasfeines.models.recipe import Recipe, Media
+from wasfeines.models.recipe import Recipe
 from wasfeines.models.draft import DraftMedia
 from wasfeines.models.draft import DraftRecipe, DraftRecipeRequestModel
+from wasfeines.executors import PoolRegistry
+from wasfeines.metrics import REGISTRY
 from wasfeines.settings import Settings
+from wasfeines.singleflight import SingleFlight, coalesced, invalidates
+from wasfeines.cache import TTLCache
+from wasfeines.storage.drafts import DraftRecipeCache
+from wasfeines.storage.media_variants import build_variants, parse_variant_key
+from wasfeines.storage.catalog import (
+    CatalogEntry,
+    RecipeCatalog,
+    build_entries,
+    decode_cursor,
+    encode_cursor,
+    entries_from_manifest,
+    entries_to_manifest,
+    entry_fingerprint,
+    entry_to_recipe,
+    page_after,
+)
 
 log = logging.getLogger(__name__)
 
+# Maximum number of keys accepted by a single DeleteObjects request
+DELETE_BATCH_SIZE = 1000
+# The catalog manifest is stored below the base path under this name
+CATALOG_MANIFEST_NAME = "catalog-manifest.json"
+# Conditional manifest writes are retried this often when other writers get in between
+MANIFEST_WRITE_ATTEMPTS = 5
+# Error codes of failed conditional writes and of conditional reads of unchanged objects
+WRITE_CONFLICT_CODES = ("PreconditionFailed", "ConditionalRequestConflict")
+NOT_MODIFIED_CODES = ("304", "NotModified")
+# Coalesced operations whose results change with every published or deleted recipe
+RECIPE_LISTINGS = ("list_recipes", "list_recipes_page", "recipes_etag", "catalog_version", "recipe_fingerprints")
+
+STORAGE_CALLS = REGISTRY.counter("storage_calls", "Calls of async storage repository methods", ("backend", "method"))
+STORAGE_ERRORS = REGISTRY.counter("storage_errors", "Calls of async storage repository methods that raised", ("backend", "method"))
+STORAGE_DURATION = REGISTRY.histogram("storage_duration_seconds", "Time async storage repository methods took", ("backend", "method"))
+S3_REQUESTS = REGISTRY.counter("s3_requests", "Requests sent to S3, by the repository method that sent them", ("method", "operation"))
+S3_ERRORS = REGISTRY.counter(
+    "s3_errors", "S3 requests answered with an error or failed to be sent, by the repository method that sent them", ("method", "operation", "code"),
+)
+# The innermost instrumented repository method running in this context, the pools carry it to their threads
+current_method: ContextVar[str] = ContextVar("storage_method", default="unknown")
+
+
+def instrumented(method):
+    """Count the calls and errors of an async repository method and time it, labelled with the backend class."""
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        labels = {"backend": type(self).__name__, "method": method.__name__}
+        STORAGE_CALLS.inc(**labels)
+        token = current_method.set(method.__name__)
+        try:
+            with STORAGE_DURATION.time(**labels):
+                return await method(self, *args, **kwargs)
+        except Exception:
+            STORAGE_ERRORS.inc(**labels)
+            raise
+        finally:
+            current_method.reset(token)
+    wrapper.__instrumented__ = True
+    return wrapper
+
+
+def instrument_methods(cls: type) -> None:
+    for name, member in list(vars(cls).items()):
+        if not name.startswith("_") and inspect.iscoroutinefunction(member) and not getattr(member, "__instrumented__", False):
+            setattr(cls, name, instrumented(member))
+
+
+def _count_s3_request(model, **kwargs) -> None:
+    S3_REQUESTS.inc(method=current_method.get(), operation=model.name)
+
+
+def _count_s3_error_response(model, parsed, **kwargs) -> None:
+    if "Error" in parsed:
+        S3_ERRORS.inc(method=current_method.get(), operation=model.name, code=parsed["Error"].get("Code", "Unknown"))
+
+
+def _count_s3_request_failure(event_name: str, exception: Exception, **kwargs) -> None:
+    S3_ERRORS.inc(method=current_method.get(), operation=event_name.rsplit(".", 1)[-1], code=type(exception).__name__)
+
+
 class StorageRepository(ABC):
+    """
+    The async methods run the blocking `*_sync` methods on two of the registry's pools, so slow writes
+    cannot hold up reads: `storage-read` for listings and lookups, `storage-write` for everything else.
+
+    Identical concurrent reads of listings and drafts share one call through `flights`.
+    The public async methods of every backend are counted and timed by `instrumented`.
+    Async access to draft recipes goes through a `DraftRecipeCache`, backends implement the
+    `_load_draft_recipe`, `_store_draft_recipe` and `_remove_draft_recipe` hooks it calls.
+    """
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        instrument_methods(cls)
+
+    def __init__(self, settings: Settings, pools: Optional[PoolRegistry] = None):
+        self.settings = settings
+        self.pools = pools or PoolRegistry()
+        self.read_pool = self.pools.executor("storage-read", settings.storage_read_workers)
+        self.write_pool = self.pools.executor("storage-write", settings.storage_write_workers)
+        self.flights = SingleFlight()
+        self.drafts = DraftRecipeCache(
+            self._load_draft_recipe,
+            self._store_draft_recipe,
+            self._remove_draft_recipe,
+            max_size=settings.draft_cache_size,
+            write_delay_seconds=settings.draft_write_delay_seconds,
+        )
+
     @abstractmethod
     def list_recipes_sync(self) -> List[Recipe]:
         raise NotImplementedError()
@@ -35,50 +147,219 @@ class StorageRepository(ABC):
     def delete_recipe_sync(self, id: str) -> bool:
         raise NotImplementedError()
 
+    @abstractmethod
+    def replace_recipe_html_sync(self, name: str, recipe_html: str) -> bool:
+        """Overwrite the HTML of a published recipe, keeping its summary and media. Returns False for unknown recipes."""
+        raise NotImplementedError()
+
+    def delete_recipes_sync(self, ids: List[str]) -> Dict[str, Optional[str]]:
+        """
+        Delete several recipes, returning None for every deleted recipe and an error message for every failed one.
+        """
+        return {id: None if self.delete_recipe_sync(id) else "Recipe not found" for id in ids}
+
     @abstractmethod
     def get_draft_media_sync(self, user_id: str) -> List[DraftMedia]:
         raise NotImplementedError()
 
+    @abstractmethod
+    def create_upload_slots_sync(self, user_id: str, count: int) -> List[DraftMedia]:
+        """
+        Return up to `count` empty media slots with upload URLs, fewer if the user's draft has no room for them.
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    def delete_draft_media_sync(self, user_id: str) -> Dict[str, str]:
+        """Delete all draft media of a user, returning an error message for every key that could not be deleted."""
+        raise NotImplementedError()
+
+    @abstractmethod
+    def read_media_sync(self, key: str) -> bytes:
+        raise NotImplementedError()
+
     @abstractmethod
     def get_draft_recipe_sync(self, user_id: str) -> Optional[DraftRecipe]:
         raise NotImplementedError()
 
     @abstractmethod
-    def put_draft_recipe_sync(self, user_id: str, recipe: DraftRecipeRequestModel) -> DraftRecipe:
+    def store_draft_recipe_sync(self, user_id: str, draft_recipe: DraftRecipe) -> None:
         raise NotImplementedError()
 
+    def put_draft_recipe_sync(self, user_id: str, recipe: DraftRecipeRequestModel) -> DraftRecipe:
+        draft_recipe = recipe.to_draft_recipe(created_by=user_id)
+        self.store_draft_recipe_sync(user_id, draft_recipe)
+        return draft_recipe
+
     @abstractmethod
     def delete_draft_recipe_sync(self, user_id: str) -> bool:
         raise NotImplementedError()
 
+    def list_recipes_page_sync(self, limit: int, cursor: Optional[str] = None) -> tuple[List[Recipe], Optional[str]]:
+        """
+        Return up to `limit` recipes ordered by name, starting after `cursor`, and the cursor of the next page
+        (None on the last page). Raises ValueError for malformed cursors.
+        """
+        recipes = {recipe.name: recipe for recipe in self.list_recipes_sync()}
+        after = decode_cursor(cursor) if cursor else None
+        names, has_more = page_after(sorted(recipes), limit, after)
+        next_cursor = encode_cursor(names[-1]) if has_more and names else None
+        return [recipes[name] for name in names], next_cursor
+
+    def recipes_etag_sync(self) -> Optional[str]:
+        """
+        Strong ETag of the recipe listing and its pages, computed without building them.
+        None for backends that cannot tell when the listing changes.
+        """
+        return None
+
+    def html_etags_sync(self, names: List[str]) -> Dict[str, Optional[str]]:
+        """ETags of the HTML of recipes by name, None where the backend cannot tell or the recipe is unknown."""
+        return dict.fromkeys(names)
+
+    def catalog_version_sync(self) -> Optional[str]:
+        """
+        Version of the published recipes and their contents. Unlike `recipes_etag_sync` it does not change when
+        URLs expire. None for backends that cannot tell when recipes change.
+        """
+        return None
+
+    def recipe_fingerprints_sync(self) -> Dict[str, str]:
+        """A fingerprint per published recipe that changes with its HTML or summary, without building the recipes."""
+        recipes = self.list_recipes_sync()
+        etags = self.html_etags_sync([recipe.name for recipe in recipes])
+        return {
+            recipe.name: json.dumps([recipe.summary, etags.get(recipe.name)], sort_keys=True, default=str)
+            for recipe in recipes
+        }
+
+    def recipe_summaries_sync(self, names: List[str]) -> Dict[str, Optional[dict]]:
+        """Summaries of the published recipes among `names`, unknown names are left out."""
+        return {recipe.name: recipe.summary for recipe in self.get_recipes_sync(names)}
+
+    def get_recipes_sync(self, names: List[str]) -> List[Recipe]:
+        """The published recipes among `names` in the same order, unknown names are left out."""
+        recipes = {recipe.name: recipe for recipe in self.list_recipes_sync()}
+        return [recipes[name] for name in names if name in recipes]
+
+    def warm_up_sync(self) -> None:
+        """Hook for backends that keep an in-memory index, called once on startup."""
+        pass
+
+    def close(self) -> None:
+        """Release resources held by the backend, called once on shutdown."""
+        pass
+
+    async def aclose(self) -> None:
+        """Async counterpart of `close`, called once on shutdown instead of it. Writes pending drafts first."""
+        await self.drafts.flush()
+        self.close()
+
+    async def warm_up(self) -> None:
+        return await self.read_pool.run(self.warm_up_sync)
+
+    @coalesced
+    async def recipes_etag(self) -> Optional[str]:
+        return await self.read_pool.run(self.recipes_etag_sync)
+
+    async def html_etags(self, names: List[str]) -> Dict[str, Optional[str]]:
+        return await self.read_pool.run(self.html_etags_sync, names)
+
+    @coalesced
+    async def catalog_version(self) -> Optional[str]:
+        return await self.read_pool.run(self.catalog_version_sync)
+
+    @coalesced
+    async def recipe_fingerprints(self) -> Dict[str, str]:
+        return await self.read_pool.run(self.recipe_fingerprints_sync)
+
+    async def recipe_summaries(self, names: List[str]) -> Dict[str, Optional[dict]]:
+        return await self.read_pool.run(self.recipe_summaries_sync, names)
+
+    async def get_recipes(self, names: List[str]) -> List[Recipe]:
+        return await self.read_pool.run(self.get_recipes_sync, names)
+
+    @coalesced
     async def list_recipes(self) -> List[Recipe]:
-        loop = asyncio.get_running_loop()
-        return await loop.run_in_executor(None, self.list_recipes_sync)
+        return await self.read_pool.run(self.list_recipes_sync)
+
+    @coalesced
+    async def list_recipes_page(self, limit: int, cursor: Optional[str] = None) -> tuple[List[Recipe], Optional[str]]:
+        return await self.read_pool.run(self.list_recipes_page_sync, limit, cursor)
 
+    @invalidates(*RECIPE_LISTINGS)
     async def put_recipe(self, recipe: DraftRecipe, media: List[DraftMedia], recipe_html: str) -> Recipe:
-        loop = asyncio.get_running_loop()
-        return await loop.run_in_executor(None, self.put_recipe_sync, recipe, media, recipe_html)
+        return await self.write_pool.run(self.put_recipe_sync, recipe, media, recipe_html)
 
+    @invalidates(*RECIPE_LISTINGS)
     async def delete_recipe(self, id: str) -> bool:
-        loop = asyncio.get_running_loop()
-        return await loop.run_in_executor(None, self.delete_recipe_sync, id)
+        return await self.write_pool.run(self.delete_recipe_sync, id)
 
+    @invalidates(*RECIPE_LISTINGS)
+    async def delete_recipes(self, ids: List[str]) -> Dict[str, Optional[str]]:
+        return await self.write_pool.run(self.delete_recipes_sync, ids)
+
+    @coalesced
     async def get_draft_media(self, user_id: str) -> List[DraftMedia]:
-        loop = asyncio.get_running_loop()
-        return await loop.run_in_executor(None, self.get_draft_media_sync, user_id)
+        return await self.read_pool.run(self.get_draft_media_sync, user_id)
+
+    async def create_upload_slots(self, user_id: str, count: int) -> List[DraftMedia]:
+        return await self.read_pool.run(self.create_upload_slots_sync, user_id, count)
+
+    @invalidates("get_draft_media")
+    async def delete_draft_media(self, user_id: str) -> Dict[str, str]:
+        return await self.write_pool.run(self.delete_draft_media_sync, user_id)
+
+    async def read_media(self, key: str) -> bytes:
+        return await self.read_pool.run(self.read_media_sync, key)
+
+    @coalesced
+    async def _load_draft_recipe(self, user_id: str) -> Optional[DraftRecipe]:
+        return await self.read_pool.run(self.get_draft_recipe_sync, user_id)
+
+    async def _store_draft_recipe(self, user_id: str, draft_recipe: DraftRecipe) -> None:
+        await self.write_pool.run(self.store_draft_recipe_sync, user_id, draft_recipe)
+
+    async def _remove_draft_recipe(self, user_id: str) -> bool:
+        return await self.write_pool.run(self.delete_draft_recipe_sync, user_id)
 
     async def get_draft_recipe(self, user_id: str) -> Optional[DraftRecipe]:
-        loop = asyncio.get_running_loop()
-        return await loop.run_in_executor(None, self.get_draft_recipe_sync, user_id)
+        return await self.drafts.get(user_id)
 
+    @invalidates("_load_draft_recipe")
     async def put_draft_recipe(self, user_id: str, recipe: DraftRecipeRequestModel) -> DraftRecipe:
-        loop = asyncio.get_running_loop()
-        return await loop.run_in_executor(None, self.put_draft_recipe_sync, user_id, recipe)
+        draft_recipe = recipe.to_draft_recipe(created_by=user_id)
+        await self.drafts.put(user_id, draft_recipe)
+        return draft_recipe
 
+    @invalidates("_load_draft_recipe")
     async def delete_draft_recipe(self, user_id: str) -> bool:
-        loop = asyncio.get_running_loop()
-        return await loop.run_in_executor(None, self.delete_draft_recipe_sync, user_id)
+        return await self.drafts.delete(user_id)
+
+
+
+instrument_methods(StorageRepository)
+
+
+def apply_changes(entries: Dict[str, CatalogEntry], upserts: List[CatalogEntry], removals: List[str]) -> Dict[str, CatalogEntry]:
+    """Apply recipe changes to catalog entries, returning them ordered by name."""
+    for entry in upserts:
+        entries[entry.name] = entry
+    for name in removals:
+        entries.pop(name, None)
+    return dict(sorted(entries.items()))
+
 
+def error_code(e: ClientError) -> Optional[str]:
+    return e.response.get("Error", {}).get("Code")
+
+
+def part_ranges(size: int, part_size: int) -> List[tuple[int, str]]:
+    """(part number, byte range) pairs covering an object of `size` bytes in parts of `part_size` bytes."""
+    return [
+        (part_number, f"bytes={start}-{min(start + part_size, size) - 1}")
+        for part_number, start in enumerate(range(0, size, part_size), start=1)
+    ]
 
 
 def is_media(key: str) -> bool:
@@ -92,197 +373,570 @@ def is_media(key: str) -> bool:
 
 
 class S3StorageRepository(StorageRepository):
-    def __init__(self, settings: Settings):
-        self.settings = settings
+    def __init__(self, settings: Settings, pools: Optional[PoolRegistry] = None):
+        super().__init__(settings, pools)
         self.s3: S3Client = boto3.client(
             "s3",
             endpoint_url=settings.s3_endpoint_url,
             aws_access_key_id=settings.s3_access_key,
             aws_secret_access_key=settings.s3_secret_key,
             region_name=settings.s3_region,
+            config=Config(
+                max_pool_connections=settings.s3_max_pool_connections,
+                connect_timeout=settings.s3_connect_timeout,
+                read_timeout=settings.s3_read_timeout,
+            ),
         )
+        # Fired for requests only, not when URLs are presigned
+        self.s3.meta.events.register("before-call.s3", _count_s3_request)
+        self.s3.meta.events.register("after-call.s3", _count_s3_error_response)
+        self.s3.meta.events.register("after-call-error.s3", _count_s3_request_failure)
+        # Shares the client's connection pool, so it is sized to match it
+        self._io_pool = self.pools.executor("s3-io", settings.s3_max_pool_connections)
+        self.presigned_urls: TTLCache[tuple[str, str], str] = TTLCache(
+            max_size=settings.presigned_url_cache_size,
+            ttl_seconds=settings.presigned_url_expiry_seconds - settings.presigned_url_refresh_margin_seconds,
+        )
+        self.catalog = RecipeCatalog(refresh_seconds=settings.catalog_refresh_seconds)
+        self._catalog_refresh_lock = threading.Lock()
+        self._manifest_etag: Optional[str] = None
+        # Set when a recipe change could not be written to the manifest, which is then rebuilt on the next refresh
+        self._manifest_dirty = False
 
-    def _load_item(self, key_html: str, objects: "ListObjectsV2OutputTypeDef") -> Recipe:
+    def iter_objects(self, prefix: str) -> Iterator["ObjectTypeDef"]:
         """
-        Given a recipe key, for example "recipe_Peanut_Protein_Balls.html", return the full recipe object
-
-        * Loading the associated recipe_Peanut_Protein_Balls.json, if it exists
-        * Loading all media files associated with the recipe
+        Lazily yield every object below `prefix`, following continuation tokens across pages.
         """
-        key_presigned = self.s3.generate_presigned_url(
-            "get_object",
-            Params={"Bucket": self.settings.s3_bucket, "Key": key_html},
-            ExpiresIn=3600,
-        )
-        key_noext = key_html[:-5]
-        media = []
-        if "Contents" not in objects:
-            raise ValueError(f"Recipe {key_html} not found in S3")
-        for obj_inner in objects["Contents"]:
-            if "Key" not in obj_inner:
-                continue
-            key_inner = obj_inner["Key"]
-            if key_inner.startswith(f"{key_noext}/"):
-                key_inner_presigned = self.s3.generate_presigned_url(
-                    "get_object",
-                    Params={
-                        "Bucket": self.settings.s3_bucket,
-                        "Key": key_inner,
-                    },
-                    ExpiresIn=3600,
-                )
-                media.append(
-                    Media(name=key_inner, content_url=key_inner_presigned)
-                )
-        summary = None
-        for obj_inner in objects["Contents"]:
-            if "Key" not in obj_inner:
-                continue
-            key_inner = obj_inner["Key"]
-            if key_inner == f"{key_noext}.json":
-                contents = self.s3.get_object(
-                    Bucket=self.settings.s3_bucket, Key=key_inner
-                )["Body"].read()
-                summary = json.loads(contents)
-
-        return Recipe(
-            name=key_noext,
-            content_url=key_presigned,
-            media=media,
-            summary=summary,
+        paginator = self.s3.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.settings.s3_bucket, Prefix=prefix):
+            for obj in page.get("Contents", []):
+                if "Key" in obj:
+                    yield obj
+
+    def _sign(self, operation: str, key: str) -> str:
+        return self.s3.generate_presigned_url(
+            operation,
+            Params={"Bucket": self.settings.s3_bucket, "Key": key},
+            ExpiresIn=self.settings.presigned_url_expiry_seconds,
         )
 
-    def list_recipes_sync(self) -> List[Recipe]:
-        objects = self.s3.list_objects_v2(
-            Bucket=self.settings.s3_bucket, Prefix=self.settings.s3_bucket_base_path
-        )
-        recipes = []
-        if "Contents" not in objects:
-            return recipes
-        for obj in objects["Contents"]:
-            if "Key" not in obj:
-                continue
-            key = obj["Key"]
-            if key.endswith(".html"):
-                recipes.append(self._load_item(key, objects))
-        return recipes
+    def _presign(self, operation: str, key: str) -> str:
+        """
+        Return a presigned URL for `operation` on `key`, reusing a previously signed URL until it is close to expiry.
 
-    def put_recipe_sync(self, recipe: DraftRecipe, media: List[DraftMedia], recipe_html: str) -> Recipe:
-        id = f"{recipe.name}.html"
-        html_key = Path(self.settings.s3_bucket_base_path) / id
-        self.s3.put_object(
-            Bucket=self.settings.s3_bucket,
-            Key=str(html_key),
-            Body=recipe_html,
-            ContentType="text/html",
-        )
-        for media_item in media:
-            if not media_item.exists:
+        Stable URLs let browsers cache the media they point to.
+        """
+        return self.presigned_urls.get_or_set((operation, key), lambda: self._sign(operation, key))
+
+    def _presign_get(self, key: str) -> str:
+        return self._presign("get_object", key)
+
+    def _to_recipe(self, entry: CatalogEntry) -> Recipe:
+        return entry_to_recipe(entry, self._presign_get)
+
+    def close(self) -> None:
+        self._io_pool.shutdown()
+
+    def _load_summary(self, key: str) -> Optional[dict]:
+        contents = self.s3.get_object(
+            Bucket=self.settings.s3_bucket, Key=key
+        )["Body"].read()
+        return json.loads(contents)
+
+    def _reuse_summaries(self, entries: Dict[str, CatalogEntry]) -> List[CatalogEntry]:
+        """Copy summaries with unchanged ETags over from the catalog, returning the entries whose summary must be fetched."""
+        to_fetch: List[CatalogEntry] = []
+        for entry in entries.values():
+            if entry.json_key is None:
                 continue
-            dest_media_key = Path(self.settings.s3_bucket_base_path) / f"{recipe.name}/{media_item.name}"
-            self.s3.copy_object(
+            previous = self.catalog.get(entry.name)
+            if previous is not None and previous.json_etag is not None and previous.json_etag == entry.json_etag:
+                entry.summary = previous.summary
+            else:
+                to_fetch.append(entry)
+        return to_fetch
+
+    def _scan_entries(self) -> Dict[str, CatalogEntry]:
+        """
+        Build catalog entries from a single listing of the base path.
+
+        Summaries whose ETag did not change since the last refresh are reused instead of fetched again.
+        """
+        entries = build_entries(self.iter_objects(self.settings.s3_bucket_base_path))
+        to_fetch = self._reuse_summaries(entries)
+        summaries = self._io_pool.map(self._load_summary, [entry.json_key for entry in to_fetch])
+        for entry, summary in zip(to_fetch, summaries):
+            entry.summary = summary
+        return entries
+
+    def _manifest_key(self) -> str:
+        return str(Path(self.settings.s3_bucket_base_path) / CATALOG_MANIFEST_NAME)
+
+    def _read_manifest(self) -> Optional[tuple[dict, str]]:
+        """Return the manifest and its ETag, or None if there is no manifest yet."""
+        try:
+            resp = self.s3.get_object(Bucket=self.settings.s3_bucket, Key=self._manifest_key())
+        except self.s3.exceptions.NoSuchKey:
+            return None
+        return json.loads(resp["Body"].read()), resp["ETag"]
+
+    def _write_manifest(self, entries: Iterable[CatalogEntry], version: int, etag: Optional[str]) -> bool:
+        """
+        Write the manifest unless it changed since it was read with `etag`, or was created if `etag` is None.
+        Returns False if another writer got in between.
+        """
+        condition = {"IfMatch": etag} if etag is not None else {"IfNoneMatch": "*"}
+        try:
+            resp = self.s3.put_object(
                 Bucket=self.settings.s3_bucket,
-                CopySource={
-                    "Bucket": self.settings.s3_bucket,
-                    "Key": media_item.key
-                },
-                Key=str(dest_media_key),
+                Key=self._manifest_key(),
+                Body=json.dumps(entries_to_manifest(entries, version)),
+                ContentType="application/json",
+                **condition,
             )
-        json_key = Path(self.settings.s3_bucket_base_path) / f"{recipe.name}.json"
-        recipe_dict = asdict(recipe)
-        self.s3.put_object(
+        except ClientError as e:
+            if error_code(e) in WRITE_CONFLICT_CODES:
+                return False
+            raise
+        self._manifest_etag = resp.get("ETag")
+        return True
+
+    def _reconcile_once(self) -> Optional[int]:
+        """
+        Replace the catalog with a listing of the bucket and write it to the manifest, which is read first so that
+        writes during the listing are detected. Returns the number of recipes, or None if another writer got in between.
+        """
+        current = self._read_manifest()
+        version, etag = (current[0]["version"], current[1]) if current is not None else (0, None)
+        entries = self._scan_entries()
+        self.catalog.replace(entries)
+        if not self._write_manifest(entries.values(), version + 1, etag):
+            return None
+        self._manifest_dirty = False
+        return len(entries)
+
+    def reconcile_manifest_sync(self) -> int:
+        """
+        Rebuild the manifest from the objects in the bucket, returning the number of recipes.
+
+        Run this whenever the manifest drifted, for example after objects were changed outside the API.
+        """
+        for _ in range(MANIFEST_WRITE_ATTEMPTS):
+            recipes = self._reconcile_once()
+            if recipes is not None:
+                return recipes
+        raise RuntimeError(f"Catalog manifest changed concurrently {MANIFEST_WRITE_ATTEMPTS} times while reconciling")
+
+    def _reconcile_on_refresh(self) -> None:
+        """
+        Rebuild a missing or dirty manifest. Listings keep working if the manifest cannot be written, the catalog is
+        then served from the listing and the manifest stays dirty until a later refresh writes it.
+        """
+        try:
+            # A concurrent writer already wrote a manifest, it is read on the next refresh
+            self._reconcile_once()
+        except Exception:
+            log.exception("Could not write the catalog manifest, serving the catalog from a listing until it is")
+            self._manifest_dirty = True
+            if self.catalog.is_stale():
+                self.catalog.replace(self._scan_entries())
+
+    def _update_manifest(self, upserts: List[CatalogEntry], removals: List[str]) -> None:
+        """
+        Apply recipe changes to the manifest with optimistic concurrency, re-reading it whenever another writer got in between.
+
+        The objects themselves are already written at this point, so a failed update only marks the manifest dirty,
+        it is rebuilt from the bucket on the next catalog refresh.
+        """
+        try:
+            for _ in range(MANIFEST_WRITE_ATTEMPTS):
+                current = self._read_manifest()
+                if current is None:
+                    self.reconcile_manifest_sync()
+                    return
+                manifest, etag = current
+                entries = apply_changes(entries_from_manifest(manifest), upserts, removals)
+                if self._write_manifest(entries.values(), manifest["version"] + 1, etag):
+                    self.catalog.replace(entries)
+                    return
+            log.error(f"Catalog manifest changed concurrently {MANIFEST_WRITE_ATTEMPTS} times, it is rebuilt on the next refresh")
+        except Exception:
+            log.exception("Could not update the catalog manifest, it is rebuilt on the next refresh")
+        self._manifest_dirty = True
+
+    def refresh_catalog_sync(self) -> None:
+        """
+        Reload the recipe catalog: from the manifest object if enabled, which is only downloaded if it changed,
+        and otherwise from a listing of the base path.
+        """
+        if not self.settings.catalog_manifest_enabled:
+            self.catalog.replace(self._scan_entries())
+            return
+        if self._manifest_dirty:
+            self._reconcile_on_refresh()
+            return
+        try:
+            resp = self.s3.get_object(
+                Bucket=self.settings.s3_bucket,
+                Key=self._manifest_key(),
+                **({"IfNoneMatch": self._manifest_etag} if self._manifest_etag else {}),
+            )
+        except self.s3.exceptions.NoSuchKey:
+            self._reconcile_on_refresh()
+            return
+        except ClientError as e:
+            if error_code(e) not in NOT_MODIFIED_CODES:
+                raise
+            self.catalog.touch()
+            return
+        self.catalog.replace(entries_from_manifest(json.loads(resp["Body"].read())))
+        self._manifest_etag = resp["ETag"]
+
+    def _ensure_catalog(self) -> None:
+        if not self.catalog.is_stale():
+            return
+        with self._catalog_refresh_lock:
+            if self.catalog.is_stale():
+                self.refresh_catalog_sync()
+
+    def warm_up_sync(self) -> None:
+        self._ensure_catalog()
+
+    def _recipes_etag(self) -> str:
+        # Listings carry presigned URLs, which are re-signed within the refresh margin of their expiry.
+        # Changing the ETag once per margin keeps clients from revalidating a listing with expired URLs.
+        epoch = int(time.time() // self.settings.presigned_url_refresh_margin_seconds)
+        return f'"{self.catalog.version()}-{epoch}"'
+
+    def recipes_etag_sync(self) -> Optional[str]:
+        self._ensure_catalog()
+        return self._recipes_etag()
+
+    def _html_etags(self, names: List[str]) -> Dict[str, Optional[str]]:
+        entries = {name: self.catalog.get(name) for name in names}
+        return {name: entry.html_etag if entry is not None else None for name, entry in entries.items()}
+
+    def html_etags_sync(self, names: List[str]) -> Dict[str, Optional[str]]:
+        self._ensure_catalog()
+        return self._html_etags(names)
+
+    def catalog_version_sync(self) -> Optional[str]:
+        self._ensure_catalog()
+        return self.catalog.version()
+
+    def _recipe_fingerprints(self) -> Dict[str, str]:
+        return {entry.name: entry_fingerprint(entry) for entry in self.catalog.entries()}
+
+    def recipe_fingerprints_sync(self) -> Dict[str, str]:
+        self._ensure_catalog()
+        return self._recipe_fingerprints()
+
+    def _catalog_entries(self, names: List[str]) -> List[CatalogEntry]:
+        return [entry for entry in map(self.catalog.get, names) if entry is not None]
+
+    def recipe_summaries_sync(self, names: List[str]) -> Dict[str, Optional[dict]]:
+        self._ensure_catalog()
+        return {entry.name: entry.summary for entry in self._catalog_entries(names)}
+
+    def get_recipes_sync(self, names: List[str]) -> List[Recipe]:
+        self._ensure_catalog()
+        return [self._to_recipe(entry) for entry in self._catalog_entries(names)]
+
+    def list_recipes_sync(self) -> List[Recipe]:
+        self._ensure_catalog()
+        return [self._to_recipe(entry) for entry in self.catalog.entries()]
+
+    def list_recipes_page_sync(self, limit: int, cursor: Optional[str] = None) -> tuple[List[Recipe], Optional[str]]:
+        after = decode_cursor(cursor) if cursor else None
+        self._ensure_catalog()
+        entries, has_more = self.catalog.page(limit, after)
+        next_cursor = encode_cursor(entries[-1].name) if has_more and entries else None
+        return [self._to_recipe(entry) for entry in entries], next_cursor
+
+    def _put(self, key: str, body: str, content_type: str) -> Optional[str]:
+        resp = self.s3.put_object(
             Bucket=self.settings.s3_bucket,
-            Key=str(json_key),
-            Body=json.dumps(recipe_dict, default=str),
-            ContentType="application/json",
+            Key=key,
+            Body=body,
+            ContentType=content_type,
         )
-        list_objects = self.s3.list_objects_v2(
-            Bucket=self.settings.s3_bucket, Prefix=str(html_key)
+        return resp.get("ETag")
+
+    def _copy_objects(self, copies: List[tuple[str, str, Optional[int]]]) -> None:
+        """
+        Copy (source key, destination key, size) triples concurrently on the S3 pool.
+
+        Objects of at least `s3_multipart_copy_threshold` bytes are copied server-side with UploadPartCopy,
+        with all parts of all objects sharing the pool. This also copies objects larger than 5 GB,
+        which a single CopyObject request cannot.
+        """
+        bucket = self.settings.s3_bucket
+        threshold = self.settings.s3_multipart_copy_threshold
+        part_size = self.settings.s3_multipart_copy_part_size
+
+        def head(source_key: str) -> dict:
+            return self.s3.head_object(Bucket=bucket, Key=source_key)
+
+        # Sizes from the draft listing spare a HEAD request for small objects,
+        # large ones are inspected anyway to carry their content type over
+        needs_head = [source for source, _, size in copies if size is None or size >= threshold]
+        heads = dict(zip(needs_head, self._io_pool.map(head, needs_head)))
+        small = [(source, dest) for source, dest, _ in copies if source not in heads or heads[source]["ContentLength"] < threshold]
+        large = [(source, dest) for source, dest, _ in copies if source in heads and heads[source]["ContentLength"] >= threshold]
+
+        def start_upload(source_dest: tuple[str, str]) -> str:
+            source, dest = source_dest
+            return self.s3.create_multipart_upload(
+                Bucket=bucket, Key=dest, ContentType=heads[source].get("ContentType", "binary/octet-stream"),
+            )["UploadId"]
+
+        upload_ids = list(self._io_pool.map(start_upload, large))
+        try:
+            futures = [
+                self._io_pool.submit(
+                    self.s3.copy_object,
+                    Bucket=bucket, CopySource={"Bucket": bucket, "Key": source}, Key=dest,
+                )
+                for source, dest in small
+            ]
+            part_futures: List[list] = []
+            for (source, dest), upload_id in zip(large, upload_ids):
+                size = heads[source]["ContentLength"]
+                part_futures.append([
+                    (part_number, self._io_pool.submit(
+                        self.s3.upload_part_copy,
+                        Bucket=bucket,
+                        Key=dest,
+                        UploadId=upload_id,
+                        PartNumber=part_number,
+                        CopySource={"Bucket": bucket, "Key": source},
+                        CopySourceRange=byte_range,
+                    ))
+                    for part_number, byte_range in part_ranges(size, part_size)
+                ])
+            for future in futures:
+                future.result()
+            for (_, dest), upload_id, parts in zip(large, upload_ids, part_futures):
+                self.s3.complete_multipart_upload(
+                    Bucket=bucket,
+                    Key=dest,
+                    UploadId=upload_id,
+                    MultipartUpload={"Parts": [
+                        {"ETag": future.result()["CopyPartResult"]["ETag"], "PartNumber": part_number}
+                        for part_number, future in parts
+                    ]},
+                )
+        except Exception:
+            for (_, dest), upload_id in zip(large, upload_ids):
+                try:
+                    self.s3.abort_multipart_upload(Bucket=bucket, Key=dest, UploadId=upload_id)
+                except Exception:
+                    log.exception(f"Could not abort multipart upload of {dest}")
+            raise
+
+    def _put_variants(self, source_key: str, media_key: str) -> List[str]:
+        """
+        Render and store the variants of the image at `source_key` for the recipe media `media_key`,
+        returning the variant keys. Variants are optional, so failures are logged and yield no variants.
+        """
+        try:
+            variants = build_variants(media_key, self.read_media_sync(source_key))
+            for key, webp in variants:
+                self.s3.put_object(
+                    Bucket=self.settings.s3_bucket,
+                    Key=key,
+                    Body=webp,
+                    ContentType="image/webp",
+                )
+        except UnidentifiedImageError:
+            log.info(f"{source_key} is not an image, skipping variants")
+            return []
+        except Exception:
+            log.exception(f"Could not create variants of {source_key}")
+            return []
+        return [key for key, _ in variants]
+
+    def backfill_media_variants_sync(self) -> int:
+        """Create the missing variants of all recipe media, returning the number of media files processed."""
+        todo = []
+        for entry in self._scan_entries().values():
+            with_variants = {parsed[0] for parsed in map(parse_variant_key, entry.variant_keys) if parsed is not None}
+            todo.extend(key for key in entry.media_keys if key not in with_variants)
+        list(self._io_pool.map(lambda key: self._put_variants(key, key), todo))
+        if self.settings.catalog_manifest_enabled:
+            self.reconcile_manifest_sync()
+        else:
+            self.refresh_catalog_sync()
+        return len(todo)
+
+    def _recipe_keys_for(self, recipe: DraftRecipe) -> tuple[str, str, str]:
+        """Name, HTML key and JSON key a recipe is stored under."""
+        name = str(Path(self.settings.s3_bucket_base_path) / f"{recipe.name}")
+        return name, f"{name}.html", f"{name}.json"
+
+    def put_recipe_sync(self, recipe: DraftRecipe, media: List[DraftMedia], recipe_html: str) -> Recipe:
+        name, html_key, json_key = self._recipe_keys_for(recipe)
+        recipe_json = json.dumps(asdict(recipe), default=str)
+        copies = [
+            (media_item.key, f"{name}/{media_item.name}", media_item.size)
+            for media_item in media if media_item.exists
+        ]
+        # The HTML and JSON writes run alongside the media copies
+        html_future = self._io_pool.submit(self._put, html_key, recipe_html, "text/html")
+        json_future = self._io_pool.submit(self._put, json_key, recipe_json, "application/json")
+        # Variants are rendered from the draft objects, so they do not wait for the copies
+        variant_futures = [
+            self._io_pool.submit(self._put_variants, source, dest)
+            for source, dest, _ in copies
+        ] if self.settings.media_variants_enabled else []
+        self._copy_objects(copies)
+        entry = CatalogEntry(
+            name=name,
+            html_key=html_key,
+            html_etag=html_future.result(),
+            json_key=json_key,
+            json_etag=json_future.result(),
+            summary=json.loads(recipe_json),
+            media_keys=sorted(dest for _, dest, _ in copies),
+            variant_keys=sorted(key for future in variant_futures for key in future.result()),
         )
-        return self._load_item(id, list_objects)
-    
-    def delete_recipe_sync(self, id: str) -> bool:
-        html_key = f"{id}.html"
-        json_key = f"{id}.json"
-        folder_key = f"{id}/"
-        resp = self.s3.delete_object(Bucket=self.settings.s3_bucket, Key=str(html_key))
-        if resp["ResponseMetadata"]["HTTPStatusCode"] != 204:
+        self.catalog.upsert(entry)
+        if self.settings.catalog_manifest_enabled:
+            self._update_manifest(upserts=[entry], removals=[])
+        return self._to_recipe(entry)
+
+    def replace_recipe_html_sync(self, name: str, recipe_html: str) -> bool:
+        self._ensure_catalog()
+        entry = self.catalog.get(name)
+        if entry is None:
             return False
-        self.s3.delete_object(Bucket=self.settings.s3_bucket, Key=str(json_key))
-        objects = self.s3.list_objects_v2(
-            Bucket=self.settings.s3_bucket, Prefix=str(folder_key)
-        )
-        if "Contents" not in objects:
-            return True
-        for obj in objects["Contents"]:
-            if "Key" not in obj:
-                continue
-            key = obj["Key"]
-            if key == folder_key:
-                continue
-            self.s3.delete_object(Bucket=self.settings.s3_bucket, Key=str(key))
+        entry = replace(entry, html_etag=self._put(entry.html_key, recipe_html, "text/html"))
+        self.catalog.upsert(entry)
+        if self.settings.catalog_manifest_enabled:
+            self._update_manifest(upserts=[entry], removals=[])
         return True
 
+    def _delete_keys(self, keys: List[str]) -> Dict[str, str]:
+        """
+        Delete `keys` with batched DeleteObjects requests, returning an error message for every key that could not be deleted.
+        """
+        batches = [keys[i:i + DELETE_BATCH_SIZE] for i in range(0, len(keys), DELETE_BATCH_SIZE)]
+
+        def delete_batch(batch: List[str]) -> Dict[str, str]:
+            resp = self.s3.delete_objects(
+                Bucket=self.settings.s3_bucket,
+                Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True},
+            )
+            return {
+                error.get("Key", ""): error.get("Message", error.get("Code", "Unknown error"))
+                for error in resp.get("Errors", [])
+            }
+
+        errors: Dict[str, str] = {}
+        for batch_errors in self._io_pool.map(delete_batch, batches):
+            errors.update(batch_errors)
+        return errors
+
+    def _recipe_keys(self, id: str) -> List[str]:
+        return self._recipe_keys_from(id, self.iter_objects(id))
+
+    def _collect_delete_results(self, keys_by_id: Dict[str, List[str]], errors: Dict[str, str], results: Dict[str, Optional[str]]) -> List[str]:
+        """
+        Fill in `results` for the recipes that were not already marked as failed and remove the recipes
+        whose HTML object is gone from the catalog, returning their names.
+        """
+        removed: List[str] = []
+        for id, keys in keys_by_id.items():
+            if id in results:
+                continue
+            failed = [f"{key}: {errors[key]}" for key in keys if key in errors]
+            results[id] = "; ".join(failed) if failed else None
+            if f"{id}.html" not in errors:
+                self.catalog.remove(id)
+                removed.append(id)
+        return removed
+
+    def _recipe_keys_from(self, id: str, objects: Iterable["ObjectTypeDef"]) -> List[str]:
+        return [
+            obj["Key"] for obj in objects
+            if obj["Key"] in (f"{id}.html", f"{id}.json") or obj["Key"].startswith(f"{id}/")
+        ]
+
+    def delete_recipes_sync(self, ids: List[str]) -> Dict[str, Optional[str]]:
+        keys_by_id = dict(zip(ids, self._io_pool.map(self._recipe_keys, ids)))
+        results = {id: "Recipe not found" for id, keys in keys_by_id.items() if f"{id}.html" not in keys}
+        to_delete = [key for id, keys in keys_by_id.items() if id not in results for key in keys]
+        removed = self._collect_delete_results(keys_by_id, self._delete_keys(to_delete), results)
+        if removed and self.settings.catalog_manifest_enabled:
+            self._update_manifest(upserts=[], removals=removed)
+        return results
+
+    def delete_recipe_sync(self, id: str) -> bool:
+        return self.delete_recipes_sync([id])[id] is None
+
     def _get_presigned_get_put_urls(self, key: str) -> tuple[str, str, str]:
-        get_url = self.s3.generate_presigned_url(
-            "get_object",
-            Params={"Bucket": self.settings.s3_bucket, "Key": key},
-            ExpiresIn=3600,
-        )
-        put_url = self.s3.generate_presigned_url(
-            "put_object",
-            Params={"Bucket": self.settings.s3_bucket, "Key": key},
-            ExpiresIn=3600,
-        )
-        delete_url = self.s3.generate_presigned_url(
-            "delete_object",
-            Params={"Bucket": self.settings.s3_bucket, "Key": key},
-            ExpiresIn=3600,
-        )
+        get_url = self._presign("get_object", key)
+        put_url = self._presign("put_object", key)
+        delete_url = self._presign("delete_object", key)
         return get_url, put_url, delete_url
 
+    def _draft_prefix(self, user_id: str) -> str:
+        return f"{Path(self.settings.s3_bucket_base_path) / self.settings.s3_draft_folder / user_id}/"
+
+    def _draft_recipe_key(self, user_id: str) -> str:
+        return str(Path(self.settings.s3_bucket_base_path) / self.settings.s3_draft_folder / f"{user_id}-draft.json")
+
     def get_draft_media_sync(self, user_id: str) -> List[DraftMedia]:
-        key = Path(self.settings.s3_bucket_base_path) / self.settings.s3_draft_folder / f"{user_id}"
-        existing_objects = self.s3.list_objects_v2(
-            Bucket=self.settings.s3_bucket, Prefix=f"{key}/"
-        )
+        return self._draft_media(user_id, self.iter_objects(self._draft_prefix(user_id)))
+
+    def _draft_media(self, user_id: str, objects: Iterable["ObjectTypeDef"]) -> List[DraftMedia]:
+        """Draft media for the listed objects of a user's draft."""
         draft_media = []
-        if existing_objects["KeyCount"] > 0:
-            assert "Contents" in existing_objects
-            for obj in existing_objects["Contents"]:
-                if "Key" not in obj:
-                    continue
-                assert "LastModified" in obj
-                key_inner = obj["Key"]
-                get_url, put_url, delete_url = self._get_presigned_get_put_urls(key_inner)
-                draft_media.append(
-                    DraftMedia(
-                        exists=True,
-                        name=key_inner.split("/")[-1],
-                        key=key_inner,
-                        get_url=get_url,
-                        put_url=put_url,
-                        delete_url=delete_url,
-                        create_timestamp=obj["LastModified"].timestamp(),
-                    )
-                )
-        for i in range(self.settings.max_num_draft_media - len(draft_media)):
-            uuid = str(uuid4())
-            key = Path(self.settings.s3_bucket_base_path) / self.settings.s3_draft_folder / f"{user_id}/{uuid}"
-            get_url, put_url, _ = self._get_presigned_get_put_urls(str(key))
+        for obj in objects:
+            assert "LastModified" in obj
+            key_inner = obj["Key"]
+            get_url, put_url, delete_url = self._get_presigned_get_put_urls(key_inner)
             draft_media.append(
                 DraftMedia(
-                    exists=False,
-                    key=str(key),
-                    name=uuid,
+                    exists=True,
+                    name=key_inner.split("/")[-1],
+                    key=key_inner,
                     get_url=get_url,
                     put_url=put_url,
+                    delete_url=delete_url,
+                    create_timestamp=obj["LastModified"].timestamp(),
+                    size=obj.get("Size"),
+                    etag=obj.get("ETag"),
                 )
             )
         return draft_media
 
+    def _upload_slots(self, user_id: str, count: int) -> List[DraftMedia]:
+        slots = []
+        for _ in range(count):
+            uuid = str(uuid4())
+            key = f"{self._draft_prefix(user_id)}{uuid}"
+            # Slot keys are fresh on every call, caching their URLs would only evict useful entries
+            slots.append(
+                DraftMedia(
+                    exists=False,
+                    key=key,
+                    name=uuid,
+                    get_url=self._sign("get_object", key),
+                    put_url=self._sign("put_object", key),
+                )
+            )
+        return slots
+
+    def create_upload_slots_sync(self, user_id: str, count: int) -> List[DraftMedia]:
+        existing = sum(1 for _ in self.iter_objects(self._draft_prefix(user_id)))
+        return self._upload_slots(user_id, min(count, self.settings.max_num_draft_media - existing))
+
+    def read_media_sync(self, key: str) -> bytes:
+        return self.s3.get_object(Bucket=self.settings.s3_bucket, Key=key)["Body"].read()
+
     def get_draft_recipe_sync(self, user_id: str) -> Optional[DraftRecipe]:
-        key = Path(self.settings.s3_bucket_base_path) / self.settings.s3_draft_folder / f"{user_id}-draft.json"
+        key = self._draft_recipe_key(user_id)
         try:
             existing_object = self.s3.get_object(
                 Bucket=self.settings.s3_bucket, Key=str(key)
@@ -293,9 +947,8 @@ class S3StorageRepository(StorageRepository):
         draft_recipe = TypeAdapter(DraftRecipe).validate_json(contents)
         return draft_recipe
 
-    def put_draft_recipe_sync(self, user_id: str, recipe: DraftRecipeRequestModel) -> DraftRecipe:
-        key = Path(self.settings.s3_bucket_base_path) / self.settings.s3_draft_folder / f"{user_id}-draft.json"
-        draft_recipe = recipe.to_draft_recipe(created_by=user_id)
+    def store_draft_recipe_sync(self, user_id: str, draft_recipe: DraftRecipe) -> None:
+        key = self._draft_recipe_key(user_id)
         json_dict = asdict(draft_recipe)
         self.s3.put_object(
             Bucket=self.settings.s3_bucket,
@@ -303,10 +956,13 @@ class S3StorageRepository(StorageRepository):
             Body=json.dumps(json_dict, default=str),
             ContentType="application/json",
         )
-        return draft_recipe
+
+    def delete_draft_media_sync(self, user_id: str) -> Dict[str, str]:
+        keys = [obj["Key"] for obj in self.iter_objects(self._draft_prefix(user_id))]
+        return self._delete_keys(keys)
 
     def delete_draft_recipe_sync(self, user_id):
-        key = Path(self.settings.s3_bucket_base_path) / self.settings.s3_draft_folder / f"{user_id}-draft.json"
+        key = self._draft_recipe_key(user_id)
         try:
             self.s3.delete_object(Bucket=self.settings.s3_bucket, Key=str(key))
             return True
@@ -1,8 +1,11 @@
+from pathlib import Path
+
 import pytest
 
 from wasfeines.app import create_app
 from wasfeines.app import valid_user_session
 from wasfeines.models import User
+from wasfeines.settings import Settings
 
 def mock_valid_user_session() -> User:
     return User(
@@ -18,4 +21,41 @@ def mock_valid_user_session() -> User:
 def app():
     app = create_app()
     app.dependency_overrides[valid_user_session] = mock_valid_user_session
-    yield app
\ No newline at end of file
+    yield app
+
+@pytest.fixture
+def settings() -> Settings:
+    return Settings.model_validate({
+        "S3_BUCKET": "test-bucket",
+        "S3_ACCESS_KEY": "test-access-key",
+        "S3_SECRET_ACCESS_KEY": "test-secret-key",
+        "S3_REGION": "eu-central-1",
+        "S3_ENDPOINT_URL": "https://s3.example.com",
+        "S3_BUCKET_BASE_PATH": "recipes",
+        "OIDC_CLIENT_ID": "test-client-id",
+        "OIDC_CLIENT_SECRET": "test-client-secret",
+        "OIDC_DOMAIN": "example.com",
+        "OIDC_REDIRECT_URI": "https://example.com/api/v1/auth",
+        "APP_SECRET_KEY": "test-secret",
+        "ANTHROPIC_API_KEY": "test-anthropic-key",
+    })
+
+@pytest.fixture
+def filesystem_settings(tmp_path: Path) -> Settings:
+    return Settings.model_validate({
+        "STORAGE_BACKEND": "filesystem",
+        "CONTENT_DIR": str(tmp_path),
+        "GENERATION_CACHE_DIR": "",
+        "OIDC_CLIENT_ID": "test-client-id",
+        "OIDC_CLIENT_SECRET": "test-client-secret",
+        "OIDC_DOMAIN": "example.com",
+        "OIDC_REDIRECT_URI": "https://example.com/api/v1/auth",
+        "APP_SECRET_KEY": "test-secret",
+        "ANTHROPIC_API_KEY": "test-anthropic-key",
+    })
+
+@pytest.fixture
+def filesystem_app(filesystem_settings: Settings):
+    app = create_app(filesystem_settings)
+    app.dependency_overrides[valid_user_session] = mock_valid_user_session
+    yield app
@@ -11,38 +11,37 @@ def test_e2e_api_draft_media(app):
     with TestClient(app) as client:
         resp = client.get("/api/v1/draftmedia")
         assert resp.status_code == 200
-        json = resp.json()
-        length = len(json)
-        assert length > 0, "Expected at least one draft media item"
-        assert "get_url" in json[0]
-        assert "put_url" in json[0]
+        existing = resp.json()
+        length = len(existing)
+        assert all(item["exists"] for item in existing), "Expected only uploaded draft media items"
+
+        resp = client.post("/api/v1/draftmedia/slots", params={"count": 1})
+        assert resp.status_code == 200
+        slots = resp.json()
+        assert len(slots) == 1, "Expected one upload slot"
+        assert slots[0]["exists"] is False, "Expected the upload slot to be empty"
+        assert "put_url" in slots[0]
 
         with open("tests/_assets/test_img.png", "rb") as file:
-            resp = httpx.put(json[-1]["put_url"], content=file.read())
+            resp = httpx.put(slots[0]["put_url"], content=file.read())
             assert resp.status_code == 200, resp.headers
 
-        resp = httpx.get(json[-1]["get_url"])
-        assert resp.status_code == 200
-
-        resp = client.get("/api/v1/draftmedia")
+        resp = httpx.get(slots[0]["get_url"])
         assert resp.status_code == 200
-        json2 = resp.json()
-        assert len(json2) == length + 1, "Expected one more draft media item"
-        assert json2[-1]["exists"] is False, "Expected the last draft media item to not exist"
 
         resp = client.get("/api/v1/draftmedia")
         assert resp.status_code == 200
-        json3 = resp.json()
-        delete_url = json3[-2]["delete_url"]
+        uploaded = [item for item in resp.json() if item["key"] == slots[0]["key"]]
+        assert len(resp.json()) == length + 1, "Expected one more draft media item"
+        assert len(uploaded) == 1 and uploaded[0]["exists"] is True, "Expected the uploaded draft media item to exist"
+        delete_url = uploaded[0]["delete_url"]
         assert delete_url is not None, "Expected a delete URL for the draft media item"
-        assert json3[-2]["exists"] is True, "Expected the draft media item to exist"
 
         resp = httpx.delete(delete_url)
         assert resp.status_code == 204, resp.headers
         resp = client.get("/api/v1/draftmedia")
         assert resp.status_code == 200
-        json4 = resp.json()
-        assert len(json4) == length, "Expected the draft media item to be deleted"
+        assert len(resp.json()) == length, "Expected the draft media item to be deleted"
 
 def test_e2e_api_draft_recipe(app):
     with TestClient(app) as client:
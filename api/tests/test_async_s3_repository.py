@@ -0,0 +1,138 @@
+from urllib.parse import unquote
+from xml.etree import ElementTree
+import hashlib
+import json
+import base64
+
+import httpx
+import pytest
+
+from wasfeines.models.draft import DraftRecipe, DraftRecipeRequestModel
+from wasfeines.storage.async_s3 import AsyncS3StorageRepository
+
+USER = "test@user.com"
+S3_NS = "{http://s3.amazonaws.com/doc/2006-03-01/}"
+
+
+class FakeS3:
+    """In-memory bucket speaking just enough of the S3 REST API for the repository."""
+
+    def __init__(self):
+        self.objects: dict[str, bytes] = {}
+        self.requests: list[httpx.Request] = []
+
+    def etag(self, key: str) -> str:
+        return f'"{hashlib.md5(self.objects[key]).hexdigest()}"'
+
+    def error(self, status: int, code: str) -> httpx.Response:
+        return httpx.Response(status, content=f"<Error><Code>{code}</Code><Message>{code}</Message></Error>".encode())
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        assert request.headers["authorization"].startswith("AWS4-HMAC-SHA256 ")
+        _, bucket, *key_parts = unquote(request.url.path).split("/")
+        assert bucket == "test-bucket"
+        key = "/".join(key_parts)
+        params = request.url.params
+        if request.method == "GET" and params.get("list-type") == "2":
+            keys = sorted(k for k in self.objects if k.startswith(params.get("prefix", "")))
+            contents = "".join(f"<Contents><Key>{k}</Key><ETag>{self.etag(k)}</ETag><Size>{len(self.objects[k])}</Size><LastModified>2025-03-17T14:28:32.000Z</LastModified></Contents>" for k in keys)
+            return httpx.Response(200, content=f"<ListBucketResult><KeyCount>{len(keys)}</KeyCount><IsTruncated>false</IsTruncated>{contents}</ListBucketResult>".encode())
+        if request.method == "POST" and "delete" in params:
+            body = request.read()
+            assert request.headers["content-md5"] == base64.b64encode(hashlib.md5(body).digest()).decode()
+            for element in ElementTree.fromstring(body).iter(f"{S3_NS}Key"):
+                self.objects.pop(element.text, None)
+            return httpx.Response(200, content=b"<DeleteResult></DeleteResult>")
+        if request.method in ("GET", "HEAD"):
+            if key not in self.objects:
+                return self.error(404, "NoSuchKey")
+            if request.headers.get("if-none-match") == self.etag(key):
+                return httpx.Response(304)
+            headers = {"ETag": self.etag(key), "Content-Length": str(len(self.objects[key]))}
+            return httpx.Response(200, headers=headers, content=b"" if request.method == "HEAD" else self.objects[key])
+        if request.method == "PUT" and "x-amz-copy-source" in request.headers:
+            source = unquote(request.headers["x-amz-copy-source"]).split("/", 1)[1]
+            self.objects[key] = self.objects[source]
+            return httpx.Response(200, content=f"<CopyObjectResult><ETag>{self.etag(key)}</ETag></CopyObjectResult>".encode())
+        if request.method == "PUT":
+            if request.headers.get("if-none-match") == "*" and key in self.objects:
+                return self.error(412, "PreconditionFailed")
+            if "if-match" in request.headers and (key not in self.objects or request.headers["if-match"] != self.etag(key)):
+                return self.error(412, "PreconditionFailed")
+            self.objects[key] = request.read()
+            return httpx.Response(200, headers={"ETag": self.etag(key)})
+        if request.method == "DELETE":
+            self.objects.pop(key, None)
+            return httpx.Response(204)
+        raise AssertionError(f"Unexpected request {request.method} {request.url}")
+
+
+@pytest.fixture
+def fake_s3() -> FakeS3:
+    return FakeS3()
+
+
+@pytest.fixture
+def repo(settings, fake_s3):
+    settings.media_variants_enabled = False
+    return AsyncS3StorageRepository(settings, transport=httpx.MockTransport(fake_s3.handler))
+
+
+@pytest.mark.asyncio
+async def test_draft_recipe_round_trip(repo):
+    assert await repo.get_draft_recipe(USER) is None
+    await repo.put_draft_recipe(USER, DraftRecipeRequestModel(name="A", user_content=None, user_tags=None, user_rating=None))
+    assert (await repo.get_draft_recipe(USER)).name == "A"
+    assert await repo.delete_draft_recipe(USER)
+    assert await repo.get_draft_recipe(USER) is None
+
+
+@pytest.mark.asyncio
+async def test_draft_recipe_saves_are_coalesced(repo, fake_s3):
+    draft_key = f"recipes/drafts/{USER}-draft.json"
+    for name in ("A", "AB", "ABC"):
+        await repo.put_draft_recipe(USER, DraftRecipeRequestModel(name=name, user_content=None, user_tags=None, user_rating=None))
+    assert draft_key not in fake_s3.objects
+    assert (await repo.get_draft_recipe(USER)).name == "ABC"
+    await repo.drafts.flush()
+    assert json.loads(fake_s3.objects[draft_key])["name"] == "ABC"
+    # Cached drafts are served without a request
+    fake_s3.objects.clear()
+    assert (await repo.get_draft_recipe(USER)).name == "ABC"
+
+
+@pytest.mark.asyncio
+async def test_publish_list_and_delete_recipe(repo, fake_s3):
+    repo.settings.catalog_manifest_enabled = True
+    fake_s3.objects[f"recipes/drafts/{USER}/photo one"] = b"jpeg"
+    existing = await repo.get_draft_media(USER)
+    assert [m.size for m in existing] == [4]
+    assert len(await repo.create_upload_slots(USER, 100)) == repo.settings.max_num_draft_media - 1
+
+    recipe = DraftRecipe(name="recipe_A", key=None, created_by=USER, user_content=None, user_tags=None, ratings=None)
+    published = await repo.put_recipe(recipe, existing, "<section></section>")
+    assert [m.name for m in published.media] == ["recipes/recipe_A/photo one"]
+    assert fake_s3.objects["recipes/recipe_A/photo one"] == b"jpeg"
+    assert "recipes/catalog-manifest.json" in fake_s3.objects
+
+    # A fresh instance reads the catalog from the manifest alone
+    other = AsyncS3StorageRepository(repo.settings, transport=httpx.MockTransport(fake_s3.handler))
+    fake_s3.requests.clear()
+    assert [r.name for r in await other.list_recipes()] == ["recipes/recipe_A"]
+    assert len(fake_s3.requests) == 1
+
+    assert await repo.delete_draft_media(USER) == {}
+    assert await repo.delete_recipe("recipes/recipe_A")
+    assert not await repo.delete_recipe("recipes/recipe_A")
+    assert not any(key.startswith("recipes/recipe_A") for key in fake_s3.objects)
+    assert await repo.list_recipes() == []
+
+    # The other instance only revalidates its copy of the manifest
+    fake_s3.requests.clear()
+    await other.refresh_catalog()
+    assert [r.name for r in await other.list_recipes()] == []
+    await other.refresh_catalog()
+    assert [request.headers.get("if-none-match") for request in fake_s3.requests][-1] is not None
+    await repo.aclose()
+    await other.aclose()
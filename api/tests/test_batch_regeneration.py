@@ -0,0 +1,77 @@
+import json
+
+import pytest
+
+from wasfeines.cli import main
+from wasfeines.llm.anthropic_recipe_service import AnthropicRecipeService
+from wasfeines.llm.batch_regeneration import BatchRegenerator, custom_id, draft_from_summary
+from wasfeines.llm.fake_client import FakeAnthropic
+from wasfeines.llm.media_preprocessing import MediaPreprocessor
+from wasfeines.models.recipe import Recipe
+from wasfeines.storage.filesystem import FileSystemStorageRepository
+
+NEW_HTML = '<summary>{"name": "New"}</summary><section class="recipe--header"><h1>New</h1></section>'
+
+
+@pytest.fixture
+def repo(filesystem_settings, tmp_path):
+    (tmp_path / "recipe_A.html").write_text("<h1>Old A</h1>")
+    (tmp_path / "recipe_A.json").write_text(json.dumps({"title": "Recipe A", "description": "Old", "tags": ["snack"], "added_by": "Anja"}))
+    (tmp_path / "recipe_B.html").write_text("<h1>Old B</h1>")
+    return FileSystemStorageRepository(filesystem_settings)
+
+
+def _regenerator(filesystem_settings, repo, client: FakeAnthropic) -> BatchRegenerator:
+    service = AnthropicRecipeService(filesystem_settings, repo)
+    service.client = client
+    media_preprocessor = MediaPreprocessor(repo, max_edge=64, quality=80, cache_size=4)
+    return BatchRegenerator(service, repo, media_preprocessor, poll_seconds=0, sleep=lambda seconds: None)
+
+
+def test_draft_from_legacy_summary():
+    recipe = Recipe(name="recipe_A", content_url="", media=[], summary={"title": "A", "description": "Old", "tags": ["x"], "added_by": "Anja"})
+    draft = draft_from_summary(recipe)
+    assert (draft.name, draft.created_by, draft.user_content, draft.user_tags) == ("A", "Anja", "Old", ["x"])
+
+
+def test_batch_replaces_html_of_succeeded_recipes(filesystem_settings, repo, tmp_path):
+    def respond(params):
+        if "Old B" in json.dumps(params["messages"]):
+            raise RuntimeError("overloaded")
+        return NEW_HTML
+
+    client = FakeAnthropic(respond, polls_until_ended=3)
+    outcome = _regenerator(filesystem_settings, repo, client).run(repo.list_recipes_sync(), upgrade=True)
+
+    assert outcome.updated == ["recipe_A"]
+    assert outcome.failed == {"recipe_B": "overloaded"}
+    assert (tmp_path / "recipe_A.html").read_text() == NEW_HTML
+    assert (tmp_path / "recipe_B.html").read_text() == "<h1>Old B</h1>"
+    # The instructions are a cacheable system prefix shared by all requests
+    systems = {json.dumps(request["system"]) for request in client.messages.requests}
+    assert len(systems) == 1
+    assert client.messages.requests[0]["system"][0]["cache_control"] == {"type": "ephemeral"}
+
+
+def test_results_of_a_submitted_batch_can_be_applied_later(filesystem_settings, repo, tmp_path):
+    client = FakeAnthropic(lambda params: NEW_HTML)
+    regenerator = _regenerator(filesystem_settings, repo, client)
+    recipes = repo.list_recipes_sync()
+    batch_id = regenerator.submit(recipes)
+    (tmp_path / "recipe_B.html").unlink()
+
+    outcome = regenerator.run(recipes, batch_id=batch_id)
+    assert outcome.updated == ["recipe_A"]
+    assert outcome.failed == {"recipe_B": "Recipe not found"}
+    assert custom_id("recipe_A") != custom_id("recipe_B")
+
+
+def test_cli_fake_regeneration_is_a_dry_run(filesystem_settings, repo, tmp_path, monkeypatch, caplog):
+    for name, value in filesystem_settings.model_dump(by_alias=True).items():
+        if value is not None:
+            monkeypatch.setenv(name, str(value))
+    with caplog.at_level("INFO"):
+        main(["regenerate", "--fake", "--recipe", "recipe_A", "--poll-seconds", "0"])
+    assert "Would have regenerated 1 recipes" in caplog.text
+    assert (tmp_path / "recipe_A.html").read_text() == "<h1>Old A</h1>"
+    assert (tmp_path / "recipe_B.html").read_text() == "<h1>Old B</h1>"
@@ -0,0 +1,30 @@
+import pytest
+
+pytest.importorskip("moto")
+
+from benchmarks.__main__ import compare
+from benchmarks.suite import Measurement, run_suite
+
+
+def test_suite_runs_against_the_emulator():
+    results = run_suite(sizes=[3], iterations=2, targets=["repository", "api"], llm_latency_seconds=0)
+    by_operation = {(result.target, result.operation): result for result in results}
+    assert len(by_operation) == len(results)
+    # Listings are served from the in-memory catalog
+    assert by_operation[("repository", "list")].s3_calls_total == 0
+    assert by_operation[("api", "list")].s3_calls_total == 0
+    assert by_operation[("repository", "publish")].s3_calls["PutObject"] >= 2
+    assert all(result.p99_ms >= result.p50_ms > 0 for result in results)
+
+
+def test_compare_flags_additional_requests_and_slowdowns():
+    result = Measurement(target="api", operation="list", recipes=10, iterations=5, p50_ms=9.0, p99_ms=12.0, mean_ms=9.5, s3_calls_total=1.0)
+    baseline = {"results": [{"target": "api", "operation": "list", "recipes": 10, "p50_ms": 5.0, "s3_calls_total": 0.0}]}
+    assert compare([result], baseline, tolerance=0.5, latency=True) == [
+        "api list with 10 recipes: 0.0 -> 1.0 S3 requests",
+        "api list with 10 recipes: p50 5.0 -> 9.0 ms",
+    ]
+    # Latencies recorded elsewhere are not compared
+    assert compare([result], baseline, tolerance=0.5) == ["api list with 10 recipes: 0.0 -> 1.0 S3 requests"]
+    baseline["results"][0].update(p50_ms=8.0, s3_calls_total=1.0)
+    assert compare([result], baseline, tolerance=0.5, latency=True) == []
@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+
+from wasfeines.cache import TTLCache
+from wasfeines.models.draft import DraftRecipe
+from wasfeines.storage.drafts import DraftRecipeCache
+from wasfeines.storage.repository import S3StorageRepository
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_ttl_cache_expires_entries():
+    clock = FakeClock()
+    cache: TTLCache[str, int] = TTLCache(max_size=10, ttl_seconds=5, clock=clock)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    clock.now = 6
+    assert cache.get("a") is None
+    assert cache.stats() == {"size": 0, "hits": 1, "misses": 1}
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache: TTLCache[str, int] = TTLCache(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_presigned_urls_are_reused(settings):
+    repo = S3StorageRepository(settings)
+    first = repo._presign("get_object", "recipes/recipe_A.html")
+    second = repo._presign("get_object", "recipes/recipe_A.html")
+    assert first == second
+    assert repo._presign("put_object", "recipes/recipe_A.html") != first
+    assert repo.presigned_urls.hits == 1
+    assert repo.presigned_urls.misses == 2
+
+
+def _draft(name: str) -> DraftRecipe:
+    return DraftRecipe(name=name, key=None, created_by="user", user_content=None, user_tags=None, ratings=None)
+
+
+@pytest.mark.asyncio
+async def test_draft_cache_keeps_failed_writes_pending():
+    stored = {}
+    failures = 2
+
+    async def store(user_id: str, draft_recipe: DraftRecipe) -> None:
+        nonlocal failures
+        if failures:
+            failures -= 1
+            raise ConnectionError("S3 unavailable")
+        stored[user_id] = draft_recipe
+
+    async def load(user_id: str):
+        return stored.get(user_id)
+
+    async def remove(user_id: str) -> bool:
+        return stored.pop(user_id, None) is not None
+
+    drafts = DraftRecipeCache(load, store, remove, max_size=10, write_delay_seconds=0.01)
+    await drafts.put("user", _draft("A"))
+    await asyncio.sleep(0.02)
+    assert failures <= 1
+    assert (await drafts.get("user")).name == "A"
+    await drafts.flush()
+    assert stored["user"].name == "A"
+
+    # Shutdown gives up on writes that keep failing instead of hanging
+    failures = 10
+    await drafts.put("user", _draft("B"))
+    await drafts.flush()
+    assert failures == 7
+    assert stored["user"].name == "A"
+
+
+@pytest.mark.asyncio
+async def test_draft_cache_delete_waits_for_writes_in_flight():
+    stored = {}
+    writing = asyncio.Event()
+    release = asyncio.Event()
+
+    async def store(user_id: str, draft_recipe: DraftRecipe) -> None:
+        writing.set()
+        await release.wait()
+        stored[user_id] = draft_recipe
+
+    async def load(user_id: str):
+        return stored.get(user_id)
+
+    async def remove(user_id: str) -> bool:
+        return stored.pop(user_id, None) is not None
+
+    drafts = DraftRecipeCache(load, store, remove, max_size=10, write_delay_seconds=0.01)
+    await drafts.put("user", _draft("A"))
+    await writing.wait()
+    delete = asyncio.create_task(drafts.delete("user"))
+    await asyncio.sleep(0.01)
+    assert not delete.done()
+    release.set()
+    assert await delete
+    assert stored == {}
+    assert await drafts.get("user") is None
@@ -0,0 +1,58 @@
+import asyncio
+import threading
+
+import pytest
+
+from wasfeines.executors import PoolRegistry
+
+
+def test_executor_reports_queued_calls():
+    pools = PoolRegistry()
+    pool = pools.executor("storage-write", 1)
+    release = threading.Event()
+    running = pool.submit(release.wait)
+    waiting = pool.submit(lambda: 42)
+    stats = pool.stats()
+    assert (stats.active, stats.queued) == (1, 1)
+    release.set()
+    assert running.result(timeout=1) and waiting.result(timeout=1) == 42
+    stats = pool.stats()
+    assert (stats.active, stats.queued, stats.completed) == (0, 0, 2)
+    assert stats.wait_seconds_max > 0
+    pools.shutdown()
+
+
+def test_executor_map_keeps_order_and_counts_calls():
+    pools = PoolRegistry()
+    pool = pools.executor("s3-io", 4)
+    assert list(pool.map(lambda a, b: a * b, [1, 2, 3], [4, 5, 6])) == [4, 10, 18]
+    assert pool.submit(lambda value, scale=1: value * scale, 2, scale=3).result(timeout=1) == 6
+    assert pool.stats().completed == 4
+    pools.shutdown()
+
+
+def test_registry_returns_existing_pools():
+    pools = PoolRegistry()
+    assert pools.executor("storage-read", 4) is pools.executor("storage-read", 8)
+    assert [stats.name for stats in pools.stats()] == ["storage-read"]
+    pools.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_limiter_bounds_concurrency():
+    limiter = PoolRegistry().limiter("llm", 2)
+    in_flight = 0
+    max_in_flight = 0
+
+    async def work():
+        nonlocal in_flight, max_in_flight
+        async with limiter:
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+
+    await asyncio.gather(*(work() for _ in range(5)))
+    stats = limiter.stats()
+    assert max_in_flight == 2
+    assert (stats.active, stats.queued, stats.completed) == (0, 0, 5)
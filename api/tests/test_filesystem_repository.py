@@ -0,0 +1,153 @@
+import asyncio
+import io
+import json
+
+from fastapi.testclient import TestClient
+from PIL import Image
+import pytest
+
+from wasfeines.models.draft import DraftRecipeRequestModel
+from wasfeines.storage.filesystem import FileSystemStorageRepository
+
+USER = "test@user.com"
+
+
+def _png() -> bytes:
+    out = io.BytesIO()
+    Image.new("RGB", (640, 480), "red").save(out, format="PNG")
+    return out.getvalue()
+
+
+def test_publish_list_and_delete_recipe(filesystem_settings):
+    repo = FileSystemStorageRepository(filesystem_settings)
+    [slot] = repo.create_upload_slots_sync(USER, 1)
+    repo.write_media_sync(slot.key, [_png()])
+    draft = repo.put_draft_recipe_sync(USER, DraftRecipeRequestModel(
+        name="recipe_A", user_content="Tasty", user_tags=None, user_rating=None,
+    ))
+    media = repo.get_draft_media_sync(USER)
+    assert [m.key for m in media] == [slot.key]
+    assert media[0].etag is not None
+
+    recipe = repo.put_recipe_sync(draft, media, "<summary>{}</summary>")
+    assert recipe.name == "recipe_A"
+    assert recipe.content_url == "/api/v1/media/recipe_A.html"
+    assert recipe.media[0].thumbnail.width == 320
+
+    assert repo.delete_draft_media_sync(USER) == {}
+    assert repo.delete_draft_recipe_sync(USER)
+    recipes = repo.list_recipes_sync()
+    assert [r.name for r in recipes] == ["recipe_A"]
+    assert recipes[0].summary["user_content"] == "Tasty"
+
+    assert repo.delete_recipe_sync("recipe_A")
+    assert not repo.delete_recipe_sync("recipe_A")
+    assert repo.list_recipes_sync() == []
+
+
+def test_keys_outside_of_the_content_dir_are_rejected(filesystem_settings):
+    repo = FileSystemStorageRepository(filesystem_settings)
+    with pytest.raises(ValueError):
+        repo.path("../secret")
+    assert not repo.is_draft_media_key(USER, "drafts/other@user.com/1234")
+    assert repo.is_draft_media_key(USER, f"drafts/{USER}/1234")
+    assert repo.is_readable_media_key(USER, f"drafts/{USER}/1234")
+    assert repo.is_readable_media_key(USER, "recipe_A/1234")
+    assert not repo.is_readable_media_key(USER, "drafts/other@user.com/1234")
+    assert not repo.is_readable_media_key(USER, f"drafts/{USER}-draft.json")
+    assert not repo.is_readable_media_key(USER, "drafts/other@user.com/../other@user.com-draft.json")
+
+
+def test_media_routes(filesystem_app, filesystem_settings):
+    with TestClient(filesystem_app) as client:
+        [slot] = client.post("/api/v1/draftmedia/slots", params={"count": 1}).json()
+        assert client.put(slot["put_url"], content=b"0123456789").status_code == 200
+        assert client.put("/api/v1/media/recipe_A.html", content=b"x").status_code == 403
+
+        response = client.get(slot["get_url"])
+        assert response.content == b"0123456789"
+        etag = response.headers["etag"]
+        assert client.get(slot["get_url"], headers={"If-None-Match": etag}).status_code == 304
+        partial = client.get(slot["get_url"], headers={"Range": "bytes=2-4"})
+        assert partial.status_code == 206
+        assert partial.content == b"234"
+
+        assert client.delete(slot["put_url"]).status_code == 200
+        assert client.get(slot["get_url"]).status_code == 404
+        assert client.get("/api/v1/media/../../etc/passwd").status_code == 404
+
+        other = FileSystemStorageRepository(filesystem_settings)
+        other.put_draft_recipe_sync("other@user.com", DraftRecipeRequestModel(
+            name="recipe_B", user_content="Secret", user_tags=None, user_rating=None,
+        ))
+        [other_slot] = other.create_upload_slots_sync("other@user.com", 1)
+        other.write_media_sync(other_slot.key, [b"secret"])
+        assert client.get(f"/api/v1/media/{other_slot.key}").status_code == 403
+        assert client.head(f"/api/v1/media/{other_slot.key}").status_code == 403
+        assert client.get("/api/v1/media/drafts/other@user.com-draft.json").status_code == 403
+
+
+def test_media_uploads_are_streamed_to_disk(filesystem_settings, tmp_path):
+    repo = FileSystemStorageRepository(filesystem_settings)
+    key = f"drafts/{USER}/1234"
+
+    async def chunks(fail: bool):
+        for chunk in (b"0123", b"4567"):
+            yield chunk
+        if fail:
+            raise ConnectionError("Client went away")
+
+    etag = asyncio.run(repo.write_media_stream(key, chunks(fail=False)))
+    assert repo.read_media_sync(key) == b"01234567"
+    assert etag == repo.get_draft_media_sync(USER)[0].etag
+    with pytest.raises(ConnectionError):
+        asyncio.run(repo.write_media_stream(f"drafts/{USER}/5678", chunks(fail=True)))
+    # Failed uploads leave neither the file nor its temporary file behind
+    assert [path.name for path in (tmp_path / "drafts" / USER).iterdir()] == ["1234"]
+    repo.pools.shutdown()
+
+
+def test_recipe_list_is_revalidated_with_etag(filesystem_app, filesystem_settings):
+    repo = FileSystemStorageRepository(filesystem_settings)
+    with TestClient(filesystem_app) as client:
+        response = client.get("/api/v1/recipes")
+        etag = response.headers["etag"]
+        assert response.json() == []
+        not_modified = client.get("/api/v1/recipes", headers={"If-None-Match": etag})
+        assert not_modified.status_code == 304
+        assert not_modified.content == b""
+
+        draft = repo.put_draft_recipe_sync(USER, DraftRecipeRequestModel(
+            name="recipe_A", user_content=None, user_tags=None, user_rating=None,
+        ))
+        repo.put_recipe_sync(draft, [], "<summary>{}</summary>")
+        response = client.get("/api/v1/recipes", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+        assert [recipe["name"] for recipe in response.json()] == ["recipe_A"]
+
+
+def test_recipe_bundle_inlines_html(filesystem_app, filesystem_settings, tmp_path):
+    repo = FileSystemStorageRepository(filesystem_settings)
+    for name in ("recipe_A", "recipe_B"):
+        draft = repo.put_draft_recipe_sync(USER, DraftRecipeRequestModel(
+            name=name, user_content=None, user_tags=None, user_rating=None,
+        ))
+        repo.put_recipe_sync(draft, [], f"<h1>{name}</h1>")
+    with TestClient(filesystem_app) as client:
+        response = client.get("/api/v1/recipes/bundle", params={"limit": 1}, headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["content-type"] == "application/x-ndjson"
+        [line] = [json.loads(line) for line in response.text.splitlines()]
+        assert (line["recipe"]["name"], line["html"]) == ("recipe_A", "<h1>recipe_A</h1>")
+
+        response = client.get("/api/v1/recipes/bundle", params={"cursor": response.headers["x-next-cursor"]})
+        etag = response.headers["etag"]
+        assert [json.loads(line)["html"] for line in response.text.splitlines()] == ["<h1>recipe_B</h1>"]
+        assert client.get("/api/v1/recipes/bundle", headers={"If-None-Match": etag}).status_code == 304
+
+        (tmp_path / "recipe_B.html").write_text("<h1>Changed</h1>")
+        response = client.get("/api/v1/recipes/bundle", headers={"If-None-Match": etag, "Accept-Encoding": "identity"})
+        assert "content-encoding" not in response.headers
+        assert [json.loads(line)["html"] for line in response.text.splitlines()] == ["<h1>recipe_A</h1>", "<h1>Changed</h1>"]
+        assert filesystem_app.state.recipe_contents.cache.stats()["hits"] == 1
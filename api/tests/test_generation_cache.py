@@ -0,0 +1,82 @@
+from datetime import datetime
+import os
+
+import pytest
+
+from wasfeines.llm.anthropic_recipe_service import LLMRecipeService
+from wasfeines.llm.generation_cache import CachingRecipeService, DiskGenerationStore, generation_cache_key
+from wasfeines.models.draft import DraftMedia, DraftRecipe
+from wasfeines.models.rating import Rating
+
+
+class CountingRecipeService(LLMRecipeService):
+    def __init__(self):
+        self.calls = 0
+
+    def generate_recipe_html_sync(self, draft_recipe, draft_media):
+        self.calls += 1
+        return {"name": "Soup"}, '<summary>{"name": "Soup"}</summary>'
+
+
+class TruncatedRecipeService(CountingRecipeService):
+    def generate_recipe_html_sync(self, draft_recipe, draft_media):
+        self.calls += 1
+        return {}, "<p>Truncated"
+
+
+def _draft(created_date: datetime) -> DraftRecipe:
+    return DraftRecipe(
+        name=None, key=None, created_by="test@user.com",
+        user_content="Tomato soup", user_tags=["soup"],
+        ratings=[Rating(created_by="test@user.com", created_date=created_date, rating=4, comment=None)],
+    )
+
+
+def _media(get_url: str, etag: str = '"abc"') -> DraftMedia:
+    return DraftMedia(exists=True, name="1", key="recipes/drafts/u/1", get_url=get_url, put_url="", etag=etag)
+
+
+def test_cache_key_ignores_presigned_urls_and_rating_dates():
+    first = generation_cache_key(_draft(datetime(2025, 1, 1)), [_media("https://a")])
+    second = generation_cache_key(_draft(datetime(2025, 2, 1)), [_media("https://b")])
+    assert first == second
+    assert generation_cache_key(_draft(datetime(2025, 1, 1)), [_media("https://a", etag='"def"')]) != first
+    other_user = _draft(datetime(2025, 1, 1))
+    other_user.created_by = "other@user.com"
+    assert generation_cache_key(other_user, [_media("https://a")]) != first
+
+
+def test_disk_store_evicts_least_recently_used(tmp_path):
+    store = DiskGenerationStore(tmp_path, max_bytes=200)
+    store.put("a", {}, "x" * 60)
+    os.utime(tmp_path / "a.json", (1, 1))
+    store.put("b", {}, "x" * 60)
+    os.utime(tmp_path / "b.json", (2, 2))
+    assert store.get("a") is not None  # refreshes a
+    store.put("c", {}, "x" * 60)
+    assert store.get("b") is None
+    assert store.get("a") == ({}, "x" * 60)
+    assert store.get("c") is not None
+
+
+@pytest.mark.asyncio
+async def test_caching_service_serves_repeated_generations(tmp_path):
+    inner = CountingRecipeService()
+    service = CachingRecipeService(inner, DiskGenerationStore(tmp_path, max_bytes=1024 * 1024))
+    first = await service.generate_recipe_html(_draft(datetime(2025, 1, 1)), [_media("https://a")])
+    second = await service.generate_recipe_html(_draft(datetime(2025, 1, 2)), [_media("https://b")])
+    streamed = [chunk async for chunk in service.stream_recipe_html(_draft(datetime(2025, 1, 3)), [_media("https://c")])]
+    assert first == second
+    assert streamed == [first[1]]
+    assert inner.calls == 1
+    assert (service.hits, service.misses) == (2, 1)
+
+
+@pytest.mark.asyncio
+async def test_caching_service_skips_generations_without_a_name(tmp_path):
+    inner = TruncatedRecipeService()
+    service = CachingRecipeService(inner, DiskGenerationStore(tmp_path, max_bytes=1024 * 1024))
+    await service.generate_recipe_html(_draft(datetime(2025, 1, 1)), [_media("https://a")])
+    await service.generate_recipe_html(_draft(datetime(2025, 1, 1)), [_media("https://a")])
+    assert inner.calls == 2
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,104 @@
+import asyncio
+from typing import List
+
+import pytest
+
+from wasfeines.jobs.generation_queue import GenerationQueue, InMemoryJobQueueBackend
+from wasfeines.models.draft import DraftMedia, DraftRecipe
+from wasfeines.models.job import GenerationJobStatus
+from wasfeines.models.recipe import Recipe
+
+
+class FakeRepository:
+    def __init__(self):
+        self.deleted_drafts: List[str] = []
+
+    async def put_recipe(self, recipe: DraftRecipe, media: List[DraftMedia], recipe_html: str) -> Recipe:
+        return Recipe(name=recipe.name, content_url="https://example.com/recipe.html", media=[], summary=None)
+
+    async def delete_draft_recipe(self, user_id: str) -> bool:
+        self.deleted_drafts.append(user_id)
+        return True
+
+    async def delete_draft_media(self, user_id: str) -> dict:
+        return {}
+
+
+class FakeRecipeService:
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.calls = 0
+
+    async def generate_recipe_html(self, draft_recipe, draft_media):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        if self.fail:
+            raise RuntimeError("LLM unavailable")
+        return {"name": "Generated"}, "<summary>{}</summary>"
+
+
+def _draft() -> DraftRecipe:
+    return DraftRecipe(
+        name=None, key=None, created_by="test@user.com",
+        user_content="Pasta", user_tags=None, ratings=None,
+    )
+
+
+async def _wait_until_done(queue: GenerationQueue, job_id: str):
+    for _ in range(100):
+        job = await queue.get(job_id)
+        if not job.status.is_active:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError("Job did not finish")
+
+
+@pytest.mark.asyncio
+async def test_generation_job_runs_and_dedupes():
+    repo = FakeRepository()
+    service = FakeRecipeService()
+    queue = GenerationQueue(InMemoryJobQueueBackend(ttl_seconds=60), repo, service, num_workers=2)
+    queue.start()
+    try:
+        draft = _draft()
+        first = await queue.submit("test@user.com", draft, [])
+        second = await queue.submit("test@user.com", draft, [])
+        assert first.id == second.id
+        job = await _wait_until_done(queue, first.id)
+    finally:
+        await queue.stop()
+
+    assert job.status == GenerationJobStatus.SUCCEEDED
+    assert job.recipe.name == "Generated"
+    assert service.calls == 1
+    assert repo.deleted_drafts == ["test@user.com"]
+
+
+@pytest.mark.asyncio
+async def test_generation_job_reports_failure():
+    queue = GenerationQueue(InMemoryJobQueueBackend(ttl_seconds=60), FakeRepository(), FakeRecipeService(fail=True), num_workers=1)
+    queue.start()
+    try:
+        job = await queue.submit("test@user.com", _draft(), [])
+        job = await _wait_until_done(queue, job.id)
+    finally:
+        await queue.stop()
+
+    assert job.status == GenerationJobStatus.FAILED
+    assert job.error == "LLM unavailable"
+
+
+@pytest.mark.asyncio
+async def test_evicted_jobs_release_their_dedupe_keys():
+    backend = InMemoryJobQueueBackend(ttl_seconds=60, max_jobs=1)
+    # Never started, so both jobs stay queued until the first one is pushed out
+    queue = GenerationQueue(backend, FakeRepository(), FakeRecipeService(), num_workers=0)
+    first = await queue.submit("a@user.com", _draft(), [])
+    await queue.submit("b@user.com", _draft(), [])
+    assert await queue.get(first.id) is None
+    assert first.id not in backend._key_by_job
+    assert len(backend._active_by_key) == 1
+
+    again = await queue.submit("a@user.com", _draft(), [])
+    assert again.id != first.id
+    assert len(backend._active_by_key) == len(backend._key_by_job) == 1
@@ -0,0 +1,49 @@
+import base64
+from io import BytesIO
+from typing import Dict
+
+from PIL import Image
+
+from wasfeines.llm.media_preprocessing import MediaPreprocessor
+from wasfeines.models.draft import DraftMedia
+
+
+def _png(width: int, height: int, color: str) -> bytes:
+    out = BytesIO()
+    Image.new("RGB", (width, height), color).save(out, format="PNG")
+    return out.getvalue()
+
+
+class FakeRepository:
+    def __init__(self, objects: Dict[str, bytes]):
+        self.objects = objects
+        self.reads = 0
+
+    def read_media_sync(self, key: str) -> bytes:
+        self.reads += 1
+        return self.objects[key]
+
+
+def _media(key: str, etag: str) -> DraftMedia:
+    return DraftMedia(exists=True, name=key, key=key, get_url=f"https://example.com/{key}", put_url="", etag=etag)
+
+
+def test_prepare_downscales_dedupes_and_caches():
+    repo = FakeRepository({
+        "a": _png(4000, 3000, "red"),
+        "b": _png(4000, 3000, "red"),
+        "c": b"not an image",
+    })
+    preprocessor = MediaPreprocessor(repo, max_edge=400, quality=80, cache_size=10, max_workers=2)
+    media = [_media("a", '"1"'), _media("b", '"2"'), _media("c", '"3"')]
+    blocks = preprocessor.prepare_sync(media)
+
+    assert len(blocks) == 2
+    assert blocks[0]["source"]["media_type"] == "image/jpeg"
+    image = Image.open(BytesIO(base64.b64decode(blocks[0]["source"]["data"])))
+    assert image.size == (400, 300)
+    assert blocks[1]["source"] == {"type": "url", "url": "https://example.com/c"}
+
+    reads = repo.reads
+    preprocessor.prepare_sync(media[:2])
+    assert repo.reads == reads
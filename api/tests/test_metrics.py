@@ -0,0 +1,105 @@
+from typing import Dict
+import asyncio
+import shutil
+
+from fastapi.testclient import TestClient
+import pytest
+
+from wasfeines.metrics import HTTP_REQUEST_DURATION, MetricsRegistry
+from wasfeines.models.draft import DraftRecipeRequestModel
+from wasfeines.storage.repository import S3_ERRORS, S3_REQUESTS, STORAGE_CALLS, S3StorageRepository
+
+from tests.test_search import CONTENT_DIR
+
+
+def test_registry_renders_prometheus_text():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests", "Requests", ("route",))
+    latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    requests.inc(route="/a")
+    requests.inc(2, route="/a")
+    latency.observe(0.05)
+    latency.observe(5)
+
+    assert registry.counter("requests", "Requests", ("route",)) is requests
+    with pytest.raises(ValueError):
+        registry.histogram("requests", "Requests", ("route",))
+    with pytest.raises(ValueError):
+        requests.inc(method="GET")
+    assert registry.render().splitlines() == [
+        "# HELP wasfeines_requests Requests",
+        "# TYPE wasfeines_requests counter",
+        'wasfeines_requests_total{route="/a"} 3',
+        "# HELP wasfeines_latency_seconds Latency",
+        "# TYPE wasfeines_latency_seconds histogram",
+        'wasfeines_latency_seconds_bucket{le="0.1"} 1',
+        'wasfeines_latency_seconds_bucket{le="1"} 1',
+        'wasfeines_latency_seconds_bucket{le="+Inf"} 2',
+        "wasfeines_latency_seconds_sum 5.05",
+        "wasfeines_latency_seconds_count 2",
+    ]
+
+
+def test_metrics_route(filesystem_app, filesystem_settings):
+    shutil.copytree(CONTENT_DIR, filesystem_settings.content_dir, dirs_exist_ok=True)
+    filesystem_settings.metrics_token = "scraper-token"
+    requests_before = HTTP_REQUEST_DURATION.count(method="GET", route="/api/v1/recipes", status="200")
+    with TestClient(filesystem_app) as client:
+        # Wait for the search index built on startup, which lists the recipes too
+        assert client.get("/api/v1/recipes/search").status_code == 200
+        calls_before = STORAGE_CALLS.value(backend="FileSystemStorageRepository", method="list_recipes")
+        assert client.get("/api/v1/recipes").status_code == 200
+        assert client.get("/metrics").status_code == 401
+        assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+        response = client.get("/metrics", headers={"Authorization": "Bearer scraper-token"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    lines = response.text.splitlines()
+    assert f'wasfeines_http_request_duration_seconds_count{{method="GET",route="/api/v1/recipes",status="200"}} {requests_before + 1}' in lines
+    assert STORAGE_CALLS.value(backend="FileSystemStorageRepository", method="list_recipes") == calls_before + 1
+    assert any(line.startswith('wasfeines_pool_queue_wait_seconds_count{pool="storage-read"}') for line in lines)
+    assert any(line.startswith('wasfeines_cache_hit_ratio{cache="recipe_contents"}') for line in lines)
+    assert any(line.startswith('wasfeines_pool_size{pool="storage-write"}') for line in lines)
+
+
+def test_metrics_route_is_disabled_without_a_token(filesystem_app):
+    with TestClient(filesystem_app) as client:
+        assert client.get("/metrics").status_code == 404
+
+
+def _s3_requests() -> Dict[tuple, float]:
+    return {(labels["method"], labels["operation"]): value for _, labels, value in S3_REQUESTS.collect().samples}
+
+
+def test_s3_requests_are_counted_by_repository_method():
+    pytest.importorskip("moto")
+    from benchmarks.emulator import S3Emulator
+
+    user_id = "user@example.com"
+    with S3Emulator() as emulator:
+        settings = emulator.settings(STORAGE_BACKEND="s3_threads", DRAFT_WRITE_DELAY_SECONDS=0)
+        emulator.seed_draft_media(user_id, settings, 2)
+        repo = S3StorageRepository(settings)
+
+        async def publish():
+            draft = await repo.put_draft_recipe(user_id, DraftRecipeRequestModel(
+                name="recipe_Metrics", user_content="Soup", user_tags=[], user_rating=None,
+            ))
+            media = await repo.get_draft_media(user_id)
+            await repo.put_recipe(draft, media, "<summary>{}</summary>")
+
+        before = _s3_requests()
+        asyncio.run(publish())
+        failed_before = S3_ERRORS.value(method="unknown", operation="GetObject", code="NoSuchKey")
+        with pytest.raises(repo.s3.exceptions.NoSuchKey):
+            repo.s3.get_object(Bucket=settings.s3_bucket, Key="recipes/missing")
+        repo.close()
+
+    sent = {key: value - before.get(key, 0) for key, value in _s3_requests().items() if value != before.get(key, 0)}
+    # Presigned media URLs are not requests
+    assert {operation for method, operation in sent if method == "get_draft_media"} == {"ListObjectsV2"}
+    # Copies run on the s3-io pool and are still attributed to the method that started them
+    assert sent[("put_recipe", "CopyObject")] == 2
+    assert not [key for key in sent if key[0] == "unknown" and key[1] != "GetObject"]
+    assert S3_ERRORS.value(method="unknown", operation="GetObject", code="NoSuchKey") == failed_before + 1
@@ -0,0 +1,63 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from wasfeines.llm.anthropic_recipe_service import AnthropicRecipeService
+from wasfeines.models.draft import DraftRecipe
+
+RECIPE_HTML = '<summary>{"name": "Test Recipe"}</summary><section class="recipe--header"><h1>Test Recipe</h1></section>'
+
+
+class SlowMessages:
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def create(self, **kwargs):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        return SimpleNamespace(content=[SimpleNamespace(type="text", text=RECIPE_HTML)])
+
+
+def _draft() -> DraftRecipe:
+    return DraftRecipe(
+        name=None, key=None, created_by="test@user.com",
+        user_content=None, user_tags=None, ratings=None,
+    )
+
+
+@pytest.mark.asyncio
+async def test_generate_recipe_html_limits_concurrency(settings):
+    settings.llm_max_concurrency = 2
+    service = AnthropicRecipeService(settings, storage_repository=None)
+    messages = SlowMessages(delay=0.01)
+    service.async_client = SimpleNamespace(messages=messages)
+    results = await asyncio.gather(*(service.generate_recipe_html(_draft(), []) for _ in range(5)))
+    assert messages.max_in_flight == 2
+    assert all(summary == {"name": "Test Recipe"} for summary, _ in results)
+
+
+@pytest.mark.asyncio
+async def test_generate_recipe_html_times_out(settings):
+    settings.llm_timeout_seconds = 0.01
+    service = AnthropicRecipeService(settings, storage_repository=None)
+    service.async_client = SimpleNamespace(messages=SlowMessages(delay=1))
+    with pytest.raises(TimeoutError):
+        await service.generate_recipe_html(_draft(), [])
+
+
+def test_instructions_are_a_cacheable_system_prompt(settings):
+    service = AnthropicRecipeService(settings, storage_repository=None)
+    params = service.request_params(_draft(), [])
+    assert params["system"][0]["cache_control"] == {"type": "ephemeral"}
+    assert "Example Output File START" not in json.dumps(params["messages"])
+
+    settings.llm_prompt_caching = False
+    assert "cache_control" not in AnthropicRecipeService(settings, storage_repository=None).request_params(_draft(), [])["system"][0]
@@ -0,0 +1,349 @@
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+import io
+import json
+
+from botocore.response import StreamingBody
+from botocore.stub import Stubber
+
+from wasfeines.storage.catalog import CatalogEntry, RecipeCatalog, build_entries, entries_to_manifest
+from wasfeines.models.draft import DraftMedia, DraftRecipe
+from wasfeines.storage.repository import S3StorageRepository
+
+
+def _body(data: dict) -> StreamingBody:
+    raw = json.dumps(data).encode()
+    return StreamingBody(io.BytesIO(raw), len(raw))
+
+
+def test_build_entries_groups_keys_by_recipe():
+    entries = build_entries([
+        {"Key": "recipes/recipe_A.html", "ETag": '"a-html"'},
+        {"Key": "recipes/recipe_A.json", "ETag": '"a-json"'},
+        {"Key": "recipes/recipe_A/"},
+        {"Key": "recipes/recipe_A/img2.png"},
+        {"Key": "recipes/recipe_A/img1.png"},
+        {"Key": "recipes/recipe_B.html"},
+        {"Key": "recipes/drafts/user-draft.json"},
+        {"Key": "recipes/drafts/user/1234"},
+    ])
+    assert list(entries) == ["recipes/recipe_A", "recipes/recipe_B"]
+    entry = entries["recipes/recipe_A"]
+    assert entry.json_key == "recipes/recipe_A.json"
+    assert entry.json_etag == '"a-json"'
+    assert entry.media_keys == ["recipes/recipe_A/img1.png", "recipes/recipe_A/img2.png"]
+    assert entries["recipes/recipe_B"].json_key is None
+    assert entries["recipes/recipe_B"].media_keys == []
+
+
+def test_list_recipes_is_served_from_catalog(settings):
+    repo = S3StorageRepository(settings)
+    listing = {
+        "KeyCount": 3,
+        "Contents": [
+            {"Key": "recipes/recipe_A.html", "ETag": '"a-html"'},
+            {"Key": "recipes/recipe_A.json", "ETag": '"a-json"'},
+            {"Key": "recipes/recipe_A/img.png", "ETag": '"a-img"'},
+        ],
+    }
+    with Stubber(repo.s3) as stubber:
+        stubber.add_response("list_objects_v2", listing)
+        stubber.add_response("get_object", {"Body": _body({"name": "A"})})
+        first = repo.list_recipes_sync()
+        second = repo.list_recipes_sync()
+        stubber.assert_no_pending_responses()
+
+    assert [recipe.name for recipe in first] == ["recipes/recipe_A"]
+    assert first[0].summary == {"name": "A"}
+    assert [media.name for media in first[0].media] == ["recipes/recipe_A/img.png"]
+    assert [recipe.name for recipe in second] == ["recipes/recipe_A"]
+
+    # A refresh only refetches summaries whose ETag changed
+    with Stubber(repo.s3) as stubber:
+        stubber.add_response("list_objects_v2", listing)
+        repo.refresh_catalog_sync()
+        stubber.assert_no_pending_responses()
+
+
+def test_delete_recipe_updates_catalog(settings):
+    repo = S3StorageRepository(settings)
+    with Stubber(repo.s3) as stubber:
+        stubber.add_response("list_objects_v2", {
+            "KeyCount": 1,
+            "Contents": [{"Key": "recipes/recipe_A.html", "ETag": '"a-html"'}],
+        })
+        assert len(repo.list_recipes_sync()) == 1
+        stubber.add_response("list_objects_v2", {
+            "KeyCount": 4,
+            "Contents": [
+                {"Key": "recipes/recipe_A.html"},
+                {"Key": "recipes/recipe_A.json"},
+                {"Key": "recipes/recipe_A/img.png"},
+                {"Key": "recipes/recipe_AB.html"},
+            ],
+        })
+        stubber.add_response("delete_objects", {}, {
+            "Bucket": "test-bucket",
+            "Delete": {
+                "Objects": [
+                    {"Key": "recipes/recipe_A.html"},
+                    {"Key": "recipes/recipe_A.json"},
+                    {"Key": "recipes/recipe_A/img.png"},
+                ],
+                "Quiet": True,
+            },
+        })
+        assert repo.delete_recipe_sync("recipes/recipe_A")
+        assert repo.list_recipes_sync() == []
+
+
+def test_delete_recipes_reports_errors_per_recipe(settings):
+    repo = S3StorageRepository(settings)
+    # A single worker keeps the stubbed listings in submission order
+    repo._io_pool = ThreadPoolExecutor(max_workers=1)
+    with Stubber(repo.s3) as stubber:
+        stubber.add_response("list_objects_v2", {
+            "KeyCount": 2,
+            "Contents": [{"Key": "recipes/recipe_A.html"}, {"Key": "recipes/recipe_A/img.png"}],
+        }, {"Bucket": "test-bucket", "Prefix": "recipes/recipe_A"})
+        stubber.add_response("list_objects_v2", {"KeyCount": 0}, {"Bucket": "test-bucket", "Prefix": "recipes/recipe_B"})
+        stubber.add_response("delete_objects", {
+            "Errors": [{"Key": "recipes/recipe_A/img.png", "Code": "AccessDenied", "Message": "Access Denied"}],
+        })
+        results = repo.delete_recipes_sync(["recipes/recipe_A", "recipes/recipe_B"])
+    assert results == {
+        "recipes/recipe_A": "recipes/recipe_A/img.png: Access Denied",
+        "recipes/recipe_B": "Recipe not found",
+    }
+
+
+def test_list_recipes_page_follows_continuation_tokens(settings):
+    repo = S3StorageRepository(settings)
+    with Stubber(repo.s3) as stubber:
+        stubber.add_response("list_objects_v2", {
+            "KeyCount": 2,
+            "IsTruncated": True,
+            "NextContinuationToken": "token",
+            "Contents": [{"Key": "recipes/recipe_A.html"}, {"Key": "recipes/recipe_B.html"}],
+        })
+        stubber.add_response("list_objects_v2", {
+            "KeyCount": 1,
+            "IsTruncated": False,
+            "Contents": [{"Key": "recipes/recipe_C.html"}],
+        }, {"Bucket": "test-bucket", "Prefix": "recipes", "ContinuationToken": "token"})
+        page, cursor = repo.list_recipes_page_sync(limit=2)
+        stubber.assert_no_pending_responses()
+
+    assert [recipe.name for recipe in page] == ["recipes/recipe_A", "recipes/recipe_B"]
+    assert cursor is not None
+    page, cursor = repo.list_recipes_page_sync(limit=2, cursor=cursor)
+    assert [recipe.name for recipe in page] == ["recipes/recipe_C"]
+    assert cursor is None
+
+
+def test_put_recipe_copies_large_media_in_parts(settings):
+    settings.s3_multipart_copy_threshold = 10
+    settings.s3_multipart_copy_part_size = 8
+    settings.media_variants_enabled = False
+    repo = S3StorageRepository(settings)
+    repo._io_pool = ThreadPoolExecutor(max_workers=1)
+    recipe = DraftRecipe(
+        name="recipe_A", key=None, created_by="test@user.com",
+        user_content=None, user_tags=None, ratings=None,
+    )
+    media = [
+        DraftMedia(exists=True, name="small", key="recipes/drafts/u/small", get_url="", put_url="", size=4),
+        DraftMedia(exists=True, name="large", key="recipes/drafts/u/large", get_url="", put_url="", size=12),
+        DraftMedia(exists=False, name="slot", key="recipes/drafts/u/slot", get_url="", put_url=""),
+    ]
+    with Stubber(repo.s3) as stubber:
+        stubber.add_response("put_object", {"ETag": '"html"'})
+        stubber.add_response("put_object", {"ETag": '"json"'})
+        stubber.add_response("head_object", {"ContentLength": 12, "ContentType": "image/png"})
+        stubber.add_response("create_multipart_upload", {"UploadId": "upload"})
+        stubber.add_response("copy_object", {})
+        stubber.add_response("upload_part_copy", {"CopyPartResult": {"ETag": '"p1"'}}, {
+            "Bucket": "test-bucket", "Key": "recipes/recipe_A/large", "UploadId": "upload", "PartNumber": 1,
+            "CopySource": {"Bucket": "test-bucket", "Key": "recipes/drafts/u/large"}, "CopySourceRange": "bytes=0-7",
+        })
+        stubber.add_response("upload_part_copy", {"CopyPartResult": {"ETag": '"p2"'}}, {
+            "Bucket": "test-bucket", "Key": "recipes/recipe_A/large", "UploadId": "upload", "PartNumber": 2,
+            "CopySource": {"Bucket": "test-bucket", "Key": "recipes/drafts/u/large"}, "CopySourceRange": "bytes=8-11",
+        })
+        stubber.add_response("complete_multipart_upload", {}, {
+            "Bucket": "test-bucket", "Key": "recipes/recipe_A/large", "UploadId": "upload",
+            "MultipartUpload": {"Parts": [{"ETag": '"p1"', "PartNumber": 1}, {"ETag": '"p2"', "PartNumber": 2}]},
+        })
+        recipe_out = repo.put_recipe_sync(recipe, media, "<section></section>")
+        stubber.assert_no_pending_responses()
+
+    assert recipe_out.name == "recipes/recipe_A"
+    assert [m.name for m in recipe_out.media] == ["recipes/recipe_A/large", "recipes/recipe_A/small"]
+    assert repo.catalog.get("recipes/recipe_A").html_etag == '"html"'
+
+
+def test_media_variants_are_attached_to_their_media(settings):
+    repo = S3StorageRepository(settings)
+    with Stubber(repo.s3) as stubber:
+        stubber.add_response("list_objects_v2", {
+            "KeyCount": 4,
+            "Contents": [
+                {"Key": "recipes/recipe_A.html"},
+                {"Key": "recipes/recipe_A/img.png"},
+                {"Key": "recipes/recipe_A/_variants/img.png/medium_1024x768.webp"},
+                {"Key": "recipes/recipe_A/_variants/img.png/thumbnail_320x240.webp"},
+            ],
+        })
+        recipes = repo.list_recipes_sync()
+
+    assert len(recipes[0].media) == 1
+    media = recipes[0].media[0]
+    assert media.name == "recipes/recipe_A/img.png"
+    assert (media.thumbnail.width, media.thumbnail.height) == (320, 240)
+    assert "thumbnail_320x240.webp" in media.thumbnail.content_url
+    assert (media.medium.width, media.medium.height) == (1024, 768)
+
+
+def _manifest(version: int, *names: str) -> dict:
+    return entries_to_manifest(
+        [CatalogEntry(name=name, html_key=f"{name}.html", summary={"name": name}) for name in names],
+        version,
+    )
+
+
+def test_list_recipes_reads_only_the_manifest(settings):
+    settings.catalog_manifest_enabled = True
+    repo = S3StorageRepository(settings)
+    with Stubber(repo.s3) as stubber:
+        stubber.add_response("get_object", {"Body": _body(_manifest(3, "recipes/recipe_A")), "ETag": '"m3"'}, {
+            "Bucket": "test-bucket", "Key": "recipes/catalog-manifest.json",
+        })
+        recipes = repo.list_recipes_sync()
+        # An unchanged manifest is not downloaded again
+        stubber.add_client_error("get_object", "304", http_status_code=304, expected_params={
+            "Bucket": "test-bucket", "Key": "recipes/catalog-manifest.json", "IfNoneMatch": '"m3"',
+        })
+        repo.refresh_catalog_sync()
+        stubber.assert_no_pending_responses()
+
+    assert [recipe.summary for recipe in recipes] == [{"name": "recipes/recipe_A"}]
+    assert not repo.catalog.is_stale()
+
+
+def test_missing_manifest_is_rebuilt_from_the_listing(settings):
+    settings.catalog_manifest_enabled = True
+    repo = S3StorageRepository(settings)
+    with Stubber(repo.s3) as stubber:
+        stubber.add_client_error("get_object", "NoSuchKey", http_status_code=404)
+        stubber.add_client_error("get_object", "NoSuchKey", http_status_code=404)
+        stubber.add_response("list_objects_v2", {"KeyCount": 1, "Contents": [{"Key": "recipes/recipe_A.html"}]})
+        stubber.add_response("put_object", {"ETag": '"m1"'}, {
+            "Bucket": "test-bucket",
+            "Key": "recipes/catalog-manifest.json",
+            "Body": json.dumps(entries_to_manifest([CatalogEntry(name="recipes/recipe_A", html_key="recipes/recipe_A.html")], 1)),
+            "ContentType": "application/json",
+            "IfNoneMatch": "*",
+        })
+        recipes = repo.list_recipes_sync()
+        stubber.assert_no_pending_responses()
+
+    assert [recipe.name for recipe in recipes] == ["recipes/recipe_A"]
+
+
+def test_listing_works_when_the_manifest_cannot_be_written(settings):
+    settings.catalog_manifest_enabled = True
+    repo = S3StorageRepository(settings)
+    with Stubber(repo.s3) as stubber:
+        stubber.add_client_error("get_object", "NoSuchKey", http_status_code=404)
+        stubber.add_client_error("get_object", "NoSuchKey", http_status_code=404)
+        stubber.add_response("list_objects_v2", {"KeyCount": 1, "Contents": [{"Key": "recipes/recipe_A.html"}]})
+        # Stores without conditional writes reject the If-None-Match header
+        stubber.add_client_error("put_object", "NotImplemented", http_status_code=501)
+        recipes = repo.list_recipes_sync()
+        stubber.assert_no_pending_responses()
+
+    assert [recipe.name for recipe in recipes] == ["recipes/recipe_A"]
+    assert repo._manifest_dirty
+
+
+def test_failed_manifest_update_is_reconciled_on_the_next_refresh(settings):
+    settings.catalog_manifest_enabled = True
+    repo = S3StorageRepository(settings)
+    with Stubber(repo.s3) as stubber:
+        stubber.add_response("list_objects_v2", {"KeyCount": 1, "Contents": [{"Key": "recipes/recipe_A.html"}]})
+        stubber.add_response("delete_objects", {})
+        stubber.add_client_error("get_object", "SlowDown", http_status_code=503)
+        assert repo.delete_recipe_sync("recipes/recipe_A")
+        assert repo._manifest_dirty
+
+        # The next refresh rebuilds the manifest from the bucket instead of reading the outdated one
+        stubber.add_response("get_object", {"Body": _body(_manifest(1, "recipes/recipe_A")), "ETag": '"m1"'})
+        stubber.add_response("list_objects_v2", {"KeyCount": 0, "Contents": []})
+        stubber.add_response("put_object", {"ETag": '"m2"'}, {
+            "Bucket": "test-bucket",
+            "Key": "recipes/catalog-manifest.json",
+            "Body": json.dumps(entries_to_manifest([], 2)),
+            "ContentType": "application/json",
+            "IfMatch": '"m1"',
+        })
+        repo.refresh_catalog_sync()
+        stubber.assert_no_pending_responses()
+
+    assert not repo._manifest_dirty
+    assert repo.catalog.entries() == []
+
+
+def test_delete_recipe_retries_conflicting_manifest_writes(settings):
+    settings.catalog_manifest_enabled = True
+    repo = S3StorageRepository(settings)
+    with Stubber(repo.s3) as stubber:
+        stubber.add_response("list_objects_v2", {"KeyCount": 1, "Contents": [{"Key": "recipes/recipe_A.html"}]})
+        stubber.add_response("delete_objects", {})
+        stubber.add_response("get_object", {"Body": _body(_manifest(1, "recipes/recipe_A")), "ETag": '"m1"'})
+        stubber.add_client_error("put_object", "PreconditionFailed", http_status_code=412)
+        # Another writer added recipe B in the meantime
+        stubber.add_response("get_object", {"Body": _body(_manifest(2, "recipes/recipe_A", "recipes/recipe_B")), "ETag": '"m2"'})
+        stubber.add_response("put_object", {"ETag": '"m3"'}, {
+            "Bucket": "test-bucket",
+            "Key": "recipes/catalog-manifest.json",
+            "Body": json.dumps(_manifest(3, "recipes/recipe_B")),
+            "ContentType": "application/json",
+            "IfMatch": '"m2"',
+        })
+        assert repo.delete_recipe_sync("recipes/recipe_A")
+        stubber.assert_no_pending_responses()
+
+    assert [entry.name for entry in repo.catalog.entries()] == ["recipes/recipe_B"]
+
+
+def test_upload_slots_are_issued_on_demand(settings):
+    settings.max_num_draft_media = 3
+    repo = S3StorageRepository(settings)
+    listing = {
+        "KeyCount": 1,
+        "Contents": [{"Key": "recipes/drafts/user/1234", "ETag": '"img"', "Size": 10, "LastModified": datetime(2024, 1, 1, tzinfo=timezone.utc)}],
+    }
+    with Stubber(repo.s3) as stubber:
+        stubber.add_response("list_objects_v2", listing)
+        stubber.add_response("list_objects_v2", listing)
+        media = repo.get_draft_media_sync("user")
+        slots = repo.create_upload_slots_sync("user", 5)
+        stubber.assert_no_pending_responses()
+
+    assert [m.key for m in media] == ["recipes/drafts/user/1234"]
+    assert len(slots) == 2
+    assert not any(slot.exists for slot in slots)
+    assert all(slot.key.startswith("recipes/drafts/user/") for slot in slots)
+    # Existing media keeps its URLs between calls
+    assert repo._presign("get_object", media[0].key) == media[0].get_url
+
+
+def test_catalog_version_changes_with_entries():
+    catalog = RecipeCatalog(refresh_seconds=60)
+    catalog.replace({"recipes/recipe_A": CatalogEntry(name="recipes/recipe_A", html_key="recipes/recipe_A.html", html_etag='"a"')})
+    version = catalog.version()
+    assert catalog.version() == version
+    catalog.upsert(CatalogEntry(name="recipes/recipe_A", html_key="recipes/recipe_A.html", html_etag='"b"'))
+    assert catalog.version() != version
+    catalog.upsert(CatalogEntry(name="recipes/recipe_A", html_key="recipes/recipe_A.html", html_etag='"a"'))
+    assert catalog.version() == version
@@ -0,0 +1,120 @@
+from pathlib import Path
+import asyncio
+import shutil
+
+from fastapi.testclient import TestClient
+
+from wasfeines.executors import PoolRegistry
+from wasfeines.search import RecipeDocument, RecipeSearch, SearchIndex, recipe_document
+from wasfeines.storage.catalog import CatalogEntry
+from wasfeines.storage.filesystem import FileSystemStorageRepository
+from wasfeines.storage.repository import S3StorageRepository
+
+CONTENT_DIR = Path(__file__).parents[2] / "content"
+
+
+def test_recipe_document_collects_summary_and_sections():
+    document = recipe_document(
+        "recipes/recipe_Peanut_Protein_Balls",
+        {"title": "Peanut Protein Balls", "tags": ["Healthy-Snack", "protein"]},
+        (CONTENT_DIR / "recipe_Peanut_Protein_Balls.html").read_text(),
+    )
+    assert document.fields["name"] == "Peanut Protein Balls"
+    assert document.tags == ["healthy-snack", "protein"]
+    assert "Oats" in document.fields["ingredients"]
+    assert "Form balls" in document.fields["instructions"]
+    assert "source" not in document.fields
+
+
+def test_search_ranks_and_filters():
+    index = SearchIndex()
+    index.upsert(RecipeDocument("a", {"name": "Oat Cookies", "ingredients": "oats butter sugar"}, ["sweet"]))
+    index.upsert(RecipeDocument("b", {"name": "Porridge", "ingredients": "oats milk"}, ["breakfast"]))
+    index.upsert(RecipeDocument("c", {"name": "Käsespätzle", "ingredients": "cheese onions"}, []))
+
+    assert index.search("oats") == ["a", "b"]
+    assert index.search("oats milk") == ["b"]
+    assert index.search("oats", tags=["Breakfast"]) == ["b"]
+    assert index.search("kasesp") == ["c"]
+    assert index.search("cook") == ["a"]
+    assert index.search("cook", prefix=False) == []
+    assert sorted(index.search("")) == ["a", "b", "c"]
+
+    index.upsert(RecipeDocument("a", {"name": "Oat Cookies"}, []))
+    assert index.search("butter") == []
+    index.remove("b")
+    assert index.search("oats") == []
+    assert index.search("oat") == ["a"]
+
+
+def test_search_route(filesystem_app, filesystem_settings):
+    shutil.copytree(CONTENT_DIR, filesystem_settings.content_dir, dirs_exist_ok=True)
+    with TestClient(filesystem_app) as client:
+        response = client.get("/api/v1/recipes/search", params={"q": "oats", "tag": "protein"})
+        assert response.status_code == 200
+        body = response.json()
+        assert body["total"] == 1
+        assert body["results"][0]["name"] == "recipe_Peanut_Protein_Balls"
+
+        (Path(filesystem_settings.content_dir) / "recipe_Peanut_Protein_Balls.html").unlink()
+        assert client.get("/api/v1/recipes/search", params={"q": "oats"}).json()["total"] == 0
+
+
+def test_sync_reindexes_replaced_html(filesystem_settings):
+    shutil.copytree(CONTENT_DIR, filesystem_settings.content_dir, dirs_exist_ok=True)
+    pools = PoolRegistry()
+    repo = FileSystemStorageRepository(filesystem_settings, pools)
+    recipe_search = RecipeSearch(repo)
+
+    async def scenario():
+        await recipe_search.warm_up()
+        assert "recipe_Peanut_Protein_Balls" in recipe_search.index
+        # Regeneration keeps the summary and only replaces the HTML
+        assert repo.replace_recipe_html_sync(
+            "recipe_Peanut_Protein_Balls", '<section class="recipe--ingredients"><li>Quinoa</li></section>'
+        )
+        results, total = await recipe_search.search("quinoa", [], 10, 0)
+        assert [recipe.name for recipe in results] == ["recipe_Peanut_Protein_Balls"]
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        pools.shutdown()
+
+
+def test_sync_only_reads_changed_recipes(settings, monkeypatch):
+    repo = S3StorageRepository(settings)
+    reads, presigned = [], []
+    monkeypatch.setattr(repo, "read_media_sync", lambda key: reads.append(key) or f'<section class="recipe--ingredients">{key}</section>'.encode())
+    monkeypatch.setattr(repo, "_presign_get", lambda key: presigned.append(key) or f"https://s3.example.com/{key}")
+
+    def entry(name: str, etag: str = '"1"') -> CatalogEntry:
+        return CatalogEntry(name=f"recipes/{name}", html_key=f"recipes/{name}.html", html_etag=etag, summary={"name": name})
+
+    repo.catalog.replace({e.name: e for e in map(entry, ("recipe_A", "recipe_B", "recipe_C"))})
+    recipe_search = RecipeSearch(repo)
+
+    async def scenario():
+        await recipe_search.warm_up()
+        assert sorted(reads) == ["recipes/recipe_A.html", "recipes/recipe_B.html", "recipes/recipe_C.html"]
+        # Building the index does not presign the URLs of every recipe
+        assert presigned == []
+
+        reads.clear()
+        repo.catalog.upsert(entry("recipe_D"))
+        repo.catalog.upsert(entry("recipe_A", etag='"2"'))
+        repo.catalog.remove("recipes/recipe_B")
+        results, total = await recipe_search.search("", [], 1, 0)
+        assert sorted(reads) == ["recipes/recipe_A.html", "recipes/recipe_D.html"]
+        assert total == 3
+        assert [recipe.name for recipe in results] == ["recipes/recipe_A"]
+        assert presigned == ["recipes/recipe_A.html"]
+
+        reads.clear()
+        await recipe_search.search("recipe_C", [], 10, 0)
+        assert reads == []
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        repo.close()
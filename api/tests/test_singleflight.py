@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+from wasfeines.singleflight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_call():
+    flights = SingleFlight()
+    calls = 0
+
+    async def load():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return ["recipe_A"]
+
+    results = await asyncio.gather(*(flights.do(("list_recipes",), load) for _ in range(5)))
+    assert calls == 1
+    assert all(result is results[0] for result in results)
+    [stats] = flights.stats()
+    assert (stats.operation, stats.calls, stats.coalesced) == ("list_recipes", 5, 4)
+
+    # Finished calls are not reused
+    await flights.do(("list_recipes",), load)
+    assert calls == 2
+
+
+@pytest.mark.asyncio
+async def test_forgotten_flights_are_not_joined():
+    flights = SingleFlight()
+    release = asyncio.Event()
+    calls = 0
+
+    async def load():
+        nonlocal calls
+        calls += 1
+        call = calls
+        await release.wait()
+        return call
+
+    first = asyncio.create_task(flights.do(("get_draft_media", "user"), load))
+    await asyncio.sleep(0)
+    flights.forget(["get_draft_media"])
+    second = asyncio.create_task(flights.do(("get_draft_media", "user"), load))
+    await asyncio.sleep(0)
+    release.set()
+    assert await asyncio.gather(first, second) == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_the_call():
+    flights = SingleFlight()
+
+    async def load():
+        await asyncio.sleep(0.01)
+        return "done"
+
+    first = asyncio.create_task(flights.do(("list_recipes",), load))
+    second = asyncio.create_task(flights.do(("list_recipes",), load))
+    await asyncio.sleep(0)
+    first.cancel()
+    assert await second == "done"
@@ -0,0 +1,37 @@
+from wasfeines.llm.stream_parser import RecipeStreamParser
+
+RECIPE_HTML = """<summary>
+    {"name": "Vegan Peanut Protein Balls"}
+</summary>
+<section class="recipe--header"><h1>Vegan Peanut Protein Balls</h1></section>
+<section class="recipe--ingredients"><ul><li>90g Oats</li></ul></section>
+"""
+
+
+def test_stream_parser_emits_summary_and_sections_as_they_complete():
+    parser = RecipeStreamParser()
+    events = []
+    for i in range(0, len(RECIPE_HTML), 7):
+        events.extend(parser.feed(RECIPE_HTML[i:i + 7]))
+    events.extend(parser.finish())
+
+    assert [event.event for event in events] == ["summary", "section", "section"]
+    assert events[0].summary == {"name": "Vegan Peanut Protein Balls"}
+    assert events[1].html.startswith('<section class="recipe--header">')
+    assert events[2].html.endswith("</section>")
+    assert parser.text == RECIPE_HTML
+
+
+def test_stream_parser_emits_summary_before_sections_arrive():
+    parser = RecipeStreamParser()
+    events = parser.feed('<summary>{"name": "Soup"}</summary><section class="recipe--head')
+    assert [event.event for event in events] == ["summary"]
+    assert parser.feed("er\"></section>")[0].event == "section"
+
+
+def test_stream_parser_flushes_sections_without_summary():
+    parser = RecipeStreamParser()
+    assert parser.feed("<section>a</section>") == []
+    events = parser.finish()
+    assert [event.html for event in events] == ["<section>a</section>"]
+    assert parser.summary is None
@@ -4,12 +4,14 @@ import Box from "@mui/material/Box";
 
 interface ImageWithSkeletonProps {
   src: string;
+  srcSet?: string;
+  sizes?: string;
   alt: string;
   width: number | string;
   height: number | string;
 }
 
-const ImageWithSkeleton: React.FC<ImageWithSkeletonProps> = ({ src, alt, width, height }) => {
+const ImageWithSkeleton: React.FC<ImageWithSkeletonProps> = ({ src, srcSet, sizes, alt, width, height }) => {
   const [loading, setLoading] = useState(true);
 
   return (
@@ -17,6 +19,8 @@ const ImageWithSkeleton: React.FC<ImageWithSkeletonProps> = ({ src, alt, width,
       {loading && <Skeleton variant="rectangular" width={width} height={height} />}
       <img
         src={src}
+        srcSet={srcSet}
+        sizes={sizes}
         alt={alt}
         width={width}
         height={height}
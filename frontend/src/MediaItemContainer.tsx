@@ -7,6 +7,7 @@ import Rating from '@mui/material/Rating';
 import Card from '@mui/material/Card';
 import { Chip } from '@mui/material';
 import ImageWithSkeleton from './ImageWithSkeleton';
+import { mediaImageProps } from './api/media';
 
 export type MediaItemProps = {
   item: MediaItem;
@@ -32,11 +33,11 @@ const CompoundRating: React.FC<any> = ({ summary }) => {
 }
 
 export const MediaItemContainer: React.FC<any> = ({ item }) => {
-  const firstMediaItem = item.media[0].content_url;
+  const firstMediaItem = mediaImageProps(item.media[0]);
   return (
     <Box
       sx={{ height: "100dvh", overflow: "hidden", position: "relative" }}>
-      <ImageWithSkeleton src={firstMediaItem} alt="Media" width="100%" height="100%" />
+      <ImageWithSkeleton {...firstMediaItem} alt="Media" width="100%" height="100%" />
       {
         item.summary && (<Card sx={{
           background: "rgba(255, 255, 255, 0.92)",
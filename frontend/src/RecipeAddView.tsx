@@ -1,6 +1,6 @@
 import { useEffect, useMemo, useState } from "react"
 
-import { Box, Chip, CircularProgress, Fab, ImageListItemBar, InputAdornment, Rating, Skeleton, TextField, Typography } from "@mui/material"
+import { Alert, Box, Chip, CircularProgress, Fab, ImageListItemBar, InputAdornment, Rating, Skeleton, TextField, Typography } from "@mui/material"
 import ImageList from '@mui/material/ImageList';
 import ImageListItem from '@mui/material/ImageListItem';
 import { styled } from '@mui/material/styles';
@@ -12,6 +12,7 @@ import { Create } from "@mui/icons-material";
 import debounce from "lodash.debounce";
 import { components } from "./api/schema";
 import { useGenerate } from "./api/useGenerate";
+import { useUploadSlots } from "./api/useUploadSlots";
 import { useNavigate } from "react-router";
 
 const VisuallyHiddenInput = styled('input')({
@@ -35,7 +36,8 @@ export const RecipeAddView: React.FC<RecipeAddViewProps> = () => {
     const draftRecipeQuery = useDraftRecipe()
     const { data, isLoading } = draftRecipeQuery;
     const { isPending: isMutatePending, mutateAsync } = useMutateDraftRecipe();
-    const { mutateAsync: generateRecipe, isPending: isGeneratePending } = useGenerate();
+    const { mutateAsync: generateRecipe, isPending: isGeneratePending, error: generateError } = useGenerate();
+    const { mutateAsync: createUploadSlots } = useUploadSlots();
     const [isUploadInProgress, setIsUploadInProgress] = useState<boolean>(false)
     const sortedExistingDraftMedia = data?.draft_media.filter((item) => item.exists).sort((a, b) => {
         return (b.create_timestamp ?? 0) - (a.create_timestamp ?? 0)
@@ -118,10 +120,9 @@ export const RecipeAddView: React.FC<RecipeAddViewProps> = () => {
                             return;
                         }
                         const fileArray = Array.from(files);
-                        const fileUploadSlots = data?.draft_media.filter((value) => !value.exists)
-                        if (!fileUploadSlots) {
-                            return;
-                        }
+                        const fileUploadSlots = await createUploadSlots({
+                            params: { query: { count: fileArray.length } }
+                        })
                         if (fileUploadSlots.length < fileArray.length) {
                             console.warn("Not enough slots to upload files")
                             return;
@@ -281,12 +282,20 @@ export const RecipeAddView: React.FC<RecipeAddViewProps> = () => {
                 icon={<span style={{ color: "#f39c12" }}>★</span>}
             />
         </Box>
+        {generateError && <Alert severity="error" sx={{ marginTop: "20px", marginBottom: "80px" }}>
+            {generateError.message}
+        </Alert>}
         <Fab
             sx={{ position: "fixed", bottom: 16, right: 16 }}
             
             color="primary"
             onClick={async () => {
-                await generateRecipe({})
+                try {
+                    await generateRecipe()
+                } catch {
+                    // Shown by the alert above
+                    return
+                }
                 navigate("/")
             }}
             disabled={!isCreateRecipeEnabled || isMutatePending || isGeneratePending} variant="extended">
@@ -7,6 +7,7 @@ import { ArrowBackIosNew } from "@mui/icons-material";
 import { useEffect, useState } from "react";
 import { useDeleteRecipe } from "./api/useDeleteRecipe";
 import { useRecipes } from "./api/useRecipes";
+import { mediaImageProps } from "./api/media";
 
 export type RecipeDetailViewRouteParams = {
     recipeId: string;
@@ -56,7 +57,7 @@ export const RecipeDetailView: React.FC = ({ }) => {
             <Box sx={{ marginTop: "10px"}}>
                 {maybeRecipe && maybeRecipe.media.map((media, index) => (
                     <Box key={index}>
-                        <img src={media.content_url} alt="Media" style={{ width: "100%" }} />
+                        <img {...mediaImageProps(media)} alt="Media" style={{ width: "100%" }} />
                     </Box>
                 ))}
             </Box>
@@ -64,7 +65,7 @@ export const RecipeDetailView: React.FC = ({ }) => {
                 {maybeRecipe && maybeRecipe.media.map((media, index) => (
                     <Box key={index}>
                         <Button variant="contained" color="error" onClick={async () => {
-                            await deleteRecipe({ params: { query: { recipe_name: maybeRecipe.name } } });
+                            await deleteRecipe({ params: { query: { recipe_name: [maybeRecipe.name] } } });
                             navigate(-1);
                         }} disabled={isDeletePending}>
                             Delete Recipe
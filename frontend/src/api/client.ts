@@ -3,7 +3,7 @@ import createClient from "openapi-react-query";
 import type { paths } from "./schema";
 import { QueryClient } from "@tanstack/react-query";
 
-const fetchClient = createFetchClient<paths>({
+export const fetchClient = createFetchClient<paths>({
   baseUrl: "/",
 });
 export const queryClient = new QueryClient();
@@ -0,0 +1,18 @@
+import { components } from "./schema"
+
+type Media = components["schemas"]["Media"]
+type MediaVariant = components["schemas"]["MediaVariant"]
+
+// Recipe images are at most as wide as the app
+const MEDIA_SIZES = "(max-width: 600px) 100vw, 600px"
+
+// Image attributes letting the browser pick the smallest stored variant that is sharp enough,
+// media published before variants existed only have the original
+export const mediaImageProps = (media: Media) => {
+    const variants = [media.thumbnail, media.medium].filter((variant): variant is MediaVariant => !!variant)
+    return {
+        src: media.thumbnail?.content_url ?? media.content_url,
+        srcSet: variants.length > 0 ? variants.map((variant) => `${variant.content_url} ${variant.width}w`).join(", ") : undefined,
+        sizes: variants.length > 0 ? MEDIA_SIZES : undefined,
+    }
+}
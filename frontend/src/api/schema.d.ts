@@ -22,6 +22,43 @@ export interface paths {
         patch?: never;
         trace?: never;
     };
+    "/api/v1/recipes/bundle": {
+        parameters: {
+            query?: never;
+            header?: never;
+            path?: never;
+            cookie?: never;
+        };
+        /**
+         * Get Recipe Bundle
+         * @description A page of recipes with their HTML inlined, gzip-compressed for clients that accept it.
+         */
+        get: operations["get_recipe_bundle_api_v1_recipes_bundle_get"];
+        put?: never;
+        post?: never;
+        delete?: never;
+        options?: never;
+        head?: never;
+        patch?: never;
+        trace?: never;
+    };
+    "/api/v1/recipes/search": {
+        parameters: {
+            query?: never;
+            header?: never;
+            path?: never;
+            cookie?: never;
+        };
+        /** Search Recipes */
+        get: operations["search_recipes_api_v1_recipes_search_get"];
+        put?: never;
+        post?: never;
+        delete?: never;
+        options?: never;
+        head?: never;
+        patch?: never;
+        trace?: never;
+    };
     "/api/v1/draftmedia": {
         parameters: {
             query?: never;
@@ -39,6 +76,23 @@ export interface paths {
         patch?: never;
         trace?: never;
     };
+    "/api/v1/draftmedia/slots": {
+        parameters: {
+            query?: never;
+            header?: never;
+            path?: never;
+            cookie?: never;
+        };
+        get?: never;
+        put?: never;
+        /** Create Upload Slots */
+        post: operations["create_upload_slots_api_v1_draftmedia_slots_post"];
+        delete?: never;
+        options?: never;
+        head?: never;
+        patch?: never;
+        trace?: never;
+    };
     "/api/v1/draftrecipe": {
         parameters: {
             query?: never;
@@ -75,6 +129,84 @@ export interface paths {
         patch?: never;
         trace?: never;
     };
+    "/api/v1/generate/stream": {
+        parameters: {
+            query?: never;
+            header?: never;
+            path?: never;
+            cookie?: never;
+        };
+        get?: never;
+        put?: never;
+        /**
+         * Generate Recipe Stream
+         * @description Generate a recipe and stream it as Server-Sent Events: a `summary` event once the summary is complete,
+         * a `section` event per completed section and finally the stored `recipe`.
+         */
+        post: operations["generate_recipe_stream_api_v1_generate_stream_post"];
+        delete?: never;
+        options?: never;
+        head?: never;
+        patch?: never;
+        trace?: never;
+    };
+    "/api/v1/generate/{job_id}": {
+        parameters: {
+            query?: never;
+            header?: never;
+            path?: never;
+            cookie?: never;
+        };
+        /** Get Generation Job */
+        get: operations["get_generation_job_api_v1_generate__job_id__get"];
+        put?: never;
+        post?: never;
+        delete?: never;
+        options?: never;
+        head?: never;
+        patch?: never;
+        trace?: never;
+    };
+    "/api/v1/media/{key}": {
+        parameters: {
+            query?: never;
+            header?: never;
+            path?: never;
+            cookie?: never;
+        };
+        /** Get Media */
+        get: operations["get_media_api_v1_media__key__get"];
+        /** Put Media */
+        put: operations["put_media_api_v1_media__key__put"];
+        post?: never;
+        /** Delete Media */
+        delete: operations["delete_media_api_v1_media__key__delete"];
+        options?: never;
+        /** Get Media */
+        head: operations["get_media_api_v1_media__key__get"];
+        patch?: never;
+        trace?: never;
+    };
+    "/api/v1/stats": {
+        parameters: {
+            query?: never;
+            header?: never;
+            path?: never;
+            cookie?: never;
+        };
+        /**
+         * Get Stats
+         * @description Load of the process's executors and concurrency limiters, and how many storage reads were coalesced.
+         */
+        get: operations["get_stats_api_v1_stats_get"];
+        put?: never;
+        post?: never;
+        delete?: never;
+        options?: never;
+        head?: never;
+        patch?: never;
+        trace?: never;
+    };
     "/api/v1/login": {
         parameters: {
             query?: never;
@@ -131,6 +263,27 @@ export interface paths {
 export type webhooks = Record<string, never>;
 export interface components {
     schemas: {
+        /** BulkDeleteResponse */
+        BulkDeleteResponse: {
+            /** Deleted */
+            deleted: string[];
+            /** Errors */
+            errors: {
+                [key: string]: string;
+            };
+        };
+        /**
+         * CoalescingStats
+         * @description Calls of a storage operation, `coalesced` of them shared the result of an identical call in flight.
+         */
+        CoalescingStats: {
+            /** Operation */
+            operation: string;
+            /** Calls */
+            calls: number;
+            /** Coalesced */
+            coalesced: number;
+        };
         /** DraftMedia */
         DraftMedia: {
             /** Exists */
@@ -147,6 +300,10 @@ export interface components {
             delete_url?: string | null;
             /** Create Timestamp */
             create_timestamp?: number | null;
+            /** Size */
+            size?: number | null;
+            /** Etag */
+            etag?: string | null;
         };
         /** DraftRecipeRequestModel */
         DraftRecipeRequestModel: {
@@ -171,6 +328,26 @@ export interface components {
             /** Draft Media */
             draft_media: components["schemas"]["DraftMedia"][];
         };
+        /** GenerationJob */
+        GenerationJob: {
+            /** Id */
+            id: string;
+            /** Created By */
+            created_by: string;
+            status: components["schemas"]["GenerationJobStatus"];
+            /** Create Timestamp */
+            create_timestamp: number;
+            /** Update Timestamp */
+            update_timestamp: number;
+            recipe?: components["schemas"]["Recipe"] | null;
+            /** Error */
+            error?: string | null;
+        };
+        /**
+         * GenerationJobStatus
+         * @enum {string}
+         */
+        GenerationJobStatus: "queued" | "generating" | "storing" | "succeeded" | "failed";
         /** HTTPValidationError */
         HTTPValidationError: {
             /** Detail */
@@ -182,12 +359,44 @@ export interface components {
             name: string;
             /** Content Url */
             content_url: string;
+            thumbnail?: components["schemas"]["MediaVariant"] | null;
+            medium?: components["schemas"]["MediaVariant"] | null;
+        };
+        /** MediaVariant */
+        MediaVariant: {
+            /** Content Url */
+            content_url: string;
+            /** Width */
+            width: number;
+            /** Height */
+            height: number;
         };
         /** MessageResponse */
         MessageResponse: {
             /** Detail */
             detail: string;
         };
+        /**
+         * PoolStats
+         * @description Load of a named executor or concurrency limiter: `queued` calls wait for one of `size` slots,
+         * `active` calls hold one. Wait times cover every call started so far.
+         */
+        PoolStats: {
+            /** Name */
+            name: string;
+            /** Size */
+            size: number;
+            /** Active */
+            active: number;
+            /** Queued */
+            queued: number;
+            /** Completed */
+            completed: number;
+            /** Wait Seconds Total */
+            wait_seconds_total: number;
+            /** Wait Seconds Max */
+            wait_seconds_max: number;
+        };
         /** Rating */
         Rating: {
             /** Created By */
@@ -222,6 +431,23 @@ export interface components {
                 [key: string]: string | string[] | number;
             } | null;
         };
+        /**
+         * RecipeSearchResponse
+         * @description One page of search results, best matches first, out of `total` matching recipes.
+         */
+        RecipeSearchResponse: {
+            /** Total */
+            total: number;
+            /** Results */
+            results: components["schemas"]["Recipe"][];
+        };
+        /** ServerStats */
+        ServerStats: {
+            /** Pools */
+            pools: components["schemas"]["PoolStats"][];
+            /** Coalescing */
+            coalescing: components["schemas"]["CoalescingStats"][];
+        };
         /** User */
         User: {
             /** Sub */
@@ -257,7 +483,12 @@ export type $defs = Record<string, never>;
 export interface operations {
     get_recipes_api_v1_recipes_get: {
         parameters: {
-            query?: never;
+            query?: {
+                /** @description Page size, omit to list all recipes */
+                limit?: number | null;
+                /** @description Value of the X-Next-Cursor header of the previous page */
+                cursor?: string | null;
+            };
             header?: never;
             path?: never;
             cookie?: never;
@@ -273,12 +504,28 @@ export interface operations {
                     "application/json": components["schemas"]["Recipe"][];
                 };
             };
+            /** @description The listing did not change since the request's If-None-Match ETag */
+            304: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content?: never;
+            };
+            /** @description Validation Error */
+            422: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": components["schemas"]["HTTPValidationError"];
+                };
+            };
         };
     };
     delete_recipe_api_v1_recipes_delete: {
         parameters: {
             query: {
-                recipe_name: string;
+                recipe_name: string[];
             };
             header?: never;
             path?: never;
@@ -292,7 +539,7 @@ export interface operations {
                     [name: string]: unknown;
                 };
                 content: {
-                    "application/json": components["schemas"]["MessageResponse"];
+                    "application/json": components["schemas"]["MessageResponse"] | components["schemas"]["BulkDeleteResponse"];
                 };
             };
             /** @description Recipe not found */
@@ -315,6 +562,83 @@ export interface operations {
             };
         };
     };
+    get_recipe_bundle_api_v1_recipes_bundle_get: {
+        parameters: {
+            query?: {
+                /** @description Number of recipes in the bundle */
+                limit?: number;
+                /** @description Value of the X-Next-Cursor header of the previous bundle */
+                cursor?: string | null;
+            };
+            header?: never;
+            path?: never;
+            cookie?: never;
+        };
+        requestBody?: never;
+        responses: {
+            /** @description One JSON object per line, {"recipe": Recipe, "html": string | null}, in listing order */
+            200: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/x-ndjson": unknown;
+                };
+            };
+            /** @description The listing did not change since the request's If-None-Match ETag */
+            304: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content?: never;
+            };
+            /** @description Validation Error */
+            422: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": components["schemas"]["HTTPValidationError"];
+                };
+            };
+        };
+    };
+    search_recipes_api_v1_recipes_search_get: {
+        parameters: {
+            query?: {
+                /** @description Words to search for in names, tags, descriptions, ingredients and instructions */
+                q?: string;
+                /** @description Only return recipes with this tag, repeat to require several */
+                tag?: string[];
+                limit?: number;
+                offset?: number;
+            };
+            header?: never;
+            path?: never;
+            cookie?: never;
+        };
+        requestBody?: never;
+        responses: {
+            /** @description Successful Response */
+            200: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": components["schemas"]["RecipeSearchResponse"];
+                };
+            };
+            /** @description Validation Error */
+            422: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": components["schemas"]["HTTPValidationError"];
+                };
+            };
+        };
+    };
     get_draft_api_v1_draftmedia_get: {
         parameters: {
             query?: never;
@@ -335,6 +659,37 @@ export interface operations {
             };
         };
     };
+    create_upload_slots_api_v1_draftmedia_slots_post: {
+        parameters: {
+            query?: {
+                count?: number;
+            };
+            header?: never;
+            path?: never;
+            cookie?: never;
+        };
+        requestBody?: never;
+        responses: {
+            /** @description Successful Response */
+            200: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": components["schemas"]["DraftMedia"][];
+                };
+            };
+            /** @description Validation Error */
+            422: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": components["schemas"]["HTTPValidationError"];
+                };
+            };
+        };
+    };
     get_draft_recipe_api_v1_draftrecipe_get: {
         parameters: {
             query?: never;
@@ -427,12 +782,41 @@ export interface operations {
         requestBody?: never;
         responses: {
             /** @description Successful Response */
+            202: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": components["schemas"]["GenerationJob"];
+                };
+            };
+            /** @description Draft recipe not found */
+            404: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": components["schemas"]["MessageResponse"];
+                };
+            };
+        };
+    };
+    generate_recipe_stream_api_v1_generate_stream_post: {
+        parameters: {
+            query?: never;
+            header?: never;
+            path?: never;
+            cookie?: never;
+        };
+        requestBody?: never;
+        responses: {
+            /** @description Server-Sent Events: summary, section, recipe or error */
             200: {
                 headers: {
                     [name: string]: unknown;
                 };
                 content: {
-                    "application/json": components["schemas"]["Recipe"];
+                    "text/event-stream": unknown;
                 };
             };
             /** @description Draft recipe not found */
@@ -446,6 +830,253 @@ export interface operations {
             };
         };
     };
+    get_generation_job_api_v1_generate__job_id__get: {
+        parameters: {
+            query?: never;
+            header?: never;
+            path: {
+                job_id: string;
+            };
+            cookie?: never;
+        };
+        requestBody?: never;
+        responses: {
+            /** @description Successful Response */
+            200: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": components["schemas"]["GenerationJob"];
+                };
+            };
+            /** @description Generation job not found */
+            404: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": components["schemas"]["MessageResponse"];
+                };
+            };
+            /** @description Validation Error */
+            422: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": components["schemas"]["HTTPValidationError"];
+                };
+            };
+        };
+    };
+    get_media_api_v1_media__key__get: {
+        parameters: {
+            query?: never;
+            header?: never;
+            path: {
+                key: string;
+            };
+            cookie?: never;
+        };
+        requestBody?: never;
+        responses: {
+            /** @description The media file, supports ETag and Range requests */
+            200: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/octet-stream": unknown;
+                };
+            };
+            /** @description A file of another user's draft */
+            403: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": components["schemas"]["MessageResponse"];
+                };
+            };
+            /** @description Media not found */
+            404: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": components["schemas"]["MessageResponse"];
+                };
+            };
+            /** @description Validation Error */
+            422: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": components["schemas"]["HTTPValidationError"];
+                };
+            };
+        };
+    };
+    put_media_api_v1_media__key__put: {
+        parameters: {
+            query?: never;
+            header?: never;
+            path: {
+                key: string;
+            };
+            cookie?: never;
+        };
+        requestBody?: never;
+        responses: {
+            /** @description Successful Response */
+            200: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": components["schemas"]["MessageResponse"];
+                };
+            };
+            /** @description Not a media file of the user's draft */
+            403: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": components["schemas"]["MessageResponse"];
+                };
+            };
+            /** @description Validation Error */
+            422: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": components["schemas"]["HTTPValidationError"];
+                };
+            };
+        };
+    };
+    delete_media_api_v1_media__key__delete: {
+        parameters: {
+            query?: never;
+            header?: never;
+            path: {
+                key: string;
+            };
+            cookie?: never;
+        };
+        requestBody?: never;
+        responses: {
+            /** @description Successful Response */
+            200: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": components["schemas"]["MessageResponse"];
+                };
+            };
+            /** @description Not a media file of the user's draft */
+            403: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": components["schemas"]["MessageResponse"];
+                };
+            };
+            /** @description Media not found */
+            404: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": components["schemas"]["MessageResponse"];
+                };
+            };
+            /** @description Validation Error */
+            422: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": components["schemas"]["HTTPValidationError"];
+                };
+            };
+        };
+    };
+    get_media_api_v1_media__key__get: {
+        parameters: {
+            query?: never;
+            header?: never;
+            path: {
+                key: string;
+            };
+            cookie?: never;
+        };
+        requestBody?: never;
+        responses: {
+            /** @description The media file, supports ETag and Range requests */
+            200: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/octet-stream": unknown;
+                };
+            };
+            /** @description A file of another user's draft */
+            403: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": components["schemas"]["MessageResponse"];
+                };
+            };
+            /** @description Media not found */
+            404: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": components["schemas"]["MessageResponse"];
+                };
+            };
+            /** @description Validation Error */
+            422: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": components["schemas"]["HTTPValidationError"];
+                };
+            };
+        };
+    };
+    get_stats_api_v1_stats_get: {
+        parameters: {
+            query?: never;
+            header?: never;
+            path?: never;
+            cookie?: never;
+        };
+        requestBody?: never;
+        responses: {
+            /** @description Successful Response */
+            200: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": components["schemas"]["ServerStats"];
+                };
+            };
+        };
+    };
     login_api_v1_login_get: {
         parameters: {
             query?: never;
@@ -1,5 +1,46 @@
-import { api } from "./client"
+import { useMutation, useQueryClient } from "@tanstack/react-query"
+import { api, fetchClient } from "./client"
+import { components } from "./schema"
 
+type GenerationJob = components["schemas"]["GenerationJob"]
+
+const POLL_INTERVAL_MS = 1000
+const ACTIVE_STATUSES: GenerationJob["status"][] = ["queued", "generating", "storing"]
+
+const waitForJob = async (job: GenerationJob): Promise<GenerationJob> => {
+    while (ACTIVE_STATUSES.includes(job.status)) {
+        await new Promise((resolve) => setTimeout(resolve, POLL_INTERVAL_MS))
+        const { data } = await fetchClient.GET("/api/v1/generate/{job_id}", {
+            params: { path: { job_id: job.id } },
+        })
+        if (!data) {
+            throw new Error("The generation job was lost, please try again")
+        }
+        job = data
+    }
+    return job
+}
+
+// Starts generating a recipe from the draft and resolves once it is stored, rejects if the generation failed
 export const useGenerate = () => {
-    return api.useMutation("post", "/api/v1/generate")
+    const client = useQueryClient()
+    return useMutation({
+        mutationFn: async () => {
+            const { data } = await fetchClient.POST("/api/v1/generate")
+            if (!data) {
+                throw new Error("Could not start generating the recipe")
+            }
+            const job = await waitForJob(data)
+            if (job.status === "failed") {
+                throw new Error(job.error ?? "Generating the recipe failed")
+            }
+            return job
+        },
+        onSuccess: () => {
+            const opts = api.queryOptions("get", "/api/v1/recipes")
+            client.invalidateQueries({
+                queryKey: opts.queryKey,
+            })
+        },
+    })
 }
\ No newline at end of file
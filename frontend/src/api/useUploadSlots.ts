@@ -0,0 +1,5 @@
+import { api } from "./client"
+
+export const useUploadSlots = () => {
+    return api.useMutation("post", "/api/v1/draftmedia/slots")
+}
\ No newline at end of file